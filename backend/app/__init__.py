@@ -35,6 +35,62 @@ def create_app():
     )
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+    app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'memory')
+    app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['CACHE_DEFAULT_TTL'] = int(os.getenv('CACHE_DEFAULT_TTL', 300))
+    app.config['SEARCH_BACKEND'] = os.getenv('SEARCH_BACKEND', 'auto')
+    app.config['RESERVATION_TTL'] = int(os.getenv('RESERVATION_TTL', 900))
+    app.config['CHECKOUT_QUEUE'] = os.getenv('CHECKOUT_QUEUE', 'off')  # off, hot or all
+    # memory keeps tickets and admission counts in this process: single-worker deployments only
+    app.config['CHECKOUT_QUEUE_BACKEND'] = os.getenv('CHECKOUT_QUEUE_BACKEND', 'memory')
+    app.config['CHECKOUT_QUEUE_BATCH_SIZE'] = int(os.getenv('CHECKOUT_QUEUE_BATCH_SIZE', 50))
+    app.config['CHECKOUT_QUEUE_MAX_PENDING'] = int(os.getenv('CHECKOUT_QUEUE_MAX_PENDING', 500))
+    app.config['FLASH_SALE_PRODUCTS'] = {
+        int(pid) for pid in os.getenv('FLASH_SALE_PRODUCTS', '').split(',') if pid.strip()
+    }
+    # WEB_CONCURRENCY is the worker count gunicorn (and most PaaS) start with;
+    # a ticket polled on another worker would 404, so refuse to boot
+    if (app.config['CHECKOUT_QUEUE'] != 'off' and app.config['CHECKOUT_QUEUE_BACKEND'] == 'memory'
+            and int(os.getenv('WEB_CONCURRENCY', 1)) > 1):
+        raise RuntimeError(
+            'CHECKOUT_QUEUE_BACKEND=memory only works with a single worker process; '
+            'set WEB_CONCURRENCY=1 or CHECKOUT_QUEUE=off'
+        )
+    app.config['IDEMPOTENCY_TTL'] = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+    app.config['IDEMPOTENCY_LOCK_TIMEOUT'] = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+    app.config['JOBS_BACKOFF_BASE'] = int(os.getenv('JOBS_BACKOFF_BASE', 10))
+    app.config['JOBS_BACKOFF_MAX'] = int(os.getenv('JOBS_BACKOFF_MAX', 3600))
+    app.config['JOBS_LOCK_TIMEOUT'] = int(os.getenv('JOBS_LOCK_TIMEOUT', 600))
+    app.config['EMAIL_BACKEND'] = os.getenv('EMAIL_BACKEND', 'console')  # console or smtp
+    app.config['EMAIL_FROM'] = os.getenv('EMAIL_FROM', 'noreply@spaisingstore.com')
+    app.config['EMAIL_TEMPLATE_CACHE_DIR'] = os.getenv(
+        'EMAIL_TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja-cache')
+    )
+    app.config['SMTP_SERVER'] = os.getenv('SMTP_SERVER', 'localhost')
+    app.config['SMTP_PORT'] = int(os.getenv('SMTP_PORT', 587))
+    app.config['SMTP_USERNAME'] = os.getenv('SMTP_USERNAME') or os.getenv('EMAIL_ADDRESS')
+    app.config['SMTP_PASSWORD'] = os.getenv('SMTP_PASSWORD')
+    app.config['SMTP_USE_TLS'] = os.getenv('SMTP_USE_TLS', 'true').lower() == 'true'
+    app.config['SMTP_POOL_SIZE'] = int(os.getenv('SMTP_POOL_SIZE', 2))
+    app.config['SMTP_MAX_MESSAGES_PER_CONNECTION'] = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
+    app.config['OUTBOX_SINKS'] = os.getenv('OUTBOX_SINKS', 'log,email,sales')  # any of log, email, sales, webhook
+    app.config['OUTBOX_WEBHOOK_URL'] = os.getenv('OUTBOX_WEBHOOK_URL')
+    app.config['OUTBOX_WEBHOOK_SECRET'] = os.getenv('OUTBOX_WEBHOOK_SECRET')
+    app.config['OUTBOX_MAX_ATTEMPTS'] = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+    app.config['OUTBOX_BACKOFF_BASE'] = int(os.getenv('OUTBOX_BACKOFF_BASE', 5))
+    app.config['OUTBOX_BACKOFF_MAX'] = int(os.getenv('OUTBOX_BACKOFF_MAX', 3600))
+    app.config['PUBSUB_BACKEND'] = os.getenv('PUBSUB_BACKEND', 'memory')  # memory or redis
+    app.config['PUBSUB_REDIS_URL'] = os.getenv('PUBSUB_REDIS_URL', app.config['CACHE_REDIS_URL'])
+    app.config['ORDER_STREAM_HEARTBEAT'] = int(os.getenv('ORDER_STREAM_HEARTBEAT', 15))
+    app.config['ORDER_STREAM_MAX_DURATION'] = int(os.getenv('ORDER_STREAM_MAX_DURATION', 300))
+    app.config['DASHBOARD_STAT_SLOTS'] = int(os.getenv('DASHBOARD_STAT_SLOTS', 8))
+    app.config['EXPORT_CHUNK_SIZE'] = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))
+    app.config['PRODUCT_IMPORT_CHUNK_SIZE'] = int(os.getenv('PRODUCT_IMPORT_CHUNK_SIZE', 500))
+    app.config['PRODUCT_IMPORT_MAX_BYTES'] = int(os.getenv('PRODUCT_IMPORT_MAX_BYTES', 50 * 1024 * 1024))
+    app.config['IMAGE_STORE_BACKEND'] = os.getenv('IMAGE_STORE_BACKEND', 'local')
+    app.config['IMAGE_STORE_PATH'] = os.getenv(
+        'IMAGE_STORE_PATH', os.path.join(app.instance_path, 'images')
+    )
 
     # -----------------------------
     # CORS Configuration
@@ -44,9 +100,9 @@ def create_app():
              r"/api/*": {
                  "origins": ["http://localhost:5173", "http://127.0.0.1:5173"],
                  "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-                 "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"],
+                 "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Idempotency-Key"],
                  "supports_credentials": True,
-                 "expose_headers": ["Content-Range", "X-Total-Count"]
+                 "expose_headers": ["Content-Range", "X-Total-Count", "X-Next-Cursor", "Location", "Retry-After", "Idempotent-Replayed", "X-Export-Watermark"]
              }
          },
          supports_credentials=True)
@@ -49,9 +49,293 @@ def create_admin():
     click.echo("✅ Admin user created!")
 
 
+# CLI group: Image store maintenance
+@click.group("images")
+def images_cli():
+    """Manage product images in the image store."""
+
+@images_cli.command("migrate")
+@click.option("--batch-size", default=50, show_default=True, help="Rows per transaction.")
+@with_appcontext
+def migrate_images(batch_size):
+    """Drain legacy products.image_data rows into the image store."""
+    from app.models.product import Product
+    from app.utils.image_store import ImageStoreError
+    from sqlalchemy.orm import undefer
+
+    migrated, failed, last_id = 0, 0, 0
+    while True:
+        # Walk by id so each batch only holds batch_size blobs in memory
+        products = Product.query.options(undefer(Product.image_data)).filter(
+            Product.id > last_id,
+            Product.image_key.is_(None),
+            Product.image_data.isnot(None)
+        ).order_by(Product.id).limit(batch_size).all()
+        if not products:
+            break
+
+        for product in products:
+            last_id = product.id
+            image_data, image_url = product.image_data, product.image_url
+            if not image_data.startswith('data:'):
+                # Bare base64 rows are rendered as JPEG by the frontend
+                image_data = f"data:image/jpeg;base64,{image_data}"
+            try:
+                product.set_image_from_base64(image_data)
+                product.image_url = image_url
+                migrated += 1
+            except ImageStoreError as e:
+                failed += 1
+                click.echo(f"⚠️ Product {product.id}: {e}")
+        db.session.commit()
+        db.session.expunge_all()
+
+    click.echo(f"✅ Migrated {migrated} images ({failed} skipped)")
+
+@images_cli.command("variants")
+@with_appcontext
+def generate_image_variants():
+    """Generate missing resized variants for every stored product image."""
+    from app.models.product import Product
+    from app.utils.image_store import get_image_store
+    from app.utils.image_variants import Image, generate_variants
+
+    if Image is None:
+        click.echo("⚠️ Pillow is not installed; cannot generate variants")
+        return
+
+    store = get_image_store()
+    keys = db.session.query(Product.image_key).filter(Product.image_key.isnot(None)).distinct()
+    written = 0
+    for (image_key,) in keys:
+        try:
+            written += len(generate_variants(store, image_key))
+        except Exception as e:
+            click.echo(f"⚠️ {image_key}: {e}")
+
+    click.echo(f"✅ Generated {written} image variants")
+
+
+# CLI group: Inventory maintenance
+@click.group("inventory")
+def inventory_cli():
+    """Manage stock reservations."""
+
+@inventory_cli.command("sweep")
+@click.option("--interval", default=0, show_default=True,
+              help="Seconds between sweeps; 0 sweeps once and exits.")
+@with_appcontext
+def sweep_reservations(interval):
+    """Release expired stock reservations back to stock."""
+    import time
+    from app.services.inventory_service import sweep_expired
+
+    while True:
+        released = 0
+        while True:
+            # Commit per batch so each transaction stays short
+            count = sweep_expired()
+            db.session.commit()
+            released += count
+            if not count:
+                break
+        click.echo(f"✅ Released {released} expired reservations")
+        if not interval:
+            break
+        time.sleep(interval)
+
+# CLI group: Background jobs
+@click.group("jobs")
+def jobs_cli():
+    """Run and manage background jobs."""
+
+@jobs_cli.command("worker")
+@click.option("--concurrency", default=4, show_default=True, help="Jobs run at once.")
+@click.option("--queue", "queues", multiple=True, default=["default"], show_default=True,
+              help="Queue to consume; repeat for several.")
+@click.option("--poll-interval", default=1.0, show_default=True, help="Seconds between polls when idle.")
+@click.option("--once", is_flag=True, help="Run the jobs that are due now and exit.")
+@with_appcontext
+def jobs_worker(concurrency, queues, poll_interval, once):
+    """Process queued jobs with a bounded worker pool."""
+    from app.services.job_queue import run_worker, work_once
+
+    if once:
+        outcomes = work_once(limit=concurrency, queues=queues)
+        click.echo(f"✅ Ran {len(outcomes)} jobs")
+        return
+    click.echo(f"👷 Job worker running ({concurrency} threads, queues: {', '.join(queues)})")
+    run_worker(concurrency=concurrency, queues=queues, poll_interval=poll_interval)
+
+@jobs_cli.command("requeue-dead")
+@click.argument("job_ids", nargs=-1, type=int)
+@with_appcontext
+def jobs_requeue_dead(job_ids):
+    """Retry dead-lettered jobs (all of them when no ids are given)."""
+    from app.services.job_queue import requeue_dead
+
+    click.echo(f"✅ Requeued {requeue_dead(job_ids)} dead jobs")
+
+@jobs_cli.command("purge")
+@click.option("--older-than-days", default=7, show_default=True)
+@with_appcontext
+def jobs_purge(older_than_days):
+    """Delete finished jobs."""
+    from app.services.job_queue import purge_done
+
+    click.echo(f"✅ Purged {purge_done(older_than_days)} finished jobs")
+
+# CLI group: Order event outbox
+@click.group("outbox")
+def outbox_cli():
+    """Publish outbox events to their sinks."""
+
+@outbox_cli.command("relay")
+@click.option("--batch-size", default=100, show_default=True, help="Events per published batch.")
+@click.option("--poll-interval", default=1.0, show_default=True, help="Seconds between polls when idle.")
+@click.option("--once", is_flag=True, help="Publish what is pending and exit.")
+@with_appcontext
+def outbox_relay(batch_size, poll_interval, once):
+    """Relay unpublished outbox events to the configured sinks."""
+    from app.services.outbox import relay_once, run_relay
+
+    if once:
+        published = 0
+        while True:
+            count = relay_once(batch_size)
+            published += count
+            if count < batch_size:
+                break
+        click.echo(f"✅ Published {published} outbox events")
+        return
+    click.echo("📤 Outbox relay running")
+    run_relay(batch_size=batch_size, poll_interval=poll_interval)
+
+# CLI group: Dashboard counters
+@click.group("stats")
+def stats_cli():
+    """Maintain the admin dashboard counters."""
+
+@stats_cli.command("reconcile")
+@click.option("--interval", default=0, show_default=True,
+              help="Seconds between reconciliations; 0 runs once and exits.")
+@with_appcontext
+def stats_reconcile(interval):
+    """Recount dashboard statistics and correct any drift."""
+    import time
+    from app.services.dashboard_stats import reconcile
+
+    while True:
+        corrections = reconcile()
+        db.session.commit()
+        if corrections:
+            for name, drift in sorted(corrections.items()):
+                click.echo(f"⚠️ {name} drifted by {drift}")
+        else:
+            click.echo("✅ Dashboard stats are consistent")
+        if not interval:
+            break
+        time.sleep(interval)
+
+# CLI group: Sales analytics
+@click.group("analytics")
+def analytics_cli():
+    """Maintain the sales rollups."""
+
+@analytics_cli.command("backfill")
+@click.option("--from", "start", type=click.DateTime(formats=["%Y-%m-%d"]),
+              help="First day to rebuild (default: day of the oldest order).")
+@click.option("--to", "end", type=click.DateTime(formats=["%Y-%m-%d"]),
+              help="Day after the last one to rebuild (default: today, which the relay keeps current).")
+@click.option("--chunk-size", default=1000, show_default=True, help="Orders aggregated per query.")
+@with_appcontext
+def analytics_backfill(start, end, chunk_size):
+    """Rebuild hourly and daily sales rollups from orders."""
+    from datetime import datetime
+    from app.models.order import Order
+    from app.services.sales_analytics import AnalyticsError, backfill
+
+    start = start or db.session.query(db.func.min(Order.created_at)).scalar()
+    if start is None:
+        click.echo("No orders to roll up")
+        return
+    end = end or datetime.utcnow()
+    try:
+        count = backfill(start, end, chunk_size=chunk_size)
+    except AnalyticsError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    db.session.commit()
+    click.echo(f"✅ Rolled up {count} orders from {start:%Y-%m-%d} to {end:%Y-%m-%d}")
+
+# CLI group: Data exports
+@click.group("export")
+def export_cli():
+    """Export data for offline analytics."""
+
+@export_cli.command("orders")
+@click.option("--output", "output_dir", default="exports", show_default=True,
+              type=click.Path(file_okay=False), help="Directory for the exported files.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "parquet"]), default="csv", show_default=True,
+              help="Parquet needs pyarrow; CSV is written without it.")
+@click.option("--since", help="Only orders updated at or after this ISO watermark.")
+@click.option("--incremental", is_flag=True,
+              help="Continue from the watermark saved by the previous incremental export.")
+@click.option("--chunk-size", default=1000, show_default=True, help="Rows fetched per round trip.")
+@with_appcontext
+def export_orders(output_dir, fmt, since, incremental, chunk_size):
+    """Write orders and order_items files covering [since, watermark]."""
+    import os
+    from app.services.order_export import ExportError, current_watermark, export, parse_watermark, resolve_format
+
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, '.watermark')
+    if incremental and not since and os.path.exists(state_path):
+        with open(state_path) as f:
+            since = f.read().strip()
+    try:
+        since = parse_watermark(since)
+    except ExportError as e:
+        raise click.ClickException(str(e))
+    fmt = resolve_format(fmt)
+    watermark = current_watermark()
+    if watermark is None:
+        click.echo("No orders to export")
+        return
+
+    stamp = watermark.strftime('%Y%m%dT%H%M%S')
+    for dataset in ('orders', 'order_items'):
+        path = os.path.join(output_dir, f"{dataset}-{stamp}.{fmt}")
+        with open(path, 'wb') as f:
+            for piece in export(dataset, fmt, since=since, until=watermark, chunk_size=chunk_size):
+                f.write(piece)
+        click.echo(f"📄 Wrote {path}")
+    # Saved last, so a failed export is simply repeated next time
+    if incremental:
+        with open(state_path, 'w') as f:
+            f.write(watermark.isoformat())
+    click.echo(f"✅ Exported orders up to {watermark.isoformat()}")
+
+# CLI command: Drop expired idempotency keys
+@click.command("purge-idempotency-keys")
+@with_appcontext
+def purge_idempotency_keys():
+    """Delete stored Idempotency-Key responses past their TTL."""
+    from app.utils.idempotency import purge_expired
+
+    click.echo(f"✅ Purged {purge_expired()} expired idempotency keys")
+
 # Register commands to Flask CLI
 app.cli.add_command(init_db)
 app.cli.add_command(create_admin)
+app.cli.add_command(images_cli)
+app.cli.add_command(inventory_cli)
+app.cli.add_command(purge_idempotency_keys)
+app.cli.add_command(jobs_cli)
+app.cli.add_command(outbox_cli)
+app.cli.add_command(stats_cli)
+app.cli.add_command(analytics_cli)
+app.cli.add_command(export_cli)
 
 
 if __name__ == "__main__":
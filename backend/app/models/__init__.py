@@ -4,6 +4,13 @@ from app.models.product import Product
 from app.models.order import Order
 from app.models.order_item import OrderItem
 from app.models.cart import Cart, CartItem
+from app.models.stock_reservation import StockReservation
+from app.models.idempotency_key import IdempotencyKey
+from app.models.job import Job
+from app.models.outbox_event import OutboxEvent, OutboxDelivery
+from app.models.dashboard_stat import DashboardStat
+from app.models.sales_rollup import SalesRollup
+from app.models.product_import import ProductImport
 
 # Now that all models are loaded, we can set up relationships
 from app import db
@@ -17,4 +24,4 @@ Order.order_items = db.relationship('OrderItem', backref='order', lazy=True, cas
 # Set up Product relationships
 Product.order_items = db.relationship('OrderItem', backref='product', lazy=True)
 
-__all__ = ['User', 'Product', 'Order', 'OrderItem', 'Cart', 'CartItem']
\ No newline at end of file
+__all__ = ['User', 'Product', 'Order', 'OrderItem', 'Cart', 'CartItem', 'StockReservation', 'IdempotencyKey', 'Job', 'OutboxEvent', 'OutboxDelivery', 'DashboardStat', 'SalesRollup', 'ProductImport']
\ No newline at end of file
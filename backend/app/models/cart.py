@@ -1,6 +1,9 @@
 # app/models/cart.py - FIXED
 from app import db
 from datetime import datetime
+from decimal import Decimal
+
+CENT = Decimal('0.01')
 
 class Cart(db.Model):
     __tablename__ = 'carts'
@@ -12,16 +15,28 @@ class Cart(db.Model):
     # Relationship
     items = db.relationship('CartItem', backref='cart', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    def to_dict(self, include_product_details=False):
+        # Single pass: each subtotal is computed once and summed exactly
+        items = []
+        total_amount = Decimal('0')
+        for item in self.items:
+            subtotal = item.subtotal
+            total_amount += subtotal
+            items.append(item.to_dict(include_product_details, subtotal=subtotal))
+        
         return {
             'user_id': self.user_id,
-            'items': [item.to_dict() for item in self.items],
-            'total_amount': sum(item.subtotal for item in self.items),
-            'total_items': len(self.items)
+            'items': items,
+            'total_amount': float(total_amount.quantize(CENT)),
+            'total_items': len(items)
         }
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        # One row per product per cart; cart_service upserts against this key
+        db.UniqueConstraint('cart_user_id', 'product_id', name='uq_cart_items_cart_product'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     cart_user_id = db.Column(db.Integer, db.ForeignKey('carts.user_id'), nullable=False)
@@ -35,9 +50,16 @@ class CartItem(db.Model):
     
     @property
     def subtotal(self):
-        return self.product.price * self.quantity if self.product else 0
+        """Line total as a Decimal (prices are floats; str() keeps their cents exact)"""
+        if not self.product:
+            return Decimal('0')
+        return Decimal(str(self.product.price)) * self.quantity
     
-    def to_dict(self):
+    def to_dict(self, include_product_details=False, subtotal=None):
+        if subtotal is None:
+            subtotal = self.subtotal
+        
+        # Compact product summary; ?include=product_details adds the rest
         product_data = None
         if self.product:
             product_data = {
@@ -45,16 +67,19 @@ class CartItem(db.Model):
                 'name': self.product.name,
                 'price': float(self.product.price),
                 'stock_quantity': self.product.stock_quantity,
-                'image_url': self.product.image_url,
-                'image_data': self.product.image_data,
-                'category': self.product.category,
-                'available_stock': self.product.stock_quantity  # Add this for frontend
+                'image_url': self.product.get_image_url()
             }
+            if include_product_details:
+                product_data.update({
+                    'description': self.product.description,
+                    'category': self.product.category,
+                    'available_stock': self.product.stock_quantity
+                })
         
         return {
             'id': self.id,
             'product_id': self.product_id,
             'quantity': self.quantity,
-            'subtotal': float(self.subtotal),
+            'subtotal': float(subtotal.quantize(CENT)),
             'product': product_data
         }
\ No newline at end of file
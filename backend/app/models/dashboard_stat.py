@@ -0,0 +1,13 @@
+from app import db
+
+class DashboardStat(db.Model):
+    """One slot of a dashboard counter; a counter's value is the sum of its slots.
+
+    Writers add to a random slot so concurrent checkouts do not all queue
+    on the same row lock.
+    """
+    __tablename__ = 'dashboard_stats'
+
+    name = db.Column(db.String(50), primary_key=True)  # e.g. total_orders
+    slot = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    value = db.Column(db.Numeric(18, 2), nullable=False, default=0)
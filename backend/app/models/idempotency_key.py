@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+from sqlalchemy.dialects.mysql import MEDIUMTEXT
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a write request sent with an Idempotency-Key header"""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of method, path, query string and body
+    status_code = db.Column(db.Integer)  # NULL while the first request is still running
+    response_body = db.Column(db.Text().with_variant(MEDIUMTEXT(), 'mysql'))
+    response_headers = db.Column(db.Text)  # JSON object of the replayable response headers
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -2,22 +2,51 @@ from app import db
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Admin console filters by status or customer, newest first
+        db.Index('ix_orders_status_created_at', 'status', 'created_at'),
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+        # Incremental exports read orders changed since a watermark
+        db.Index('ix_orders_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    total_amount = db.Column(db.Float, nullable=False)
+    # Loads the old value on change so the revenue counter can apply the difference
+    total_amount = db.column_property(db.Column(db.Float, nullable=False), active_history=True)
     status = db.Column(db.String(20), default='pending')
     shipping_address = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
     def update_status(self, new_status):
-        """Update order status with validation"""
+        """Update order status with validation.
+
+        Cancelling puts the ordered stock back; a cancelled order cannot be
+        moved to another status since its stock may already be resold.
+        Every actual change writes an order.status_changed outbox event in
+        the caller's transaction.
+        """
+        from app.services.outbox import record_order_status_change
+
         valid_statuses = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
-        if new_status in valid_statuses:
-            self.status = new_status
+        if new_status not in valid_statuses:
+            return False
+        if self.status == 'cancelled':
+            return new_status == 'cancelled'
+        previous_status = self.status
+        if new_status == 'cancelled':
+            from sqlalchemy.orm.attributes import set_committed_value
+            from app.services.inventory_service import cancel_order
+            changed = cancel_order(self)
+            set_committed_value(self, 'status', 'cancelled')
+            if changed:
+                record_order_status_change(self, previous_status)
             return True
-        return False
+        if new_status != previous_status:
+            self.status = new_status
+            record_order_status_change(self, previous_status)
+        return True
     
     def to_dict(self):
         # Use relationship if available (eager loaded), otherwise fallback to query
@@ -39,4 +68,16 @@ class Order(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'order_items': order_items_data
-        }
\ No newline at end of file
+        }
+
+    def to_summary_dict(self, item_count=0, total_quantity=0):
+        """Listing representation without line items"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total_amount': self.total_amount,
+            'item_count': item_count,
+            'total_quantity': total_quantity,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
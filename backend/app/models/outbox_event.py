@@ -0,0 +1,44 @@
+import json
+from app import db
+from datetime import datetime
+
+class OutboxEvent(db.Model):
+    """A domain event written in the same transaction as the change it describes"""
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        # The relay reads unpublished events in id order
+        db.Index('ix_outbox_events_published_id', 'published_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(100), nullable=False)  # e.g. order.status_changed
+    aggregate_id = db.Column(db.Integer, nullable=False, index=True)  # id of the order
+    user_id = db.Column(db.Integer, index=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime)  # NULL means due now
+    last_error = db.Column(db.Text)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'aggregate_id': self.aggregate_id,
+            'user_id': self.user_id,
+            'payload': json.loads(self.payload),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class OutboxDelivery(db.Model):
+    """Records that one sink has received an event that is not fully published yet.
+
+    The relay deletes an event's rows once every sink has it and
+    published_at is set.
+    """
+    __tablename__ = 'outbox_deliveries'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('outbox_events.id'), primary_key=True)
+    sink = db.Column(db.String(50), primary_key=True)  # name in OUTBOX_SINKS
+    delivered_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
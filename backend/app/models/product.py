@@ -1,15 +1,23 @@
 from app import db
+from flask import has_request_context, url_for
+from urllib.parse import urlsplit
 from sqlalchemy.dialects.mysql import LONGTEXT
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Backs /api/products/search on MySQL; other dialects use the in-process index
+        db.Index('ft_products_search', 'name', 'description', 'category', mysql_prefix='FULLTEXT'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
     stock_quantity = db.Column(db.Integer, nullable=False, default=0)
-    image_data = db.Column(LONGTEXT)  # Store base64 image data
+    image_data = db.deferred(db.Column(LONGTEXT))  # Legacy base64 image data, drained by `flask images migrate`
+    image_key = db.Column(db.String(64), index=True)  # SHA-256 of the image in the image store
+    image_content_type = db.Column(db.String(50))
     image_url = db.Column(db.String(255))  # Or store external URL
     category = db.Column(db.String(50))  # Add category field
     created_at = db.Column(db.DateTime, server_default=db.func.now())
@@ -40,21 +48,42 @@ class Product(db.Model):
             'stock_quantity': self.stock_quantity,
             'stock': self.stock_quantity,  # Ensure both names are available
             'quantity': self.stock_quantity,  # Ensure both names are available
-            'image_url': self.image_url,
-            'image_data': self.image_data,
+            'image_url': self.get_image_url(),
             'category': self.category,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
     def set_image_from_base64(self, base64_string):
-        """Store base64 image data"""
+        """Store decoded image bytes in the image store and keep only the key"""
+        from app.utils.image_store import decode_data_uri, get_image_store
+        from app.utils.image_variants import schedule_variants
         if base64_string and base64_string.startswith('data:image'):
-            self.image_data = base64_string
+            data, content_type = decode_data_uri(base64_string)
+            self.image_key = get_image_store().put(data)
+            self.image_content_type = content_type
+            self.image_data = None
+            self.image_url = None  # An upload supersedes any external URL
+            schedule_variants(self.image_key)
     
     def get_image_url(self):
-        """Return image URL or generate from base64 data"""
+        """Return external image URL or the versioned image endpoint URL"""
         if self.image_url:
             return self.image_url
-        elif self.image_data:
-            return self.image_data  # This is the base64 data
-        return None
\ No newline at end of file
+        elif self.image_key:
+            # The key in ?v= makes the URL change whenever the image does
+            if has_request_context():
+                return url_for('products.get_product_image', product_id=self.id,
+                               v=self.image_key[:16], _external=True)
+            return f"/api/products/{self.id}/image?v={self.image_key[:16]}"
+        return None
+
+    def set_image_url(self, url):
+        """Store an external image URL, ignoring this product's own image endpoint.
+
+        get_image_url() hands out the served endpoint URL as image_url, so a
+        client echoing a product back would otherwise pin that absolute,
+        versioned URL into the column and stop following later uploads.
+        """
+        if url and urlsplit(url).path == f"/api/products/{self.id}/image":
+            return
+        self.image_url = url
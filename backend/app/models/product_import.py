@@ -0,0 +1,43 @@
+import json
+from app import db
+from datetime import datetime
+
+class ProductImport(db.Model):
+    """A bulk product upload and its progress; processed by a job"""
+    __tablename__ = 'product_imports'
+
+    # failed imports are retried by their job; dead ones were given up on
+    STATUSES = ('queued', 'running', 'done', 'failed', 'dead')
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)  # admin who uploaded it
+    format = db.Column(db.String(10), nullable=False)  # csv or ndjson
+    blob_key = db.Column(db.String(64), nullable=False)  # upload in the blob store
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    total_rows = db.Column(db.Integer, nullable=False, default=0)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text, nullable=False, default='[]')  # JSON, first rejected rows
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(32))  # run currently processing the upload
+    heartbeat_at = db.Column(db.DateTime)  # refreshed by that run after every chunk
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'format': self.format,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'created': self.created_count,
+            'updated': self.updated_count,
+            'rejected': self.error_count,
+            'errors': json.loads(self.errors or '[]'),
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,19 @@
+from app import db
+
+class SalesRollup(db.Model):
+    """Pre-aggregated sales for one time bucket and dimension value.
+
+    dimension is 'all' (whole store, dimension_key ''), 'product'
+    (dimension_key is the product id) or 'category'. order_count is the
+    number of orders contributing to the row and revenue is in the store
+    currency.
+    """
+    __tablename__ = 'sales_rollups'
+
+    granularity = db.Column(db.String(8), primary_key=True)  # hour or day
+    dimension = db.Column(db.String(16), primary_key=True)
+    dimension_key = db.Column(db.String(100), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)  # start of the hour/day, UTC
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(18, 2), nullable=False, default=0)
@@ -0,0 +1,33 @@
+from app import db
+from datetime import datetime
+
+class StockReservation(db.Model):
+    """Stock held for a checkout; the product's stock_quantity is already reduced"""
+    __tablename__ = 'stock_reservations'
+    __table_args__ = (
+        # The sweeper scans held rows by expiry
+        db.Index('ix_stock_reservations_status_expires', 'status', 'expires_at'),
+    )
+
+    STATUSES = ('held', 'committed', 'released')
+
+    id = db.Column(db.Integer, primary_key=True)
+    reservation_key = db.Column(db.String(36), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='held')
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), index=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'reservation_key': self.reservation_key,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'status': self.status,
+            'order_id': self.order_id,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
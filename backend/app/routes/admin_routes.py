@@ -1,24 +1,36 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, stream_with_context
 from app import db
 from app.models.product import Product
 from app.models.user import User
 from app.models.order import Order
 from app.utils.permissions import admin_required
+from app.utils.pagination import PaginationError, parse_limit
+from app.utils.streaming import stream_json
+from app.services import dashboard_stats, order_export, order_service, sales_analytics
+from app.services.order_export import ExportError
+from app.services import product_import
+from app.services.product_import import ProductImportError
+from app.models.product_import import ProductImport
+from app.services.sales_analytics import AnalyticsError
+from app.services.order_service import OrderError
 from app.schemas.product_schema import products_schema, product_schema
 from app.schemas.user_schema import users_schema, user_schema
-from app.schemas.order_schema import orders_schema
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.orm import joinedload
 
 admin_bp = Blueprint('admin', __name__)
 
+# Rows fetched and encoded at a time by the streamed listings
+STREAM_CHUNK_SIZE = 500
+
 # Product Management
 @admin_bp.route('/products', methods=['GET'])
 @admin_required
 def get_all_products():
     try:
-        products = Product.query.all()
-        return jsonify(products_schema.dump(products))
+        # Streamed from a server-side cursor; Accept: application/x-ndjson for NDJSON
+        products = Product.query.order_by(Product.id).yield_per(STREAM_CHUNK_SIZE)
+        return stream_json(products, products_schema.dump, chunk_size=STREAM_CHUNK_SIZE)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -73,7 +85,7 @@ def update_product(product_id):
             product.set_image_from_base64(data['image_data'])
             
         if 'image_url' in data and data['image_url']:
-            product.image_url = data['image_url']
+            product.set_image_url(data['image_url'])
 
         db.session.commit()
 
@@ -106,13 +118,82 @@ def delete_product(product_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+# Bulk Product Import/Export
+IMPORT_MIMETYPES = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson'}
+
+@admin_bp.route('/products/import', methods=['POST'])
+@admin_required
+def import_products():
+    """Queue a CSV (with header) or NDJSON product upload.
+
+    The body is the file itself (Content-Type text/csv or
+    application/x-ndjson) or a multipart 'file' field; ?format= overrides
+    the detected format. Rows are upserted by name in a background job;
+    poll the returned Location for progress.
+    """
+    try:
+        max_bytes = current_app.config.get('PRODUCT_IMPORT_MAX_BYTES', 50 * 1024 * 1024)
+        upload = request.files.get('file')
+        if upload:
+            data = upload.read(max_bytes + 1)
+            detected = 'ndjson' if (upload.filename or '').endswith(('.ndjson', '.jsonl')) else 'csv'
+        else:
+            data = request.stream.read(max_bytes + 1)
+            detected = IMPORT_MIMETYPES.get(request.mimetype, 'csv')
+        if len(data) > max_bytes:
+            return jsonify({'error': f'Upload is larger than {max_bytes} bytes'}), 413
+        
+        product_upload = product_import.create_import(
+            int(get_jwt_identity()), data, request.args.get('format', detected)
+        )
+        db.session.commit()
+        
+        response = jsonify(product_upload.to_dict())
+        response.status_code = 202
+        response.headers['Location'] = f'/api/admin/products/import/{product_upload.id}'
+        return response
+    except ProductImportError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/products/import/<int:import_id>', methods=['GET'])
+@admin_required
+def get_product_import(import_id):
+    """Progress of a product import"""
+    try:
+        product_upload = db.session.get(ProductImport, import_id)
+        if product_upload is None:
+            return jsonify({'error': 'Import not found'}), 404
+        return jsonify(product_upload.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/products/export', methods=['GET'])
+@admin_required
+def export_products():
+    """Stream the catalog as CSV or NDJSON (?format=), in the import's columns"""
+    try:
+        fmt = request.args.get('format', 'csv')
+        pieces = product_import.export_products(fmt, chunk_size=STREAM_CHUNK_SIZE)
+    except ProductImportError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = current_app.response_class(
+        stream_with_context(pieces), mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{fmt}'
+    return response
+
 # User Management
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def get_all_users():
     try:
-        users = User.query.all()
-        return jsonify(users_schema.dump(users))
+        users = User.query.order_by(User.id).yield_per(STREAM_CHUNK_SIZE)
+        return stream_json(users, users_schema.dump, chunk_size=STREAM_CHUNK_SIZE)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -185,22 +266,40 @@ def delete_user(user_id):
         return jsonify({'error': str(e)}), 400
 
 # Order Management
+DEFAULT_ADMIN_ORDERS_PAGE = 50
+MAX_ADMIN_ORDERS_PAGE = 200
+
 @admin_bp.route('/orders', methods=['GET'])
 @admin_required
 def get_all_orders():
+    """Filtered, sorted page of orders.
+
+    ?status, ?user_id, ?created_from, ?created_to and ?min_total filter;
+    ?sort (created_at, total_amount, id) with ?order=asc|desc sorts,
+    newest first by default; ?limit and ?cursor page.
+    """
     try:
-        # FIX: Use eager loading to avoid N+1 queries
-        orders = Order.query.options(
-            joinedload(Order.order_items)  # Eager load order_items
-        ).order_by(Order.created_at.desc()).all()
+        limit = parse_limit(request.args.get('limit'), default=DEFAULT_ADMIN_ORDERS_PAGE,
+                            maximum=MAX_ADMIN_ORDERS_PAGE)
+        orders, next_cursor, total = order_service.search_orders(
+            limit,
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'created_at'),
+            descending=request.args.get('order', 'desc').lower() != 'asc',
+            status=request.args.get('status'),
+            user_id=request.args.get('user_id'),
+            created_from=request.args.get('created_from'),
+            created_to=request.args.get('created_to'),
+            min_total=request.args.get('min_total')
+        )
         
-        # Manually serialize to avoid relationship issues
-        orders_data = []
-        for order in orders:
-            order_data = order.to_dict()
-            orders_data.append(order_data)
-            
-        return jsonify(orders_data)
+        response = jsonify(orders)
+        response.headers['X-Total-Count'] = str(total)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    except (PaginationError, OrderError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -248,18 +347,62 @@ def update_order_status(order_id):
 @admin_required 
 def get_dashboard_stats():
     try:
-        total_users = User.query.count()
-        total_products = Product.query.count()
-        total_orders = Order.query.count()
-        total_revenue_result = db.session.query(db.func.sum(Order.total_amount)).scalar()
-        total_revenue = float(total_revenue_result or 0)
-        
-        return jsonify({
-            'total_users': total_users,
-            'total_products': total_products,
-            'total_orders': total_orders,
-            'total_revenue': total_revenue
-        })
+        # Maintained counters; no table scans on dashboard refresh
+        return jsonify(dashboard_stats.read_stats())
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+# Sales Analytics
+@admin_bp.route('/analytics/sales', methods=['GET'])
+@admin_required
+def get_sales_analytics():
+    """Sales per hour, day or week from the rollup tables.
+
+    ?granularity=hour|day|week (default day), ?from/?to as ISO dates or
+    datetimes, optionally narrowed by ?product_id or ?category.
+    """
+    try:
+        granularity = request.args.get('granularity', 'day')
+        buckets = sales_analytics.sales_series(
+            granularity,
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            product_id=request.args.get('product_id'),
+            category=request.args.get('category')
+        )
+        return jsonify({'granularity': granularity, 'buckets': buckets})
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Exports
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+@admin_bp.route('/exports/<dataset>', methods=['GET'])
+@admin_required
+def export_dataset(dataset):
+    """Stream orders or order_items as CSV or Parquet.
+
+    ?since=<watermark> limits the export to orders changed since a
+    previous export; the X-Export-Watermark header is the value to pass
+    next time. Parquet falls back to CSV when pyarrow is not installed.
+    """
+    try:
+        fmt = order_export.resolve_format(request.args.get('format', 'csv'))
+        since = order_export.parse_watermark(request.args.get('since'))
+        watermark = order_export.current_watermark()
+        pieces = order_export.export(dataset, fmt, since=since, until=watermark,
+                                     chunk_size=current_app.config.get('EXPORT_CHUNK_SIZE', 1000))
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    response = current_app.response_class(stream_with_context(pieces), mimetype=EXPORT_MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={dataset}.{fmt}'
+    if watermark:
+        response.headers['X-Export-Watermark'] = watermark.isoformat()
+    return response
@@ -2,40 +2,48 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models.cart import Cart, CartItem
+from app.models.cart import CartItem
 from app.models.product import Product
-from app.models.user import User
-from sqlalchemy.orm import joinedload
+from app.services import cart_service
+from app.services.cart_service import CartError
+from app.utils.conditional import conditional
+from app.utils.idempotency import idempotent
 
 cart_bp = Blueprint('cart', __name__)
 
-def get_or_create_cart(user_id):
-    """Get or create cart for user with eager loading"""
-    cart = Cart.query.options(
-        joinedload(Cart.items).joinedload(CartItem.product)
-    ).get(user_id)
-    
-    if not cart:
-        cart = Cart(user_id=user_id)
-        db.session.add(cart)
-        db.session.commit()
-        # Reload with relationships
-        cart = Cart.query.options(
-            joinedload(Cart.items).joinedload(CartItem.product)
-        ).get(user_id)
-    return cart
+def wants_product_details():
+    """True for ?include=product_details (comma-separated list accepted)"""
+    return 'product_details' in request.args.get('include', '').split(',')
+
+def cart_version():
+    """Validator for the current user's cart, including prices of its products"""
+    try:
+        user_id = int(get_jwt_identity())
+    except (ValueError, TypeError):
+        return None
+    count, quantity, id_sum, items_updated, products_updated = db.session.query(
+        db.func.count(CartItem.id),
+        db.func.sum(CartItem.quantity),
+        db.func.sum(CartItem.id),
+        db.func.max(CartItem.updated_at),
+        db.func.max(Product.updated_at)
+    ).join(Product, CartItem.product_id == Product.id).filter(
+        CartItem.cart_user_id == user_id
+    ).one()
+    last_modified = max((t for t in (items_updated, products_updated) if t), default=None)
+    return last_modified, (user_id, count, quantity, id_sum, items_updated, products_updated)
 
 @cart_bp.route('', methods=['GET', 'OPTIONS'])
 @cart_bp.route('/', methods=['GET', 'OPTIONS'])
 @jwt_required()
+@conditional(cart_version, private=True)
 def get_cart():
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
         
     try:
         user_id = int(get_jwt_identity())
-        cart = get_or_create_cart(user_id)
-        return jsonify(cart.to_dict())
+        return jsonify(cart_service.get_cart(user_id, wants_product_details()))
         
     except Exception as e:
         print(f"Error fetching cart: {str(e)}")
@@ -43,6 +51,7 @@ def get_cart():
 
 @cart_bp.route('/add', methods=['POST', 'OPTIONS'])
 @jwt_required()
+@idempotent
 def add_to_cart():
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
@@ -54,55 +63,21 @@ def add_to_cart():
         if not data or not data.get('product_id'):
             return jsonify({'error': 'Product ID is required'}), 400
         
-        product_id = data['product_id']
+        product_id = int(data['product_id'])
         quantity = int(data.get('quantity', 1))
         
         if quantity <= 0:
             return jsonify({'error': 'Quantity must be positive'}), 400
         
-        # Check if product exists and has enough stock
-        product = Product.query.get(product_id)
-        if not product:
-            return jsonify({'error': 'Product not found'}), 404
-        
-        cart = get_or_create_cart(user_id)
-        
-        # Check if product already in cart
-        existing_item = next((item for item in cart.items if item.product_id == product_id), None)
-        
-        if existing_item:
-            # Update quantity
-            new_quantity = existing_item.quantity + quantity
-            if product.stock_quantity < new_quantity:
-                return jsonify({
-                    'error': f'Only {product.stock_quantity} items available',
-                    'available_stock': product.stock_quantity
-                }), 400
-            existing_item.quantity = new_quantity
-        else:
-            # Add new item
-            if product.stock_quantity < quantity:
-                return jsonify({
-                    'error': f'Only {product.stock_quantity} items available',
-                    'available_stock': product.stock_quantity
-                }), 400
-            
-            cart_item = CartItem(
-                cart_user_id=user_id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            db.session.add(cart_item)
-        
-        db.session.commit()
-        
-        # Reload cart with updated data
-        cart = get_or_create_cart(user_id)
+        cart = cart_service.add_item(user_id, product_id, quantity, wants_product_details())
         return jsonify({
             'message': 'Product added to cart',
-            'cart': cart.to_dict()
+            'cart': cart
         })
         
+    except CartError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status
     except Exception as e:
         db.session.rollback()
         print(f"Error adding to cart: {str(e)}")
@@ -110,6 +85,7 @@ def add_to_cart():
 
 @cart_bp.route('/update', methods=['PUT', 'OPTIONS'])
 @jwt_required()
+@idempotent
 def update_cart_item():
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
@@ -121,38 +97,21 @@ def update_cart_item():
         if not data or not data.get('product_id') or not data.get('quantity'):
             return jsonify({'error': 'Product ID and quantity are required'}), 400
         
-        product_id = data['product_id']
+        product_id = int(data['product_id'])
         quantity = int(data['quantity'])
         
         if quantity <= 0:
             return jsonify({'error': 'Quantity must be positive'}), 400
         
-        product = Product.query.get(product_id)
-        if not product:
-            return jsonify({'error': 'Product not found'}), 404
-        
-        if product.stock_quantity < quantity:
-            return jsonify({
-                'error': f'Only {product.stock_quantity} items available',
-                'available_stock': product.stock_quantity
-            }), 400
-        
-        cart = get_or_create_cart(user_id)
-        cart_item = next((item for item in cart.items if item.product_id == product_id), None)
-        
-        if not cart_item:
-            return jsonify({'error': 'Product not in cart'}), 404
-        
-        cart_item.quantity = quantity
-        db.session.commit()
-        
-        # Reload cart with updated data
-        cart = get_or_create_cart(user_id)
+        cart = cart_service.update_item(user_id, product_id, quantity, wants_product_details())
         return jsonify({
             'message': 'Cart updated successfully',
-            'cart': cart.to_dict()
+            'cart': cart
         })
         
+    except CartError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status
     except Exception as e:
         db.session.rollback()
         print(f"Error updating cart: {str(e)}")
@@ -160,6 +119,7 @@ def update_cart_item():
 
 @cart_bp.route('/remove/<int:product_id>', methods=['DELETE', 'OPTIONS'])
 @jwt_required()
+@idempotent
 def remove_from_cart(product_id):
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
@@ -167,30 +127,52 @@ def remove_from_cart(product_id):
     try:
         user_id = int(get_jwt_identity())
         
-        cart_item = CartItem.query.filter_by(
-            cart_user_id=user_id, 
-            product_id=product_id
-        ).first()
+        cart = cart_service.remove_item(user_id, product_id, wants_product_details())
+        return jsonify({
+            'message': 'Product removed from cart',
+            'cart': cart
+        })
         
-        if not cart_item:
-            return jsonify({'error': 'Product not found in cart'}), 404
+    except CartError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error removing from cart: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+@cart_bp.route('/batch', methods=['POST', 'OPTIONS'])
+@jwt_required()
+@idempotent
+def batch_cart():
+    """Apply a list of {op: add|update|remove, product_id, quantity} at once"""
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'}), 200
         
-        db.session.delete(cart_item)
-        db.session.commit()
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json()
+        
+        if not data or 'operations' not in data:
+            return jsonify({'error': 'Operations are required'}), 400
         
-        cart = get_or_create_cart(user_id)
+        cart = cart_service.apply_batch(user_id, data['operations'], wants_product_details())
         return jsonify({
-            'message': 'Product removed from cart',
-            'cart': cart.to_dict()
+            'message': 'Cart updated successfully',
+            'cart': cart
         })
         
+    except CartError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status
     except Exception as e:
         db.session.rollback()
-        print(f"Error removing from cart: {str(e)}")
+        print(f"Error applying cart batch: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
 @cart_bp.route('/clear', methods=['DELETE', 'OPTIONS'])
 @jwt_required()
+@idempotent
 def clear_cart():
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
@@ -198,14 +180,10 @@ def clear_cart():
     try:
         user_id = int(get_jwt_identity())
         
-        # Delete all cart items for this user
-        CartItem.query.filter_by(cart_user_id=user_id).delete()
-        db.session.commit()
-        
-        cart = get_or_create_cart(user_id)
+        cart = cart_service.clear(user_id, wants_product_details())
         return jsonify({
             'message': 'Cart cleared successfully',
-            'cart': cart.to_dict()
+            'cart': cart
         })
         
     except Exception as e:
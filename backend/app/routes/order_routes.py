@@ -1,19 +1,37 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.order import Order
-from app.models.order_item import OrderItem
-from app.models.product import Product
-from app.models.user import User
-from app.utils.email_service import send_order_confirmation_email
-from sqlalchemy.orm import joinedload  # Add this import
-import traceback
+from app.services import order_service
+from app.services.order_service import OrderError
+from app.services import checkout_queue, order_stream
+from app.services.checkout_queue import CheckoutQueueError
+from app.utils.conditional import conditional
+from app.utils.idempotency import idempotent
+from app.utils.pagination import PaginationError, parse_limit
 
 order_bp = Blueprint('orders', __name__)
 
+MAX_TICKET_WAIT = 30  # seconds a ticket poll may block
+DEFAULT_ORDERS_PAGE = 20
+MAX_ORDERS_PAGE = 100
+
+def orders_version():
+    """Validator for the current user's order history"""
+    try:
+        user_id = int(get_jwt_identity())
+    except (ValueError, TypeError):
+        return None
+    count, max_id, last_modified = db.session.query(
+        db.func.count(Order.id), db.func.max(Order.id), db.func.max(Order.updated_at)
+    ).filter(Order.user_id == user_id).one()
+    return last_modified, (user_id, count, max_id, last_modified)
+
 @order_bp.route('/', methods=['GET', 'OPTIONS'])
 @jwt_required()
+@conditional(orders_version, private=True)
 def get_user_orders():
+    """Newest-first order summaries; ?include=items embeds line items"""
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
         
@@ -25,30 +43,55 @@ def get_user_orders():
             user_id = int(user_id_str)
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid user identity in token'}), 401
-                    
-        # Check if user exists
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-            
-        # FIX: Use eager loading to avoid N+1 queries
-        orders = Order.query.options(
-            joinedload(Order.order_items)  # Eager load order_items
-        ).filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
         
-        # Manually serialize to avoid relationship issues
-        orders_data = []
-        for order in orders:
-            order_data = order.to_dict()
-            orders_data.append(order_data)
-            
-        return jsonify(orders_data)
+        include_items = 'items' in request.args.get('include', '').split(',')
+        limit = parse_limit(request.args.get('limit'), default=DEFAULT_ORDERS_PAGE,
+                            maximum=MAX_ORDERS_PAGE)
+        orders, next_cursor, total = order_service.list_orders(
+            user_id, limit, cursor=request.args.get('cursor'),
+            status=request.args.get('status'), include_items=include_items
+        )
+        
+        response = jsonify(orders)
+        response.headers['X-Total-Count'] = str(total)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
         
+    except (PaginationError, OrderError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch orders', 'details': str(e)}), 500
 
+def order_version(order_id):
+    """Validator for one of the current user's orders"""
+    try:
+        user_id = int(get_jwt_identity())
+    except (ValueError, TypeError):
+        return None
+    row = db.session.query(Order.status, Order.updated_at).filter(
+        Order.id == order_id, Order.user_id == user_id
+    ).first()
+    if row is None:
+        return None
+    return row.updated_at, (user_id, order_id, row.status, row.updated_at)
+
+@order_bp.route('/<int:order_id>', methods=['GET'])
+@jwt_required()
+@conditional(order_version, private=True)
+def get_order(order_id):
+    """One order with its line items"""
+    try:
+        order = order_service.get_order(int(get_jwt_identity()), order_id)
+        if order is None:
+            return jsonify({'error': 'Order not found'}), 404
+        return jsonify(order.to_dict())
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch order', 'details': str(e)}), 500
+
 @order_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_order():
     try:
         user_id_str = get_jwt_identity()
@@ -62,7 +105,7 @@ def create_order():
         data = request.get_json()
         
         # Validate required fields
-        if not data or not data.get('items'):
+        if not data or not (data.get('items') or data.get('reservation_key')):
             return jsonify({'error': 'Order items are required'}), 422
             
         if not data.get('shipping_address'):
@@ -91,75 +134,114 @@ def create_order():
             # Legacy string format
             shipping_address_str = shipping_address
         
-        # Start transaction
-        db.session.begin_nested()
-        
-        # Calculate total and check stock
-        total_amount = 0
-        order_items = []
-        
-        for item in data['items']:
-            if not item.get('product_id') or not item.get('quantity'):
-                return jsonify({'error': 'Each item must have product_id and quantity'}), 422
-                
-            product = Product.query.get(item['product_id'])
-            if not product:
-                raise Exception(f"Product {item['product_id']} not found")
-            
-            if product.stock_quantity < item['quantity']:
-                raise Exception(f"Insufficient stock for {product.name}")
-            
-            total_amount += product.price * item['quantity']
-            order_items.append({
-                'product': product,
-                'quantity': item['quantity'],
-                'price': product.price,
-                'product_name': product.name
-            })
-        
-        # Create order
-        order = Order(
-            user_id=user_id,
-            total_amount=total_amount,
-            shipping_address=shipping_address_str
+        if not data.get('reservation_key') and checkout_queue.should_queue(
+                order_service.parse_items(data['items'])):
+            # Flash-sale mode: the queue worker places the order in a batch
+            ticket, position = checkout_queue.enqueue(user_id, data['items'], shipping_address_str)
+            response = jsonify({**ticket.to_dict(), 'position': position})
+            response.headers['Location'] = url_for('orders.get_checkout_ticket', ticket_id=ticket.id)
+            return response, 202
+        
+        order_with_items = order_service.create_order(
+            user_id, data.get('items'), shipping_address_str,
+            reservation_key=data.get('reservation_key')
         )
-        db.session.add(order)
-        db.session.flush()  # Get order ID
-        
-        # Create order items and update stock
-        for item_data in order_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data['product'].id,
-                quantity=item_data['quantity'],
-                price=item_data['price'],
-                product_name=item_data['product_name']
-            )
-            db.session.add(order_item)
-            
-            # Update product stock
-            item_data['product'].stock_quantity -= item_data['quantity']
-        
-        db.session.commit()
-        
-        # FIX: Reload the order with eager loading to avoid N+1 in response
-        order_with_items = Order.query.options(
-            joinedload(Order.order_items)
-        ).get(order.id)
-        
-        # Send confirmation email
-        try:
-            user = User.query.get(user_id)
-            if user and user.email:
-                send_order_confirmation_email(user.email, order_with_items)
-        except Exception as email_error:
-            pass
         
         return jsonify({
             'message': 'Order created successfully',
             'order': order_with_items.to_dict()
         }), 201
         
+    except OrderError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status
+    except CheckoutQueueError as e:
+        response = jsonify(e.to_dict())
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+@order_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_orders():
+    """Server-Sent Events feed of status changes to the current user's orders.
+
+    EventSource cannot set headers, so the token may also be passed as
+    ?jwt=. Reconnects resume after the Last-Event-ID header.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+        try:
+            last_event_id = int(last_event_id) if last_event_id is not None else None
+        except ValueError:
+            return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+        events = order_stream.stream(
+            user_id, last_event_id,
+            heartbeat=current_app.config.get('ORDER_STREAM_HEARTBEAT', 15),
+            max_duration=current_app.config.get('ORDER_STREAM_MAX_DURATION', 300)
+        )
+        response = current_app.response_class(events, mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/tickets/<ticket_id>', methods=['GET'])
+@jwt_required()
+def get_checkout_ticket(ticket_id):
+    """Poll a queued checkout; ?wait=N blocks up to N seconds for the outcome"""
+    try:
+        ticket = checkout_queue.get_checkout_queue().get(ticket_id)
+        if ticket is None or ticket.user_id != int(get_jwt_identity()):
+            return jsonify({'error': 'Ticket not found'}), 404
+
+        wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_TICKET_WAIT)
+        if wait:
+            ticket.done.wait(wait)
+        return jsonify(ticket.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/reservations', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_reservation():
+    """Hold stock for a checkout until the order is placed or the hold expires"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json() or {}
+        if not data.get('items'):
+            return jsonify({'error': 'Order items are required'}), 422
+
+        reservation_key, expires_at, quantities = order_service.reserve_items(user_id, data['items'])
+        return jsonify({
+            'reservation_key': reservation_key,
+            'expires_at': expires_at.isoformat(),
+            'items': [{'product_id': pid, 'quantity': qty} for pid, qty in quantities.items()]
+        }), 201
+
+    except OrderError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+@order_bp.route('/reservations/<reservation_key>', methods=['DELETE'])
+@jwt_required()
+def release_reservation(reservation_key):
+    """Give a held checkout's stock back before it expires"""
+    try:
+        order_service.release_items(int(get_jwt_identity()), reservation_key)
+        return jsonify({'message': 'Reservation released'})
+    except OrderError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 400
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400
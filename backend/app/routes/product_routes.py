@@ -1,14 +1,92 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
+from werkzeug.exceptions import NotFound
 from app import db
 from app.models.product import Product
-from app.schemas.product_schema import products_schema, product_schema
+from app.schemas.product_schema import product_schema, products_projection_schema
 from app.utils.permissions import admin_required
 from app.utils.permissions import jwt_required
+from app.utils.pagination import PaginationError, parse_limit, apply_keyset, fetch_page
+from app.utils.image_store import decode_data_uri, get_image_store
+from app.utils.image_variants import VARIANT_FORMATS, variant_key, pick_variant_size, pick_variant_format
+from app.utils.search import search_criterion, search_products
+from app.utils.cache import get_cache
+from app.utils.catalog_cache import CATEGORIES_KEY, CATALOG_VERSION_KEY, product_key
+from app.utils.conditional import conditional
+from app.utils.suggest import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, get_suggestion_index
+from sqlalchemy.orm import load_only
+from io import BytesIO
+from datetime import datetime
+import hashlib
 import traceback
 
 product_bp = Blueprint('products', __name__)
 
+# Columns the listing may be keyset-paginated on
+PRODUCT_SORT_COLUMNS = {
+    'id': Product.id,
+    'created_at': Product.created_at,
+    'price': Product.price
+}
+
+# Fields selectable through ?fields=; image bytes are served by /<id>/image
+PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'price', 'stock_quantity', 'image_url',
+    'category', 'created_at', 'updated_at'
+)
+DEFAULT_PRODUCT_FIELDS = PRODUCT_FIELDS
+
+# One year; image URLs carry the content hash so they never go stale
+IMAGE_MAX_AGE = 31536000
+
+def parse_fields(value):
+    """Parse ?fields=a,b,c into a validated tuple (id always included)"""
+    if not value:
+        return DEFAULT_PRODUCT_FIELDS
+    requested = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in requested if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(f for f in PRODUCT_FIELDS if f == 'id' or f in requested)
+
+def catalog_version(*args, **kwargs):
+    """Validator for catalog-wide responses, hashed from every product's change columns.
+
+    MAX(updated_at) and COUNT(*) are not enough: updated_at has one-second
+    resolution, so a product changed in the same second as the newest one
+    leaves both unchanged. Stock moves far more often than anything else,
+    so it is hashed with the timestamp. The digest is cached until the
+    next product write invalidates CATALOG_VERSION_KEY.
+    """
+    def load_version():
+        digest = hashlib.sha1()
+        last_modified = None
+        rows = db.session.query(Product.id, Product.updated_at, Product.stock_quantity).order_by(Product.id)
+        for product_id, updated_at, stock_quantity in rows.yield_per(1000):
+            digest.update(f'{product_id}:{updated_at}:{stock_quantity};'.encode())
+            if updated_at and (last_modified is None or updated_at > last_modified):
+                last_modified = updated_at
+        return [last_modified.isoformat() if last_modified else None, digest.hexdigest()]
+    
+    version = get_cache().get_or_set(CATALOG_VERSION_KEY, load_version)
+    last_modified = datetime.fromisoformat(version[0]) if version[0] else None
+    return last_modified, tuple(version)
+
+def get_product_payload(product_id):
+    """Serialized product through the read-through cache (404 if missing)"""
+    return get_cache().get_or_set(
+        product_key(product_id),
+        lambda: product_schema.dump(Product.query.get_or_404(product_id))
+    )
+
+def product_version(product_id):
+    """Validator for one product, hashed from its cached payload"""
+    payload = get_product_payload(product_id)
+    updated_at = payload.get('updated_at')
+    # Hash the payload itself: updated_at alone has one-second resolution
+    return (datetime.fromisoformat(updated_at) if updated_at else None), sorted(payload.items())
+
 @product_bp.route('/', methods=['GET', 'OPTIONS'])
+@conditional(catalog_version)
 def get_products():
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
@@ -26,7 +104,7 @@ def get_products():
         if category:
             query = query.filter(Product.category == category)
         if search:
-            query = query.filter(Product.name.ilike(f'%{search}%'))
+            query = query.filter(search_criterion(search))
         if min_price:
             try:
                 query = query.filter(Product.price >= float(min_price))
@@ -38,30 +116,154 @@ def get_products():
             except ValueError:
                 return jsonify({'error': 'Invalid max_price format'}), 400
         
-        products = query.all()
+        # Cheap count path: no ORDER BY, no column payload
+        total = query.with_entities(db.func.count(Product.id)).scalar()
         
-        # Use schema instead of to_dict() for consistency
-        result = products_schema.dump(products)
+        # Keyset pagination and column projection
+        limit = parse_limit(request.args.get('limit'))
+        fields = parse_fields(request.args.get('fields'))
+        sort = request.args.get('sort', 'id')
+        if sort not in PRODUCT_SORT_COLUMNS:
+            return jsonify({'error': f'Invalid sort field: {sort}'}), 400
+        descending = request.args.get('order', 'asc').lower() == 'desc'
+        
+        load_columns = dict.fromkeys(fields + (sort,))
+        if 'image_url' in load_columns:
+            load_columns['image_key'] = None
+        query = query.options(load_only(*[getattr(Product, f) for f in load_columns]))
+        query = apply_keyset(
+            query, PRODUCT_SORT_COLUMNS[sort], Product.id,
+            cursor=request.args.get('cursor'), descending=descending
+        )
+        products, next_cursor = fetch_page(query, limit, sort)
+        
+        result = products_projection_schema(fields).dump(products)
+        
+        response = jsonify(result)
+        response.headers['X-Total-Count'] = str(total)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+        
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@product_bp.route('/search', methods=['GET'])
+def search_catalog():
+    """Relevance-ranked full-text search over name, description and category"""
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        limit = parse_limit(request.args.get('limit'), default=20)
+        fields = parse_fields(request.args.get('fields'))
         
-        return jsonify(result)
+        load_columns = dict.fromkeys(fields)
+        if 'image_url' in load_columns:
+            load_columns['image_key'] = None
+        products = search_products(
+            q, limit=limit,
+            options=(load_only(*[getattr(Product, f) for f in load_columns]),)
+        )
+        return jsonify(products_projection_schema(fields).dump(products))
         
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@product_bp.route('/suggest', methods=['GET'])
+def suggest():
+    """Typeahead over product names and categories, served from memory"""
+    try:
+        limit = parse_limit(request.args.get('limit'), default=DEFAULT_SUGGESTIONS,
+                            maximum=MAX_SUGGESTIONS)
+        prefix = request.args.get('prefix', '')
+        return jsonify(get_suggestion_index().suggest(prefix, limit=limit))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
 @product_bp.route('/<int:product_id>', methods=['GET'])
+@conditional(product_version)
 def get_product(product_id):
     try:
-        product = Product.query.get_or_404(product_id)
-        return jsonify(product_schema.dump(product))
+        return jsonify(get_product_payload(product_id))
+    except NotFound:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@product_bp.route('/<int:product_id>/image', methods=['GET'])
+def get_product_image(product_id):
+    """Stream the product image; ?size=<px> selects a resized variant"""
+    try:
+        product = Product.query.get_or_404(product_id)
+        store = get_image_store()
+        
+        # Sizes above the largest variant are served the original
+        variant_size = None
+        size = request.args.get('size')
+        if size and size != 'original':
+            try:
+                size = int(size)
+            except ValueError:
+                return jsonify({'error': 'Invalid size format'}), 400
+            if size <= 0:
+                return jsonify({'error': 'Size must be positive'}), 400
+            variant_size = pick_variant_size(size)
+        variant_pending = variant_size is not None
+        
+        if product.image_key:
+            etag = product.image_key
+            mimetype = product.image_content_type or 'application/octet-stream'
+            
+            if variant_size:
+                fmt = pick_variant_format(request.headers.get('Accept'))
+                key = variant_key(product.image_key, variant_size, fmt)
+                if store.exists(key):
+                    etag = key
+                    mimetype = VARIANT_FORMATS[fmt][1]
+                    variant_pending = False
+            body = store.open(etag)
+        elif product.image_data:
+            # Legacy row not yet drained into the image store
+            image_data = product.image_data
+            if not image_data.startswith('data:'):
+                image_data = f"data:image/jpeg;base64,{image_data}"
+            data, mimetype = decode_data_uri(image_data)
+            body = BytesIO(data)
+            etag = store.key_for(data)
+        else:
+            return jsonify({'error': 'Product has no image'}), 404
+        
+        response = send_file(body, mimetype=mimetype, etag=etag, conditional=True)
+        response.vary.add('Accept')
+        # Only cache forever when the URL is versioned and we served exactly
+        # what was asked for (not the original standing in for a pending variant)
+        if (product.image_key and not variant_pending
+                and request.args.get('v') == product.image_key[:16]):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMAGE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
+    except FileNotFoundError:
+        return jsonify({'error': 'Image not found in store'}), 404
+
 @product_bp.route('/categories', methods=['GET'])
+@conditional(catalog_version)
 def get_categories():
     try:
-        categories = db.session.query(Product.category).distinct().all()
-        categories = [cat[0] for cat in categories if cat[0]]
-        return jsonify(categories)
+        def load_categories():
+            categories = db.session.query(Product.category).distinct().all()
+            return [cat[0] for cat in categories if cat[0]]
+        
+        return jsonify(get_cache().get_or_set(CATEGORIES_KEY, load_categories))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -109,7 +311,7 @@ def update_product(product_id):
         product.price = float(data.get('price', product.price))
         product.stock_quantity = int(data.get('stock_quantity', product.stock_quantity))
         product.category = data.get('category', product.category)
-        product.image_url = data.get('image_url', product.image_url)
+        product.set_image_url(data.get('image_url', product.image_url))
         
         if data.get('image_data'):
             product.set_image_from_base64(data['image_data'])
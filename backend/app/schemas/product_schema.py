@@ -1,4 +1,5 @@
 # product_schema.py
+from functools import lru_cache
 from app import ma
 from app.models.product import Product
 
@@ -6,14 +7,19 @@ class ProductSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Product
         include_fk = True
+        # Image bytes live in the image store; clients follow image_url
+        exclude = ('image_data', 'image_key', 'image_content_type')
     
-    # Ensure both image fields are included
-    image_url = ma.String()
-    image_data = ma.String()
+    image_url = ma.Method('get_image_url')
     stock_quantity = ma.Integer() 
     
     def get_image_url(self, obj):
         return obj.get_image_url()
 
 product_schema = ProductSchema()
-products_schema = ProductSchema(many=True)
\ No newline at end of file
+products_schema = ProductSchema(many=True)
+
+@lru_cache(maxsize=32)
+def products_projection_schema(fields):
+    """Return a cached many=True schema restricted to the given field tuple"""
+    return ProductSchema(many=True, only=fields)
\ No newline at end of file
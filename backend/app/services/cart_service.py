@@ -0,0 +1,222 @@
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+from app.utils.upsert import upsert, insert_ignore
+
+class CartError(Exception):
+    """A cart mutation that cannot be applied; carries the HTTP status"""
+
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+    def to_dict(self):
+        return {'error': self.message, **self.extra}
+
+BATCH_OPERATIONS = ('add', 'update', 'remove')
+MAX_BATCH_OPERATIONS = 100
+
+def load_cart(user_id, refresh=False):
+    """Load the cart with items and products in one query.
+
+    Returns a transient, empty Cart when the user has none yet so callers
+    can always serialize the result. refresh=True overwrites objects already
+    in the session after a bulk write.
+    """
+    cart = db.session.get(Cart, user_id, options=[
+        joinedload(Cart.items).joinedload(CartItem.product)
+    ], populate_existing=refresh)
+    if cart is None:
+        cart = Cart(user_id=user_id)
+        set_committed_value(cart, 'items', [])
+    return cart
+
+def ensure_cart_row(user_id):
+    """Create the carts row if missing without a read-back"""
+    db.session.execute(insert_ignore(Cart.__table__, {
+        'user_id': user_id,
+        'created_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow()
+    }, ['user_id']))
+
+def _find_item(cart, product_id):
+    return next((item for item in cart.items if item.product_id == product_id), None)
+
+def _check_stock(product, quantity):
+    if product.stock_quantity < quantity:
+        raise CartError(
+            f'Only {product.stock_quantity} items available',
+            available_stock=product.stock_quantity
+        )
+
+def _commit(cart, include_product_details=False):
+    """Serialize from the in-session state, then commit.
+
+    Serializing first means the commit's attribute expiry never forces the
+    cart to be reloaded just to build the response.
+    """
+    payload = cart.to_dict(include_product_details)
+    db.session.commit()
+    return payload
+
+def get_cart(user_id, include_product_details=False):
+    cart = load_cart(user_id)
+    if cart not in db.session:
+        ensure_cart_row(user_id)
+        return _commit(cart, include_product_details)
+    return cart.to_dict(include_product_details)
+
+def add_item(user_id, product_id, quantity, include_product_details=False):
+    """Add quantity of product_id with one upsert statement"""
+    cart = load_cart(user_id)
+    item = _find_item(cart, product_id)
+    product = item.product if item else db.session.get(Product, product_id)
+    if not product:
+        raise CartError('Product not found', 404)
+
+    new_quantity = (item.quantity if item else 0) + quantity
+    _check_stock(product, new_quantity)
+
+    if cart not in db.session:
+        ensure_cart_row(user_id)
+    now = datetime.utcnow()
+    result = db.session.execute(upsert(CartItem.__table__, {
+        'cart_user_id': user_id,
+        'product_id': product_id,
+        'quantity': quantity,
+        'created_at': now,
+        'updated_at': now
+    }, ['cart_user_id', 'product_id'], set_=('updated_at',), increment=('quantity',)))
+
+    # Mirror the write into the loaded objects without marking them dirty
+    if item:
+        set_committed_value(item, 'quantity', new_quantity)
+    else:
+        item = CartItem(id=result.lastrowid or None, cart_user_id=user_id,
+                        product_id=product_id, quantity=quantity)
+        set_committed_value(item, 'product', product)
+        set_committed_value(cart, 'items', list(cart.items) + [item])
+    return _commit(cart, include_product_details)
+
+def update_item(user_id, product_id, quantity, include_product_details=False):
+    """Set the quantity of a product already in the cart"""
+    cart = load_cart(user_id)
+    item = _find_item(cart, product_id)
+    if not item:
+        product = db.session.get(Product, product_id)
+        if not product:
+            raise CartError('Product not found', 404)
+        raise CartError('Product not in cart', 404)
+    _check_stock(item.product, quantity)
+
+    db.session.execute(
+        CartItem.__table__.update()
+        .where(CartItem.id == item.id)
+        .values(quantity=quantity, updated_at=datetime.utcnow())
+    )
+    set_committed_value(item, 'quantity', quantity)
+    return _commit(cart, include_product_details)
+
+def remove_item(user_id, product_id, include_product_details=False):
+    cart = load_cart(user_id)
+    item = _find_item(cart, product_id)
+    if not item:
+        raise CartError('Product not found in cart', 404)
+
+    db.session.execute(CartItem.__table__.delete().where(CartItem.id == item.id))
+    set_committed_value(cart, 'items', [i for i in cart.items if i is not item])
+    return _commit(cart, include_product_details)
+
+def clear(user_id, include_product_details=False):
+    db.session.execute(CartItem.__table__.delete().where(CartItem.cart_user_id == user_id))
+    cart = Cart(user_id=user_id)
+    set_committed_value(cart, 'items', [])
+    return _commit(cart, include_product_details)
+
+
+def _parse_operation(index, operation):
+    """Validate one batch entry and return (op, product_id, quantity)"""
+    if not isinstance(operation, dict):
+        raise CartError('Each operation must be an object', 422, index=index)
+    op = operation.get('op')
+    if op not in BATCH_OPERATIONS:
+        raise CartError(f"op must be one of {', '.join(BATCH_OPERATIONS)}", 422, index=index)
+    try:
+        product_id = int(operation['product_id'])
+        quantity = int(operation.get('quantity', 1 if op == 'add' else 0))
+    except (KeyError, ValueError, TypeError):
+        raise CartError('Each operation needs an integer product_id and quantity', 422, index=index)
+    if op != 'remove' and quantity <= 0:
+        raise CartError('Quantity must be positive', 400, index=index)
+    return op, product_id, quantity
+
+def apply_batch(user_id, operations, include_product_details=False):
+    """Apply add/update/remove operations in order, in one transaction.
+
+    Operations are folded into the final quantity per product in Python,
+    products are validated with one IN query, and the difference from the
+    stored cart is written with at most one upsert and one delete.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise CartError('operations must be a non-empty list', 422)
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise CartError(f'At most {MAX_BATCH_OPERATIONS} operations per batch', 422)
+    parsed = [_parse_operation(i, op) for i, op in enumerate(operations)]
+
+    cart = load_cart(user_id)
+    current = {item.product_id: item.quantity for item in cart.items}
+    products = {item.product_id: item.product for item in cart.items}
+
+    missing = {pid for _, pid, _ in parsed} - set(products)
+    if missing:
+        for product in Product.query.filter(Product.id.in_(missing)):
+            products[product.id] = product
+
+    final = dict(current)
+    for index, (op, product_id, quantity) in enumerate(parsed):
+        if product_id not in products:
+            raise CartError('Product not found', 404, index=index, product_id=product_id)
+        if op == 'add':
+            final[product_id] = final.get(product_id, 0) + quantity
+        elif product_id not in final:
+            raise CartError('Product not in cart', 404, index=index, product_id=product_id)
+        elif op == 'update':
+            final[product_id] = quantity
+        else:
+            del final[product_id]
+
+    for product_id, quantity in final.items():
+        if quantity != current.get(product_id):
+            product = products[product_id]
+            if product.stock_quantity < quantity:
+                raise CartError(
+                    f'Only {product.stock_quantity} items of {product.name} available',
+                    product_id=product_id,
+                    available_stock=product.stock_quantity
+                )
+
+    now = datetime.utcnow()
+    changed = [
+        {'cart_user_id': user_id, 'product_id': pid, 'quantity': qty,
+         'created_at': now, 'updated_at': now}
+        for pid, qty in final.items() if qty != current.get(pid)
+    ]
+    removed = [pid for pid in current if pid not in final]
+
+    if changed or removed:
+        if cart not in db.session:
+            ensure_cart_row(user_id)
+        if changed:
+            db.session.execute(upsert(CartItem.__table__, changed, ['cart_user_id', 'product_id'],
+                                      set_=('quantity', 'updated_at')))
+        if removed:
+            db.session.execute(CartItem.__table__.delete().where(
+                CartItem.cart_user_id == user_id, CartItem.product_id.in_(removed)
+            ))
+        cart = load_cart(user_id, refresh=True)
+    return _commit(cart, include_product_details)
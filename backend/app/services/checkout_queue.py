@@ -0,0 +1,271 @@
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from flask import current_app
+from app import db
+from app.models.product import Product
+from app.services import inventory_service, order_service
+from app.services.order_service import OrderError
+
+# Flash-sale checkout: orders for hot products are queued and a single
+# worker per process places them in batches. Stock for a whole batch is
+# taken with one conditional UPDATE, so the hot products rows see one
+# writer instead of a convoy of request threads waiting on row locks.
+# The memory backend's tickets and admission counts live in that process,
+# so create_app refuses to start it under more than one worker.
+
+class CheckoutQueueError(Exception):
+    """Raised when admission control turns a checkout away"""
+
+    def __init__(self, message, status=503, retry_after=1, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.retry_after = retry_after
+        self.extra = extra
+
+    def to_dict(self):
+        return {'error': self.message, 'retry_after': self.retry_after, **self.extra}
+
+class Ticket:
+    """A queued checkout; clients poll it until it is done or failed"""
+
+    def __init__(self, user_id, items, quantities, shipping_address):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.items = items
+        self.quantities = quantities
+        self.shipping_address = shipping_address
+        self.status = 'queued'
+        self.order = None
+        self.error = None
+        self.error_status = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        data = {'ticket': self.id, 'status': self.status}
+        if self.order is not None:
+            data['order'] = self.order
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+class CheckoutQueue:
+    """Checkout queue interface: FIFO tickets plus per-product admission"""
+
+    def submit(self, ticket):
+        """Enqueue ticket and return its position; raise CheckoutQueueError when full"""
+        raise NotImplementedError
+
+    def take(self, max_items, timeout=None):
+        """Remove and return up to max_items tickets, waiting up to timeout"""
+        raise NotImplementedError
+
+    def get(self, ticket_id):
+        raise NotImplementedError
+
+    def finish(self, ticket, order=None, error=None, status=None):
+        """Record a ticket's outcome and wake anyone waiting on it"""
+        raise NotImplementedError
+
+class MemoryCheckoutQueue(CheckoutQueue):
+    """In-process queue; tickets are only visible to the process that took them"""
+
+    def __init__(self, max_pending_per_product=500, ticket_ttl=600):
+        self.max_pending_per_product = max_pending_per_product
+        self.ticket_ttl = ticket_ttl
+        self._queue = deque()
+        self._tickets = {}
+        self._pending = Counter()  # product_id -> queued or in-flight tickets
+        self._cond = threading.Condition()
+
+    def submit(self, ticket):
+        with self._cond:
+            self._prune()
+            full = [pid for pid in ticket.quantities if self._pending[pid] >= self.max_pending_per_product]
+            if full:
+                raise CheckoutQueueError('Checkout queue is full, please retry shortly', product_ids=full)
+            self._pending.update(ticket.quantities.keys())
+            self._tickets[ticket.id] = ticket
+            self._queue.append(ticket)
+            self._cond.notify()
+            return len(self._queue)
+
+    def take(self, max_items, timeout=None):
+        with self._cond:
+            if not self._queue:
+                self._cond.wait(timeout)
+            batch = []
+            while self._queue and len(batch) < max_items:
+                ticket = self._queue.popleft()
+                ticket.status = 'processing'
+                batch.append(ticket)
+            return batch
+
+    def get(self, ticket_id):
+        with self._cond:
+            return self._tickets.get(ticket_id)
+
+    def finish(self, ticket, order=None, error=None, status=None):
+        with self._cond:
+            if ticket.done.is_set():
+                return
+            self._pending.subtract(ticket.quantities.keys())
+            ticket.order = order
+            ticket.error = error
+            ticket.error_status = status
+            ticket.status = 'failed' if error else 'done'
+            ticket.finished_at = time.monotonic()
+            ticket.done.set()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.ticket_ttl
+        expired = [tid for tid, t in self._tickets.items() if t.finished_at and t.finished_at < cutoff]
+        for tid in expired:
+            del self._tickets[tid]
+
+# Backend name (CHECKOUT_QUEUE_BACKEND) -> factory taking the Flask app
+CHECKOUT_QUEUE_BACKENDS = {
+    'memory': lambda app: MemoryCheckoutQueue(
+        max_pending_per_product=app.config.get('CHECKOUT_QUEUE_MAX_PENDING', 500)
+    )
+}
+
+def get_checkout_queue():
+    """Return the checkout queue for the current app, starting its worker on first use"""
+    app = current_app._get_current_object()
+    queue = app.extensions.get('checkout_queue')
+    if queue is None:
+        backend = app.config.get('CHECKOUT_QUEUE_BACKEND', 'memory')
+        if backend not in CHECKOUT_QUEUE_BACKENDS:
+            raise ValueError(f'Unknown checkout queue backend: {backend}')
+        queue = CHECKOUT_QUEUE_BACKENDS[backend](app)
+        app.extensions['checkout_queue'] = queue
+        if app.config.get('CHECKOUT_QUEUE_WORKER', True):
+            worker = threading.Thread(target=_run_worker, args=(app, queue),
+                                      name='checkout-queue', daemon=True)
+            worker.start()
+            app.extensions['checkout_queue_worker'] = worker
+    return queue
+
+def should_queue(quantities):
+    """Whether a checkout for quantities goes through the queue (CHECKOUT_QUEUE mode)"""
+    mode = current_app.config.get('CHECKOUT_QUEUE', 'off')
+    if mode == 'all':
+        return True
+    if mode == 'hot':
+        hot = current_app.config.get('FLASH_SALE_PRODUCTS') or ()
+        return any(pid in hot for pid in quantities)
+    return False
+
+def enqueue(user_id, items, shipping_address):
+    """Validate a checkout and queue it; returns (ticket, position)"""
+    quantities = order_service.parse_items(items)
+    if not quantities:
+        raise OrderError('Order items are required', 422)
+    ticket = Ticket(user_id, items, quantities, shipping_address)
+    position = get_checkout_queue().submit(ticket)
+    return ticket, position
+
+def process_batch(queue, tickets):
+    """Place the orders for a batch of tickets in one transaction.
+
+    Tickets are admitted in FIFO order against one stock read, the
+    admitted total is taken with one conditional UPDATE, and each order is
+    written through order_service.place_order in its own savepoint. If
+    stock moved outside the queue between the read and the UPDATE, the
+    batch UPDATE's savepoint is rolled back and each order takes its own
+    stock instead.
+    """
+    product_ids = {pid for ticket in tickets for pid in ticket.quantities}
+    products = {
+        pid: (name, stock)
+        for pid, name, stock in db.session.query(Product.id, Product.name, Product.stock_quantity)
+        .filter(Product.id.in_(product_ids))
+    }
+
+    remaining = {pid: stock for pid, (_, stock) in products.items()}
+    admitted, total = [], Counter()
+    for ticket in tickets:
+        missing = [pid for pid in ticket.quantities if pid not in products]
+        short = [pid for pid, qty in ticket.quantities.items()
+                 if pid in products and remaining[pid] < qty]
+        if missing:
+            queue.finish(ticket, error=f"Product {missing[0]} not found", status=400)
+        elif short:
+            names = ', '.join(products[pid][0] for pid in short)
+            queue.finish(ticket, error=f"Insufficient stock for {names}", status=400)
+        else:
+            for pid, qty in ticket.quantities.items():
+                remaining[pid] -= qty
+            total.update(ticket.quantities)
+            admitted.append(ticket)
+    if not admitted:
+        return
+
+    savepoint = db.session.begin_nested()
+    stock_taken = not inventory_service.take_stock(dict(total))
+    if stock_taken:
+        savepoint.commit()
+    else:
+        savepoint.rollback()
+    placed, failed = [], []
+    for ticket in admitted:
+        try:
+            with db.session.begin_nested():
+                order_id = order_service.place_order(
+                    ticket.user_id, ticket.items, ticket.shipping_address, stock_taken=stock_taken
+                )
+            placed.append((ticket, order_id))
+        except OrderError as e:
+            if stock_taken:
+                inventory_service.release_stock(ticket.quantities)
+            failed.append((ticket, e))
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for ticket in admitted:
+            queue.finish(ticket, error='Failed to place order', status=500)
+        raise
+
+    for ticket, e in failed:
+        queue.finish(ticket, error=e.message, status=e.status)
+    if not placed:
+        return
+    orders = {order.id: order for order in order_service.load_orders([oid for _, oid in placed])}
+    for ticket, order_id in placed:
+        queue.finish(ticket, order=orders[order_id].to_dict())
+
+def _process_safely(app, queue, batch):
+    try:
+        process_batch(queue, batch)
+    except Exception as e:
+        app.logger.exception(f"Checkout batch failed: {e}")
+        for ticket in batch:
+            queue.finish(ticket, error='Failed to place order', status=500)
+    finally:
+        db.session.remove()
+
+def drain(queue, batch_size=None):
+    """Process queued tickets until the queue is empty; returns tickets handled"""
+    app = current_app._get_current_object()
+    batch_size = batch_size or app.config.get('CHECKOUT_QUEUE_BATCH_SIZE', 50)
+    handled = 0
+    while True:
+        batch = queue.take(batch_size, timeout=0)
+        if not batch:
+            return handled
+        handled += len(batch)
+        _process_safely(app, queue, batch)
+
+def _run_worker(app, queue):
+    batch_size = app.config.get('CHECKOUT_QUEUE_BATCH_SIZE', 50)
+    with app.app_context():
+        while True:
+            batch = queue.take(batch_size, timeout=1.0)
+            if batch:
+                _process_safely(app, queue, batch)
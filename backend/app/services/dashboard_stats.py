@@ -0,0 +1,126 @@
+import random
+from decimal import Decimal
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from app import db
+from app.models.dashboard_stat import DashboardStat
+from app.models.order import Order
+from app.models.product import Product
+from app.models.user import User
+from app.utils.upsert import upsert
+
+# Counters behind GET /api/admin/stats. ORM inserts and deletes adjust
+# them in the same flush, so a counter commits or rolls back with the
+# rows it counts and the dashboard reads a handful of rows instead of
+# scanning users, products and orders. Core/bulk writes are not seen;
+# `flask stats reconcile` corrects any drift from those.
+
+# Counter name -> (model, summed column or None to count rows)
+STAT_COUNTERS = {
+    'total_users': (User, None),
+    'total_products': (Product, None),
+    'total_orders': (Order, None),
+    'total_revenue': (Order, 'total_amount')
+}
+
+def _contribution(obj, column):
+    if column is None:
+        return 1
+    return Decimal(str(getattr(obj, column) or 0))
+
+def _collect_deltas(session):
+    deltas = {}
+    for name, (model, column) in STAT_COUNTERS.items():
+        delta = 0
+        for obj in session.new:
+            if type(obj) is model:
+                delta += _contribution(obj, column)
+        for obj in session.deleted:
+            if type(obj) is model:
+                delta -= _contribution(obj, column)
+        if column is not None:
+            for obj in session.dirty:
+                if type(obj) is model and obj not in session.deleted:
+                    history = get_history(obj, column)
+                    if history.added and history.deleted:
+                        delta += (Decimal(str(history.added[0] or 0))
+                                  - Decimal(str(history.deleted[0] or 0)))
+        if delta:
+            deltas[name] = delta
+    return deltas
+
+def _slot_count():
+    if has_app_context():
+        return current_app.config.get('DASHBOARD_STAT_SLOTS', 8)
+    return 8
+
+def add_to_counters(deltas, slot=None, session=None):
+    """Add {name: delta} to the counters in session's transaction.
+
+    session defaults to db.session. Names are updated in sorted order so
+    concurrent writers take row locks in the same order.
+    """
+    if slot is None:
+        slot = random.randrange(_slot_count())
+    connection = (db.session if session is None else session).connection()
+    table = DashboardStat.__table__
+    for name in sorted(deltas):
+        connection.execute(upsert(
+            table, {'name': name, 'slot': slot, 'value': deltas[name]},
+            ['name', 'slot'], increment=('value',)
+        ))
+
+@event.listens_for(Session, 'before_flush')
+def _track_changes(session, flush_context, instances):
+    # Deleted rows are still readable here; after the flush they are gone
+    session.info['stat_deltas'] = _collect_deltas(session)
+
+@event.listens_for(Session, 'after_flush')
+def _apply_changes(session, flush_context):
+    deltas = session.info.pop('stat_deltas', None)
+    if deltas:
+        # Write in the transaction of the session being flushed
+        add_to_counters(deltas, session=session)
+
+def read_stats():
+    """Current counter values, summed over their slots"""
+    totals = dict(db.session.query(
+        DashboardStat.name, db.func.sum(DashboardStat.value)
+    ).group_by(DashboardStat.name))
+    return {
+        'total_users': int(totals.get('total_users') or 0),
+        'total_products': int(totals.get('total_products') or 0),
+        'total_orders': int(totals.get('total_orders') or 0),
+        'total_revenue': float(totals.get('total_revenue') or 0)
+    }
+
+def _actual_values():
+    values = {}
+    for name, (model, column) in STAT_COUNTERS.items():
+        aggregate = db.func.sum(getattr(model, column)) if column else db.func.count()
+        values[name] = Decimal(str(db.session.query(aggregate).select_from(model).scalar() or 0))
+    return values
+
+def reconcile():
+    """Correct counter drift from writes the ORM events did not see.
+
+    The true aggregates and the counters are read in one transaction, so
+    under REPEATABLE READ (the InnoDB default) they reflect the same
+    committed writes. The difference is then added like any other delta
+    rather than overwriting the counter, which keeps concurrent increments
+    intact. Returns {name: correction} for the
+    counters that had drifted. The caller commits.
+    """
+    counters = dict(db.session.query(
+        DashboardStat.name, db.func.sum(DashboardStat.value)
+    ).group_by(DashboardStat.name))
+    corrections = {}
+    for name, actual in _actual_values().items():
+        drift = actual - Decimal(str(counters.get(name) or 0))
+        if drift:
+            corrections[name] = drift
+    if corrections:
+        add_to_counters(corrections, slot=0)
+    return corrections
@@ -0,0 +1,202 @@
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.models.stock_reservation import StockReservation
+from app.utils.catalog_cache import invalidate_products_after_commit
+
+# Stock moves only through conditional UPDATEs whose WHERE clause re-checks
+# the invariant, so concurrent checkouts never read-then-write and never
+# hold row locks beyond the single statement. Callers own the commit.
+
+class InventoryError(Exception):
+    """A stock operation that cannot be applied; carries the HTTP status"""
+
+    def __init__(self, message, status=400, short=(), **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.short = list(short)
+        self.extra = extra
+
+    def to_dict(self):
+        return {'error': self.message, **self.extra}
+
+def take_stock(quantities):
+    """Take stock for every line with one compare-and-decrement UPDATE.
+
+    The WHERE clause only matches rows that still have enough stock, so
+    the affected-row count proves availability for all lines at once
+    without a prior SELECT ... FOR UPDATE. Returns the ids that were short.
+    A short result leaves every other line decremented, so the caller must
+    roll back (the transaction or a savepoint around this call) when any are.
+    """
+    if not quantities:
+        return []
+    ordered = db.case(quantities, value=Product.id)
+    result = db.session.execute(
+        Product.__table__.update()
+        .where(Product.id.in_(list(quantities)), Product.stock_quantity >= ordered)
+        .values(stock_quantity=Product.stock_quantity - ordered)
+    )
+    if result.rowcount == len(quantities):
+        invalidate_products_after_commit(quantities)
+        return []
+    # Rare path: find which lines failed so the error can name them
+    short = db.session.query(Product.id).filter(
+        Product.id.in_(list(quantities)), Product.stock_quantity < ordered
+    )
+    return [row[0] for row in short]
+
+def release_stock(quantities):
+    """Give quantities back to stock with one UPDATE"""
+    quantities = {pid: qty for pid, qty in quantities.items() if qty}
+    if not quantities:
+        return
+    returned = db.case(quantities, value=Product.id)
+    db.session.execute(
+        Product.__table__.update()
+        .where(Product.id.in_(list(quantities)))
+        .values(stock_quantity=Product.stock_quantity + returned)
+    )
+    invalidate_products_after_commit(quantities)
+
+def _release_rows(rows):
+    """Flip held rows to released and restock whatever this caller won.
+
+    Each row is flipped with its own conditional UPDATE so a concurrent
+    claim, cancel or sweep of the same row can never restock it twice.
+    """
+    released = {}
+    for row_id, product_id, quantity in rows:
+        result = db.session.execute(
+            StockReservation.__table__.update()
+            .where(StockReservation.id == row_id, StockReservation.status == 'held')
+            .values(status='released')
+        )
+        if result.rowcount:
+            released[product_id] = released.get(product_id, 0) + quantity
+    release_stock(released)
+    return released
+
+def sweep_expired(now=None, product_ids=None, batch_size=500):
+    """Release held reservations past their expiry; returns rows released"""
+    query = db.session.query(
+        StockReservation.id, StockReservation.product_id, StockReservation.quantity
+    ).filter(
+        StockReservation.status == 'held',
+        StockReservation.expires_at <= (now or datetime.utcnow())
+    )
+    if product_ids:
+        query = query.filter(StockReservation.product_id.in_(list(product_ids)))
+    rows = query.order_by(StockReservation.id).limit(batch_size).all()
+    _release_rows(rows)
+    return len(rows)
+
+def reserve(user_id, quantities, ttl=None):
+    """Hold quantities for user_id and return (reservation_key, expires_at).
+
+    Stock is taken up front, so a hold is as good as a sale until it is
+    claimed by an order, released, or reclaimed by the sweeper. Holds that
+    expired but were not swept yet are reclaimed here before giving up.
+    """
+    # The first attempt runs in a savepoint so the lines it did decrement
+    # are put back before the retry takes them again
+    savepoint = db.session.begin_nested()
+    short = take_stock(quantities)
+    if not short:
+        savepoint.commit()
+    else:
+        savepoint.rollback()
+        if sweep_expired(product_ids=short):
+            short = take_stock(quantities)
+    if short:
+        raise InventoryError('Insufficient stock', short=short)
+
+    ttl = ttl or current_app.config.get('RESERVATION_TTL', 900)
+    reservation_key = str(uuid.uuid4())
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+    db.session.execute(StockReservation.__table__.insert(), [
+        {
+            'reservation_key': reservation_key,
+            'user_id': user_id,
+            'product_id': pid,
+            'quantity': qty,
+            'status': 'held',
+            'expires_at': expires_at,
+            'created_at': datetime.utcnow()
+        }
+        for pid, qty in quantities.items()
+    ])
+    return reservation_key, expires_at
+
+def claim_reservation(user_id, reservation_key):
+    """Turn a live hold into committed stock and return {product_id: quantity}.
+
+    One conditional UPDATE claims every row of the hold; if the sweeper or
+    a release got to any of them first the counts differ and the caller
+    must roll back.
+    """
+    rows = db.session.query(StockReservation.product_id, StockReservation.quantity).filter(
+        StockReservation.reservation_key == reservation_key,
+        StockReservation.user_id == user_id
+    ).all()
+    if not rows:
+        raise InventoryError('Reservation not found', 404)
+
+    result = db.session.execute(
+        StockReservation.__table__.update()
+        .where(
+            StockReservation.reservation_key == reservation_key,
+            StockReservation.user_id == user_id,
+            StockReservation.status == 'held',
+            StockReservation.expires_at > datetime.utcnow()
+        )
+        .values(status='committed')
+    )
+    if result.rowcount != len(rows):
+        raise InventoryError('Reservation has expired or was already used', 409)
+
+    quantities = {}
+    for product_id, quantity in rows:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+def attach_order(reservation_key, order_id):
+    db.session.execute(
+        StockReservation.__table__.update()
+        .where(StockReservation.reservation_key == reservation_key)
+        .values(order_id=order_id)
+    )
+
+def release_reservation(user_id, reservation_key):
+    """Release a hold early; returns False when there was nothing to release"""
+    rows = db.session.query(
+        StockReservation.id, StockReservation.product_id, StockReservation.quantity
+    ).filter(
+        StockReservation.reservation_key == reservation_key,
+        StockReservation.user_id == user_id,
+        StockReservation.status == 'held'
+    ).all()
+    return bool(_release_rows(rows))
+
+def cancel_order(order):
+    """Mark order cancelled and put its items back in stock, exactly once.
+
+    The status flip is a conditional UPDATE, so two concurrent cancels of
+    the same order restock it only once.
+    """
+    result = db.session.execute(
+        Order.__table__.update()
+        .where(Order.id == order.id, Order.status != 'cancelled')
+        .values(status='cancelled')
+    )
+    if result.rowcount:
+        lines = db.session.query(OrderItem.product_id, db.func.sum(OrderItem.quantity)).filter(
+            OrderItem.order_id == order.id
+        ).group_by(OrderItem.product_id)
+        release_stock({product_id: int(quantity) for product_id, quantity in lines})
+    return bool(result.rowcount)
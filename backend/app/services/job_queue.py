@@ -0,0 +1,230 @@
+import contextvars
+import importlib
+import json
+import os
+import random
+import socket
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.job import Job
+
+# Jobs are rows in the jobs table, so they survive restarts and are
+# enqueued in the same transaction as the change that caused them.
+# Workers (`flask jobs worker`) claim due rows with a conditional UPDATE,
+# run them on a bounded thread pool, and retry failures with exponential
+# backoff until max_attempts, after which the job is dead-lettered.
+
+class JobError(Exception):
+    """Raised for unknown task names"""
+
+# Task name -> (handler(payload), max_attempts, on_dead(payload) or None)
+TASKS = {}
+
+# (job_id, worker_id) of the job running in this context, for heartbeat()
+_current_job = contextvars.ContextVar('current_job', default=None)
+
+# Modules that register tasks; imported by workers before running jobs
+TASK_MODULES = ('app.utils.email_service', 'app.services.product_import')
+
+def task(name, max_attempts=5, on_dead=None):
+    """Register handler(payload) as the job task called name.
+
+    on_dead(payload), if given, runs once the job is dead-lettered, e.g.
+    to clean up what only a successful run would have removed.
+    """
+    def decorator(f):
+        TASKS[name] = (f, max_attempts, on_dead)
+        return f
+    return decorator
+
+def _load_tasks():
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+
+def enqueue(name, payload=None, queue='default', delay=0, max_attempts=None):
+    """Add a job to the current transaction; it runs once the caller commits"""
+    _load_tasks()
+    if name not in TASKS:
+        raise JobError(f'Unknown job task: {name}')
+    now = datetime.utcnow()
+    job = Job(
+        queue=queue,
+        name=name,
+        payload=json.dumps(payload or {}, separators=(',', ':')),
+        status='queued',
+        attempts=0,
+        max_attempts=max_attempts or TASKS[name][1],
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+        updated_at=now
+    )
+    db.session.add(job)
+    return job
+
+def backoff(attempts):
+    """Seconds to wait before retry number attempts (1-based), with jitter"""
+    base = current_app.config.get('JOBS_BACKOFF_BASE', 10)
+    cap = current_app.config.get('JOBS_BACKOFF_MAX', 3600)
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+def claim(worker_id, limit, queues=('default',)):
+    """Lock up to limit due jobs for worker_id and return their ids.
+
+    Candidates are read without locks; each is then claimed with an
+    UPDATE that re-checks its status, so concurrent workers never run the
+    same job. Jobs left running by a dead worker are reclaimed after
+    JOBS_LOCK_TIMEOUT seconds.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config.get('JOBS_LOCK_TIMEOUT', 600))
+    due = db.or_(
+        db.and_(Job.status == 'queued', Job.run_at <= now),
+        db.and_(Job.status == 'running', Job.locked_at < stale)
+    )
+    candidates = db.session.query(Job.id).filter(Job.queue.in_(queues), due).order_by(
+        Job.run_at, Job.id
+    ).limit(limit * 2).all()
+
+    claimed = []
+    for (job_id,) in candidates:
+        if len(claimed) == limit:
+            break
+        result = db.session.execute(
+            Job.__table__.update()
+            .where(Job.id == job_id, due)
+            .values(status='running', locked_by=worker_id, locked_at=now,
+                    attempts=Job.attempts + 1, updated_at=now)
+        )
+        if result.rowcount:
+            claimed.append(job_id)
+    db.session.commit()
+    return claimed
+
+def heartbeat():
+    """Refresh the lock of the job running in this context; the caller commits.
+
+    Handlers that run longer than JOBS_LOCK_TIMEOUT call this between
+    units of work so claim() does not hand the job to another worker.
+    Returns False when the lock was already lost, in which case the
+    handler should stop. Outside a job it does nothing.
+    """
+    current = _current_job.get()
+    if current is None:
+        return True
+    job_id, worker_id = current
+    now = datetime.utcnow()
+    result = db.session.execute(
+        Job.__table__.update()
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == 'running')
+        .values(locked_at=now, updated_at=now)
+    )
+    return bool(result.rowcount)
+
+def _finish(job_id, worker_id, **values):
+    # Only the worker holding the lock may record the outcome
+    result = db.session.execute(
+        Job.__table__.update()
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == 'running')
+        .values(locked_by=None, locked_at=None, updated_at=datetime.utcnow(), **values)
+    )
+    db.session.commit()
+    return bool(result.rowcount)
+
+def _run_on_dead(job_id, name, payload):
+    on_dead = TASKS[name][2] if name in TASKS else None
+    if on_dead is None:
+        return
+    try:
+        on_dead(json.loads(payload))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception(f"on_dead for job {job_id} ({name}) failed: {e}")
+
+def run_job(job_id, worker_id):
+    """Run one claimed job and record success, retry or dead-letter"""
+    _load_tasks()
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return None
+    name, payload, attempts, max_attempts = job.name, job.payload, job.attempts, job.max_attempts
+    db.session.rollback()
+    context = _current_job.set((job_id, worker_id))
+    try:
+        if name not in TASKS:
+            raise JobError(f'Unknown job task: {name}')
+        TASKS[name][0](json.loads(payload))
+    except Exception as e:
+        db.session.rollback()
+        error = f'{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}'
+        if attempts >= max_attempts:
+            current_app.logger.error(f"Job {job_id} ({name}) dead after {attempts} attempts: {e}")
+            if _finish(job_id, worker_id, status='dead', last_error=error):
+                _run_on_dead(job_id, name, payload)
+            return 'dead'
+        run_at = datetime.utcnow() + timedelta(seconds=backoff(attempts))
+        _finish(job_id, worker_id, status='queued', run_at=run_at, last_error=error)
+        return 'retry'
+    finally:
+        _current_job.reset(context)
+    _finish(job_id, worker_id, status='done', last_error=None)
+    return 'done'
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def work_once(worker=None, limit=10, queues=('default',)):
+    """Claim and run due jobs synchronously; returns {job_id: outcome}"""
+    worker = worker or worker_id()
+    return {job_id: run_job(job_id, worker) for job_id in claim(worker, limit, queues)}
+
+def _run_in_context(app, job_id, worker):
+    with app.app_context():
+        try:
+            return run_job(job_id, worker)
+        finally:
+            db.session.remove()
+
+def run_worker(concurrency=4, queues=('default',), poll_interval=1.0, should_stop=None):
+    """Run jobs on a bounded pool until should_stop() returns True.
+
+    At most concurrency jobs are claimed at a time, so a backlog waits in
+    the table instead of piling up threads in memory.
+    """
+    app = current_app._get_current_object()
+    worker = worker_id()
+    running = set()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='jobs') as executor:
+        while not (should_stop and should_stop()):
+            free = concurrency - len(running)
+            job_ids = claim(worker, free, queues) if free else []
+            db.session.remove()
+            for job_id in job_ids:
+                running.add(executor.submit(_run_in_context, app, job_id, worker))
+            if running:
+                running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED).not_done
+            elif not job_ids:
+                time.sleep(poll_interval)
+
+def requeue_dead(job_ids=None):
+    """Move dead-lettered jobs back to the queue; returns how many moved"""
+    query = Job.__table__.update().where(Job.status == 'dead')
+    if job_ids:
+        query = query.where(Job.id.in_(job_ids))
+    result = db.session.execute(query.values(
+        status='queued', attempts=0, run_at=datetime.utcnow(), updated_at=datetime.utcnow()
+    ))
+    db.session.commit()
+    return result.rowcount
+
+def purge_done(older_than_days=7):
+    """Delete finished jobs older than older_than_days; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = db.session.execute(Job.__table__.delete().where(
+        Job.status == 'done', Job.updated_at < cutoff
+    ))
+    db.session.commit()
+    return result.rowcount
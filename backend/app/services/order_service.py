@@ -0,0 +1,244 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from app import db
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.services import inventory_service
+from app.services.inventory_service import InventoryError
+from app.services.outbox import record_order_placed
+from app.utils.email_service import queue_order_confirmation_email
+from app.utils.pagination import apply_keyset, fetch_page
+
+class OrderError(Exception):
+    """An order that cannot be placed; carries the HTTP status"""
+
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+    def to_dict(self):
+        return {'error': self.message, **self.extra}
+
+def parse_items(items):
+    """Validate order lines and merge them into {product_id: quantity}"""
+    quantities = {}
+    for item in items:
+        if not isinstance(item, dict) or not item.get('product_id') or not item.get('quantity'):
+            raise OrderError('Each item must have product_id and quantity', 422)
+        try:
+            product_id, quantity = int(item['product_id']), int(item['quantity'])
+        except (ValueError, TypeError):
+            raise OrderError('Each item must have product_id and quantity', 422)
+        if quantity <= 0:
+            raise OrderError('Quantity must be positive', 422)
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+def load_products(product_ids):
+    """Fetch every ordered product in one IN query"""
+    products = Product.query.options(
+        load_only(Product.name, Product.price, Product.stock_quantity)
+    ).filter(Product.id.in_(product_ids)).all()
+    found = {product.id: product for product in products}
+    for product_id in product_ids:
+        if product_id not in found:
+            raise OrderError(f"Product {product_id} not found")
+    return found
+
+def reserve_items(user_id, items):
+    """Hold stock for a checkout and return (reservation_key, expires_at, quantities)"""
+    quantities = parse_items(items)
+    if not quantities:
+        raise OrderError('Order items are required', 422)
+    products = load_products(list(quantities))
+    try:
+        reservation_key, expires_at = inventory_service.reserve(user_id, quantities)
+    except InventoryError as e:
+        raise _stock_error(products, e.short)
+    db.session.commit()
+    return reservation_key, expires_at, quantities
+
+def release_items(user_id, reservation_key):
+    if not inventory_service.release_reservation(user_id, reservation_key):
+        raise OrderError('Reservation not found or no longer held', 404)
+    db.session.commit()
+
+def _stock_error(products, short):
+    names = ', '.join(products[pid].name for pid in short if pid in products) or 'ordered products'
+    return OrderError(f"Insufficient stock for {names}")
+
+def place_order(user_id, items, shipping_address, reservation_key=None, stock_taken=False):
+    """Write an order and its items without committing; returns the order id.
+
+    Cost is constant in the number of lines: one product SELECT, one stock
+    UPDATE, one order INSERT and one multi-row order_items INSERT. With a
+    reservation_key the stock was already taken by reserve_items and the
+    hold is claimed instead; items, if given, must match it. stock_taken
+    is for callers that already took stock for items in bulk.
+    """
+    if reservation_key:
+        try:
+            quantities = inventory_service.claim_reservation(user_id, reservation_key)
+        except InventoryError as e:
+            raise OrderError(e.message, e.status)
+        if items and parse_items(items) != quantities:
+            raise OrderError('Items do not match the reservation', 409)
+        products = load_products(list(quantities))
+    else:
+        quantities = parse_items(items or [])
+        if not quantities:
+            raise OrderError('Order items are required', 422)
+        products = load_products(list(quantities))
+
+        if not stock_taken:
+            short = inventory_service.take_stock(quantities)
+            if short:
+                raise _stock_error(products, short)
+
+    total_amount = sum(
+        (Decimal(str(products[pid].price)) * qty for pid, qty in quantities.items()),
+        Decimal('0')
+    )
+    order = Order(
+        user_id=user_id,
+        total_amount=float(total_amount),
+        shipping_address=shipping_address
+    )
+    db.session.add(order)
+    db.session.flush()  # Get order ID
+
+    db.session.execute(insert(OrderItem), [
+        {
+            'order_id': order.id,
+            'product_id': pid,
+            'quantity': qty,
+            'price': products[pid].price,
+            'product_name': products[pid].name
+        }
+        for pid, qty in quantities.items()
+    ])
+    if reservation_key:
+        inventory_service.attach_order(reservation_key, order.id)
+    queue_order_confirmation_email(order.id)
+    record_order_placed(order)
+    return order.id
+
+def load_orders(order_ids):
+    """Load orders with their items in one query"""
+    return Order.query.options(joinedload(Order.order_items)).filter(Order.id.in_(order_ids)).all()
+
+def create_order(user_id, items, shipping_address, reservation_key=None):
+    """Place an order in one transaction and return it with its items loaded"""
+    order_id = place_order(user_id, items, shipping_address, reservation_key=reservation_key)
+    db.session.commit()
+    return load_orders([order_id])[0]
+
+ORDER_STATUSES = ('pending', 'processing', 'shipped', 'delivered', 'cancelled')
+
+def list_orders(user_id, limit, cursor=None, status=None, include_items=False):
+    """Return (orders, next_cursor, total) for one page of a user's history.
+
+    Pages are keyset-paginated newest first by id, which the user_id
+    index serves directly (InnoDB secondary indexes carry the primary
+    key), and item counts come from one grouped aggregate over just that page,
+    so the cost does not grow with the length of the history. Line items
+    are only loaded with include_items.
+    """
+    query = Order.query.filter(Order.user_id == user_id)
+    if status:
+        if status not in ORDER_STATUSES:
+            raise OrderError(f'Invalid status: {status}')
+        query = query.filter(Order.status == status)
+    total = query.with_entities(db.func.count(Order.id)).scalar()
+
+    query = query.options(load_only(
+        Order.status, Order.total_amount, Order.created_at, Order.updated_at,
+        *((Order.user_id, Order.shipping_address) if include_items else ())
+    ))
+    if include_items:
+        query = query.options(selectinload(Order.order_items))
+    query = apply_keyset(query, Order.id, Order.id, cursor=cursor, descending=True)
+    orders, next_cursor = fetch_page(query, limit, 'id')
+    if include_items:
+        return [order.to_dict() for order in orders], next_cursor, total
+
+    counts = {}
+    if orders:
+        counts = {
+            order_id: (count, int(quantity or 0))
+            for order_id, count, quantity in db.session.query(
+                OrderItem.order_id, db.func.count(OrderItem.id), db.func.sum(OrderItem.quantity)
+            ).filter(OrderItem.order_id.in_([order.id for order in orders])).group_by(OrderItem.order_id)
+        }
+    return [order.to_summary_dict(*counts.get(order.id, (0, 0))) for order in orders], next_cursor, total
+
+def get_order(user_id, order_id):
+    """Load one of the user's orders with its items, or None"""
+    return Order.query.options(joinedload(Order.order_items)).filter_by(
+        id=order_id, user_id=user_id
+    ).first()
+
+# Columns the admin console may sort on
+ADMIN_ORDER_SORT_COLUMNS = {
+    'created_at': Order.created_at,
+    'total_amount': Order.total_amount,
+    'id': Order.id
+}
+
+def _parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise OrderError(f'Invalid {name} format')
+
+def search_orders(limit, cursor=None, sort='created_at', descending=True, status=None,
+                  user_id=None, created_from=None, created_to=None, min_total=None):
+    """Return (orders, next_cursor, total) for one filtered page of all orders.
+
+    Filters are applied in SQL and pages are keyset-paginated on the sort
+    column, so a page costs the same at the end of the table as at the
+    start. Status and user filters sorted by created_at are served by the
+    (status, created_at) and (user_id, created_at) indexes. Line items for
+    the page are loaded with one extra IN query instead of a join that
+    multiplies order rows by item count.
+    """
+    if sort not in ADMIN_ORDER_SORT_COLUMNS:
+        raise OrderError(f'Invalid sort field: {sort}')
+
+    query = Order.query
+    if status:
+        if status not in ORDER_STATUSES:
+            raise OrderError(f'Invalid status: {status}')
+        query = query.filter(Order.status == status)
+    if user_id:
+        try:
+            query = query.filter(Order.user_id == int(user_id))
+        except (ValueError, TypeError):
+            raise OrderError('Invalid user_id format')
+    if created_from:
+        query = query.filter(Order.created_at >= _parse_time(created_from, 'created_from'))
+    if created_to:
+        end = _parse_time(created_to, 'created_to')
+        if len(created_to) == 10:
+            # A bare date includes the whole day
+            query = query.filter(Order.created_at < end + timedelta(days=1))
+        else:
+            query = query.filter(Order.created_at <= end)
+    if min_total:
+        try:
+            query = query.filter(Order.total_amount >= float(min_total))
+        except ValueError:
+            raise OrderError('Invalid min_total format')
+    total = query.with_entities(db.func.count(Order.id)).scalar()
+
+    query = apply_keyset(
+        query.options(selectinload(Order.order_items)),
+        ADMIN_ORDER_SORT_COLUMNS[sort], Order.id, cursor=cursor, descending=descending
+    )
+    orders, next_cursor = fetch_page(query, limit, sort)
+    return [order.to_dict() for order in orders], next_cursor, total
@@ -0,0 +1,88 @@
+import json
+import time
+from flask import current_app
+from app.models.outbox_event import OutboxEvent
+from app.utils.model_events import on_commit
+from app.utils.pubsub import get_pubsub
+
+# Outbox events for a user's orders are published to that user's channel
+# as soon as the writing transaction commits, and GET /api/orders/stream
+# relays them as Server-Sent Events. The outbox id doubles as the SSE id,
+# so a reconnecting client sends Last-Event-ID and gets what it missed
+# from the outbox table before going live again.
+
+STREAM_TOPICS = ('order.status_changed',)
+RETRY_MS = 3000  # client reconnect delay sent with every stream
+MAX_BACKLOG = 100
+
+def user_channel(user_id):
+    return f'orders:user:{user_id}'
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {json.dumps(event['payload'])}\n\n"
+
+def missed_events(user_id, last_event_id, limit=MAX_BACKLOG):
+    events = OutboxEvent.query.filter(
+        OutboxEvent.user_id == user_id,
+        OutboxEvent.id > last_event_id,
+        OutboxEvent.topic.in_(STREAM_TOPICS)
+    ).order_by(OutboxEvent.id).limit(limit)
+    return [event.to_dict() for event in events]
+
+def stream(user_id, last_event_id=None, heartbeat=15, max_duration=300):
+    """Return a generator of SSE chunks for user_id's order events.
+
+    The subscription is opened before the backlog query so nothing
+    published in between is lost; duplicates are dropped by id. The
+    generator never touches the database. It ends after max_duration (or
+    when a slow client overflowed its buffer) so the client reconnects
+    with Last-Event-ID instead of holding a worker thread indefinitely.
+    """
+    subscription = get_pubsub().subscribe(user_channel(user_id))
+    try:
+        backlog = missed_events(user_id, last_event_id) if last_event_id is not None else []
+    except Exception:
+        subscription.close()
+        raise
+
+    def generate():
+        last_id = last_event_id or 0
+        deadline = time.monotonic() + max_duration
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            for event in backlog:
+                last_id = event['id']
+                yield format_event(event)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.get(timeout=min(heartbeat, remaining))
+                if subscription.overflowed:
+                    return
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event['id'] > last_id:
+                    last_id = event['id']
+                    yield format_event(event)
+        finally:
+            subscription.close()
+
+    return generate()
+
+def _snapshot(event):
+    if event.topic in STREAM_TOPICS and event.user_id:
+        return event.to_dict()
+    return None
+
+def _publish_events(changes):
+    try:
+        pubsub = get_pubsub()
+        for action, event in changes:
+            if action == 'insert' and event:
+                pubsub.publish(user_channel(event['user_id']), event)
+    except Exception as e:
+        # Live delivery is best effort; clients catch up from the outbox
+        current_app.logger.warning(f"Order event publish failed: {e}")
+
+on_commit(OutboxEvent, _snapshot, _publish_events)
@@ -0,0 +1,207 @@
+import hashlib
+import hmac
+import json
+import random
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models.outbox_event import OutboxDelivery, OutboxEvent
+
+# Transactional outbox: writers add an OutboxEvent to their own
+# transaction, so an event exists if and only if its change committed.
+# A relay (`flask outbox relay`) later publishes unpublished events in
+# batches to the configured sinks. Delivery is tracked per sink: each
+# sink publishes in its own savepoint and records an outbox_deliveries
+# row per event, so a webhook outage does not hold back the email and
+# sales sinks. Only the sinks that failed get the events again, after an
+# exponential backoff. Delivery is at-least-once per sink.
+
+def record_event(topic, aggregate_id, payload, user_id=None):
+    """Add an event to the current transaction; the caller commits"""
+    now = datetime.utcnow()
+    event = OutboxEvent(
+        topic=topic,
+        aggregate_id=aggregate_id,
+        user_id=user_id,
+        payload=json.dumps(payload, separators=(',', ':'), default=str),
+        created_at=now,
+        attempts=0
+    )
+    db.session.add(event)
+    return event
+
+def record_order_placed(order):
+    return record_event('order.placed', order.id, {
+        'order_id': order.id,
+        'user_id': order.user_id,
+        'total_amount': order.total_amount
+    }, user_id=order.user_id)
+
+def record_order_status_change(order, previous_status):
+    return record_event('order.status_changed', order.id, {
+        'order_id': order.id,
+        'user_id': order.user_id,
+        'previous_status': previous_status,
+        'status': order.status
+    }, user_id=order.user_id)
+
+class OutboxSink:
+    """Receives batches of published events as dicts (OutboxEvent.to_dict)"""
+
+    def publish(self, events):
+        raise NotImplementedError
+
+class LogSink(OutboxSink):
+    def publish(self, events):
+        for event in events:
+            current_app.logger.info(f"outbox {event['topic']} #{event['aggregate_id']}: {event['payload']}")
+
+class EmailSink(OutboxSink):
+    """Queues customer emails for status changes.
+
+    The job row is written in the relay's transaction, so an event marked
+    published always has its email job.
+    """
+
+    def publish(self, events):
+        from app.utils.email_service import NOTIFY_STATUSES, queue_order_status_emails
+
+        order_ids = [
+            event['aggregate_id'] for event in events
+            if event['topic'] == 'order.status_changed' and event['payload']['status'] in NOTIFY_STATUSES
+        ]
+        queue_order_status_emails(dict.fromkeys(order_ids))
+
+class SalesRollupSink(OutboxSink):
+    """Applies placed and cancelled orders to the sales rollups.
+
+    Runs in the relay's transaction, so a batch's rollup changes commit
+    exactly when the batch is marked published.
+    """
+
+    def publish(self, events):
+        from app.services.sales_analytics import apply_events
+
+        apply_events(events)
+
+class WebhookSink(OutboxSink):
+    """POSTs each batch as {"events": [...]} to OUTBOX_WEBHOOK_URL.
+
+    With OUTBOX_WEBHOOK_SECRET set the body is signed with HMAC-SHA256 in
+    the X-Spaising-Signature header.
+    """
+
+    def __init__(self, url, secret=None, timeout=10):
+        self.url = url
+        self.secret = secret
+        self.timeout = timeout
+
+    def publish(self, events):
+        body = json.dumps({'events': events}, separators=(',', ':')).encode()
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        if self.secret:
+            signature = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            request.add_header('X-Spaising-Signature', f'sha256={signature}')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f'Webhook returned {response.status}')
+
+def _webhook_sink(app):
+    if not app.config.get('OUTBOX_WEBHOOK_URL'):
+        raise ValueError('The webhook outbox sink requires OUTBOX_WEBHOOK_URL')
+    return WebhookSink(app.config['OUTBOX_WEBHOOK_URL'], app.config.get('OUTBOX_WEBHOOK_SECRET'))
+
+# Sink name (comma-separated in OUTBOX_SINKS) -> factory taking the Flask app
+OUTBOX_SINKS = {
+    'log': lambda app: LogSink(),
+    'email': lambda app: EmailSink(),
+    'sales': lambda app: SalesRollupSink(),
+    'webhook': _webhook_sink
+}
+
+def get_outbox_sinks():
+    """Return {name: sink} for the current app, creating the sinks on first use"""
+    app = current_app._get_current_object()
+    sinks = app.extensions.get('outbox_sinks')
+    if sinks is None:
+        names = [name.strip() for name in app.config.get('OUTBOX_SINKS', 'log').split(',') if name.strip()]
+        unknown = [name for name in names if name not in OUTBOX_SINKS]
+        if unknown:
+            raise ValueError(f"Unknown outbox sink: {', '.join(unknown)}")
+        sinks = {name: OUTBOX_SINKS[name](app) for name in names}
+        app.extensions['outbox_sinks'] = sinks
+    return sinks
+
+def backoff(attempts):
+    """Seconds to wait before retry number attempts (1-based), with jitter"""
+    base = current_app.config.get('OUTBOX_BACKOFF_BASE', 5)
+    cap = current_app.config.get('OUTBOX_BACKOFF_MAX', 3600)
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+def relay_once(batch_size=100):
+    """Publish one batch of due events; returns how many were fully published.
+
+    Rows are read with FOR UPDATE SKIP LOCKED where the database supports
+    it, so several relays can run without publishing the same batch. Each
+    sink gets only the events it has not received yet. An event that a
+    sink failed on is retried after backoff(attempts) and given up after
+    OUTBOX_MAX_ATTEMPTS; the sinks that did receive it keep their work.
+    """
+    max_attempts = current_app.config.get('OUTBOX_MAX_ATTEMPTS', 10)
+    now = datetime.utcnow()
+    events = OutboxEvent.query.filter(
+        OutboxEvent.published_at.is_(None),
+        OutboxEvent.attempts < max_attempts,
+        db.or_(OutboxEvent.next_attempt_at.is_(None), OutboxEvent.next_attempt_at <= now)
+    ).order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not events:
+        db.session.rollback()
+        return 0
+
+    ids = [event.id for event in events]
+    delivered = set(db.session.query(OutboxDelivery.event_id, OutboxDelivery.sink).filter(
+        OutboxDelivery.event_id.in_(ids)
+    ))
+    failed = {}  # event id -> error from the last sink that failed on it
+    for name, sink in get_outbox_sinks().items():
+        owed = [event for event in events if (event.id, name) not in delivered]
+        if not owed:
+            continue
+        try:
+            with db.session.begin_nested():
+                sink.publish([event.to_dict() for event in owed])
+                db.session.execute(insert(OutboxDelivery), [
+                    {'event_id': event.id, 'sink': name, 'delivered_at': now} for event in owed
+                ])
+        except Exception as e:
+            current_app.logger.warning(
+                f"Outbox sink {name} failed for events {owed[0].id}..{owed[-1].id}: {e}"
+            )
+            failed.update((event.id, f'{name}: {type(e).__name__}: {e}') for event in owed)
+
+    published = [event_id for event_id in ids if event_id not in failed]
+    if published:
+        db.session.execute(
+            OutboxEvent.__table__.update().where(OutboxEvent.id.in_(published))
+            .values(published_at=now, next_attempt_at=None, last_error=None)
+        )
+        db.session.execute(OutboxDelivery.__table__.delete().where(OutboxDelivery.event_id.in_(published)))
+    for event in events:
+        if event.id in failed:
+            event.attempts += 1
+            event.next_attempt_at = now + timedelta(seconds=backoff(event.attempts))
+            event.last_error = failed[event.id]
+    db.session.commit()
+    return len(published)
+
+def run_relay(batch_size=100, poll_interval=1.0, should_stop=None):
+    """Relay continuously until should_stop() returns True"""
+    while not (should_stop and should_stop()):
+        published = relay_once(batch_size)
+        db.session.remove()
+        if published < batch_size:
+            time.sleep(poll_interval)
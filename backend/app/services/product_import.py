@@ -0,0 +1,285 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+from flask import current_app
+from marshmallow import EXCLUDE, ValidationError
+from sqlalchemy import insert, select, update
+from app import db
+from app.models.product import Product
+from app.models.product_import import ProductImport
+from app.services.job_queue import enqueue, heartbeat, task
+from app.utils.catalog_cache import invalidate_products_after_commit
+from app.utils.image_store import get_image_store
+from app.utils.model_events import run_after_commit
+from app.utils.streaming import iter_csv
+from app.utils.validators import product_schema_validator
+
+# Bulk catalog loads. The upload is kept in the blob store and an
+# import_products job validates it with ProductSchema and upserts it a
+# chunk at a time, committing progress with each chunk, so a retried job
+# resumes where the last attempt stopped. A run claims the import with a
+# conditional UPDATE and proves it still holds it before every chunk
+# commit, so a reclaimed job can never process the same upload twice at
+# once. Products have no SKU, so rows are matched to existing products by
+# name, ignoring case. The upload is deleted once the import is done or
+# its job is dead.
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('name', 'description', 'price', 'stock_quantity', 'category', 'image_url')
+# Exports can be fed straight back into an import; id is informational
+EXPORT_FIELDS = ('id',) + IMPORT_FIELDS
+MAX_RECORDED_ERRORS = 100
+
+# Defaults for new products, as POST /api/admin/products applies them
+_INSERT_DEFAULTS = {'description': '', 'image_url': '', 'category': ''}
+
+class ProductImportError(ValueError):
+    """Raised for uploads that cannot be imported at all"""
+
+def iter_rows(stream, fmt):
+    """Yield (row_number, dict) from a binary CSV (with a header) or NDJSON stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for number, row in enumerate(reader, start=1):
+            # Blank cells mean "not given" so optional fields keep their defaults
+            yield number, {k: v for k, v in row.items() if k and v not in (None, '')}
+        return
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else {'_invalid': line.strip()[:100]}
+
+def inspect_upload(data, fmt):
+    """Check an upload before it is queued; returns its row count"""
+    if fmt not in IMPORT_FORMATS:
+        raise ProductImportError(f'Unknown import format: {fmt}')
+    try:
+        if fmt == 'csv':
+            header = next(csv.reader(io.StringIO(data[:65536].decode('utf-8-sig', errors='ignore'))), [])
+            missing = [f for f in ('name', 'price', 'stock_quantity') if f not in header]
+            if missing:
+                raise ProductImportError(f"CSV header is missing: {', '.join(missing)}")
+        total = sum(1 for _ in iter_rows(io.BytesIO(data), fmt))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ProductImportError(f'Unreadable {fmt} upload: {e}')
+    if not total:
+        raise ProductImportError('The upload contains no products')
+    return total
+
+def create_import(user_id, data, fmt):
+    """Store the upload and queue its job in one transaction; the caller commits"""
+    total = inspect_upload(data, fmt)
+    product_import = ProductImport(
+        user_id=user_id,
+        format=fmt,
+        blob_key=get_image_store().put(data),
+        status='queued',
+        total_rows=total,
+        processed_rows=0,
+        created_count=0,
+        updated_count=0,
+        error_count=0,
+        errors='[]',
+        created_at=datetime.utcnow()
+    )
+    db.session.add(product_import)
+    db.session.flush()
+    enqueue('import_products', {'import_id': product_import.id}, max_attempts=3)
+    return product_import
+
+def validate_chunk(rows):
+    """Split [(row_number, dict)] into ({lowercased name: fields}, [errors]); later rows win"""
+    valid, errors = {}, []
+    for number, row in rows:
+        try:
+            if '_invalid' in row:
+                raise ValidationError({'_line': ['Not a JSON object']})
+            fields = product_schema_validator.load(row, unknown=EXCLUDE)
+        except ValidationError as e:
+            errors.append({'row': number, 'errors': e.messages})
+            continue
+        fields['name'] = fields['name'].strip()
+        valid[fields['name'].lower()] = fields
+    return valid, errors
+
+def upsert_chunk(products):
+    """Update products whose name exists and bulk insert the rest.
+
+    products is validate_chunk's {lowercased name: fields}. Returns
+    (created, updated). Core statements bypass the ORM events, so caches
+    and the dashboard counter are maintained here.
+    """
+    from app.services.dashboard_stats import add_to_counters
+
+    # MySQL's default collation already compares case-insensitively and can
+    # use the name index; elsewhere compare lowercased names
+    if db.session.get_bind().dialect.name == 'mysql':
+        match = Product.name.in_([fields['name'] for fields in products.values()])
+    else:
+        match = db.func.lower(Product.name).in_(list(products))
+    existing = {}
+    for product_id, name in db.session.query(Product.id, Product.name).filter(match):
+        existing.setdefault(name.lower(), []).append(product_id)
+
+    updates = [
+        {'id': product_id, **fields}
+        for name, fields in products.items() for product_id in existing.get(name, ())
+    ]
+    inserts = [
+        {**_INSERT_DEFAULTS, **fields}
+        for name, fields in products.items() if name not in existing
+    ]
+    if updates:
+        db.session.execute(update(Product), updates)
+    if inserts:
+        db.session.execute(insert(Product), inserts)
+        add_to_counters({'total_products': len(inserts)})
+    invalidate_products_after_commit([row['id'] for row in updates])
+    run_after_commit(db.session(), _reset_catalog_indexes)
+    return len(inserts), len(updates)
+
+def _reset_catalog_indexes():
+    # The in-process search and typeahead indexes rebuild on next use
+    app = current_app._get_current_object()
+    app.extensions.pop('product_search_index', None)
+    app.extensions.pop('product_suggestion_index', None)
+
+def _claim_import(import_id, run_id):
+    """Mark an import running for run_id; False when it is finished or held by a live run"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config.get('JOBS_LOCK_TIMEOUT', 600))
+    result = db.session.execute(
+        ProductImport.__table__.update()
+        .where(
+            ProductImport.id == import_id,
+            db.or_(
+                ProductImport.status.in_(('queued', 'failed')),
+                db.and_(ProductImport.status == 'running',
+                        db.or_(ProductImport.heartbeat_at.is_(None), ProductImport.heartbeat_at < stale))
+            )
+        )
+        .values(status='running', locked_by=run_id, heartbeat_at=now, last_error=None)
+    )
+    db.session.commit()
+    return bool(result.rowcount)
+
+def _release_import(import_id, run_id, **values):
+    """Update an import only while run_id holds it; the caller commits"""
+    result = db.session.execute(
+        ProductImport.__table__.update()
+        .where(ProductImport.id == import_id, ProductImport.locked_by == run_id,
+               ProductImport.status == 'running')
+        .values(**values)
+    )
+    return bool(result.rowcount)
+
+def run_import(import_id, chunk_size=None):
+    """Process an import from its last committed row to the end.
+
+    Returns False without importing anything when the import is already
+    done or another run holds it, and stops early if another run takes it
+    over (after JOBS_LOCK_TIMEOUT without a heartbeat).
+    """
+    chunk_size = chunk_size or current_app.config.get('PRODUCT_IMPORT_CHUNK_SIZE', 500)
+    run_id = uuid.uuid4().hex
+    if not _claim_import(import_id, run_id):
+        return False
+    try:
+        product_import = db.session.get(ProductImport, import_id)
+        blob_key = product_import.blob_key
+        with get_image_store().open(blob_key) as f:
+            rows = iter_rows(f, product_import.format)
+            # Rows before processed_rows were committed by an earlier attempt
+            next(islice(rows, product_import.processed_rows, product_import.processed_rows), None)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                valid, errors = validate_chunk(chunk)
+                created, updated = upsert_chunk(valid) if valid else (0, 0)
+
+                recorded = json.loads(product_import.errors)
+                recorded.extend(errors[:MAX_RECORDED_ERRORS - len(recorded)])
+                product_import.errors = json.dumps(recorded)
+                product_import.processed_rows += len(chunk)
+                product_import.created_count += created
+                product_import.updated_count += updated
+                product_import.error_count += len(errors)
+                # Keep both locks fresh, and commit only while this run holds them
+                if not (_release_import(import_id, run_id, heartbeat_at=datetime.utcnow()) and heartbeat()):
+                    db.session.rollback()
+                    current_app.logger.warning(f"Product import {import_id} was taken over; stopping this run")
+                    return False
+                db.session.commit()
+
+        done = _release_import(import_id, run_id, status='done', finished_at=datetime.utcnow(), locked_by=None)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        _release_import(import_id, run_id, status='failed', locked_by=None, last_error=f'{type(e).__name__}: {e}')
+        db.session.commit()
+        raise
+    if done:
+        discard_upload(blob_key)
+    return done
+
+def discard_upload(blob_key):
+    """Delete an upload from the blob store unless something still needs it.
+
+    The store is content-addressed, so an identical file uploaded for
+    another import, or used as a product image, shares the key.
+    """
+    in_use = db.session.query(ProductImport.id).filter(
+        ProductImport.blob_key == blob_key,
+        ProductImport.status.in_(('queued', 'running', 'failed'))
+    ).first() or db.session.query(Product.id).filter(Product.image_key == blob_key).first()
+    if not in_use:
+        get_image_store().delete(blob_key)
+
+def _import_dead(payload):
+    product_import = db.session.get(ProductImport, payload['import_id'])
+    if product_import is None or product_import.status == 'done':
+        return
+    product_import.status = 'dead'
+    product_import.locked_by = None
+    product_import.finished_at = datetime.utcnow()
+    blob_key = product_import.blob_key
+    db.session.commit()
+    discard_upload(blob_key)
+
+@task('import_products', max_attempts=3, on_dead=_import_dead)
+def import_products_job(payload):
+    """Run a queued product import; a failed attempt resumes on retry"""
+    run_import(payload['import_id'])
+
+def export_products(fmt='csv', chunk_size=500):
+    """Yield the catalog as CSV or NDJSON text, one piece per chunk of rows"""
+    if fmt not in IMPORT_FORMATS:
+        raise ProductImportError(f'Unknown export format: {fmt}')
+    query = select(*[getattr(Product, field) for field in EXPORT_FIELDS]).order_by(Product.id)
+
+    def chunks():
+        result = db.session.execute(query.execution_options(stream_results=True, yield_per=chunk_size))
+        try:
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+        finally:
+            result.close()
+
+    if fmt == 'csv':
+        return iter_csv(chunks(), EXPORT_FIELDS)
+    dumps = current_app.json.dumps
+    return (
+        ''.join(dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in rows)
+        for rows in chunks()
+    )
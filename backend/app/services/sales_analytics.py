@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from app import db
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.outbox_event import OutboxDelivery, OutboxEvent
+from app.models.product import Product
+from app.models.sales_rollup import SalesRollup
+from app.utils.upsert import upsert
+
+# Hourly and daily sales rollups for the whole store, each product and
+# each category. They are maintained by the 'sales' outbox sink: every
+# order.placed event adds an order to its buckets and a cancellation
+# takes it back out, in the relay's transaction, so checkouts never
+# contend on the shared per-hour rows. The rollups are therefore only as
+# current as the relay: they lag it while it runs, miss orders whose
+# events it gave up on after OUTBOX_MAX_ATTEMPTS, and stop moving when it
+# is not running. `flask analytics backfill` rebuilds whole days from
+# orders/order_items and is the way to repair them.
+
+GRANULARITIES = ('hour', 'day', 'week')
+STORED_GRANULARITIES = ('hour', 'day')
+DIMENSIONS = ('all', 'product', 'category')
+
+# Default window per granularity when ?from is not given
+DEFAULT_RANGES = {
+    'hour': timedelta(hours=48),
+    'day': timedelta(days=30),
+    'week': timedelta(weeks=12)
+}
+MAX_BUCKETS = 2000
+
+class AnalyticsError(ValueError):
+    """Raised for invalid analytics parameters or an unsafe backfill"""
+
+def bucket_start(moment, granularity):
+    """Truncate moment to the start of its hour, day or (Monday) week"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+def _step(granularity):
+    return {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}[granularity]
+
+def _load_orders(order_ids):
+    """Return [(order, [(product_id, category, quantity, price), ...])]"""
+    if not order_ids:
+        return []
+    orders = Order.query.filter(Order.id.in_(order_ids)).all()
+    lines = {}
+    for order_id, product_id, category, quantity, price in db.session.query(
+        OrderItem.order_id, OrderItem.product_id, Product.category, OrderItem.quantity, OrderItem.price
+    ).outerjoin(Product, Product.id == OrderItem.product_id).filter(OrderItem.order_id.in_(order_ids)):
+        lines.setdefault(order_id, []).append((product_id, category, quantity, price))
+    return [(order, lines.get(order.id, [])) for order in orders]
+
+def _add_order(deltas, order, lines, sign=1):
+    """Accumulate one order's contribution into deltas[(granularity, dimension, key, bucket)]"""
+    created_at = order.created_at or datetime.utcnow()
+    units = sum(quantity for _, _, quantity, _ in lines)
+    contributions = [('all', '', units, Decimal(str(order.total_amount or 0)))]
+    categories = {}
+    for product_id, category, quantity, price in lines:
+        revenue = Decimal(str(price or 0)) * quantity
+        contributions.append(('product', str(product_id), quantity, revenue))
+        if category:
+            total = categories.setdefault(category, [0, Decimal('0')])
+            total[0] += quantity
+            total[1] += revenue
+    contributions.extend(('category', category, q, r) for category, (q, r) in categories.items())
+
+    for granularity in STORED_GRANULARITIES:
+        bucket = bucket_start(created_at, granularity)
+        for dimension, key, quantity, revenue in contributions:
+            row = deltas.setdefault((granularity, dimension, key, bucket), [0, 0, Decimal('0')])
+            row[0] += sign
+            row[1] += sign * quantity
+            row[2] += sign * revenue
+
+def apply_deltas(deltas):
+    """Add deltas to the rollup rows in the current transaction.
+
+    Keys are written in sorted order so concurrent writers lock rows in
+    the same order.
+    """
+    table = SalesRollup.__table__
+    for key in sorted(deltas):
+        order_count, units, revenue = deltas[key]
+        if not (order_count or units or revenue):
+            continue
+        granularity, dimension, dimension_key, bucket = key
+        db.session.execute(upsert(table, {
+            'granularity': granularity,
+            'dimension': dimension,
+            'dimension_key': dimension_key,
+            'bucket': bucket,
+            'order_count': order_count,
+            'units': units,
+            'revenue': revenue
+        }, ['granularity', 'dimension', 'dimension_key', 'bucket'],
+            increment=('order_count', 'units', 'revenue')))
+
+def apply_events(events):
+    """Roll placed orders in and cancelled orders out (outbox event dicts)"""
+    signs = {}
+    for event in events:
+        if event['topic'] == 'order.placed':
+            signs[event['aggregate_id']] = signs.get(event['aggregate_id'], 0) + 1
+        elif (event['topic'] == 'order.status_changed' and event['payload']['status'] == 'cancelled'
+              and event['payload']['previous_status'] != 'cancelled'):
+            signs[event['aggregate_id']] = signs.get(event['aggregate_id'], 0) - 1
+
+    deltas = {}
+    for order, lines in _load_orders([order_id for order_id, sign in signs.items() if sign]):
+        _add_order(deltas, order, lines, signs[order.id])
+    apply_deltas(deltas)
+
+def backfill(start, end, chunk_size=1000):
+    """Rebuild the rollups for the whole days in [start, end) from the orders.
+
+    Refuses while order events are still waiting for the sales sink,
+    since those would be counted again when published. Events the relay
+    gave up on (OUTBOX_MAX_ATTEMPTS) do not block it: their orders are
+    counted from the tables here, so they must not be re-queued for the
+    sales sink afterwards. The caller commits; returns the number of
+    orders rolled up.
+    """
+    start, end = bucket_start(start, 'day'), bucket_start(end, 'day')
+    if end <= start:
+        raise AnalyticsError('Backfill range must cover at least one whole day')
+    delivered = db.session.query(OutboxDelivery.event_id).filter(
+        OutboxDelivery.event_id == OutboxEvent.id, OutboxDelivery.sink == 'sales'
+    ).exists()
+    pending = OutboxEvent.query.filter(
+        OutboxEvent.published_at.is_(None),
+        OutboxEvent.attempts < current_app.config.get('OUTBOX_MAX_ATTEMPTS', 10),
+        OutboxEvent.topic.in_(('order.placed', 'order.status_changed')),
+        ~delivered
+    ).count()
+    if pending:
+        raise AnalyticsError(f'{pending} order events are waiting for the outbox relay; publish them first')
+
+    SalesRollup.query.filter(SalesRollup.bucket >= start, SalesRollup.bucket < end).delete(
+        synchronize_session=False
+    )
+    query = Order.query.with_entities(Order.id).filter(
+        Order.created_at >= start, Order.created_at < end, Order.status != 'cancelled'
+    ).order_by(Order.id)
+    count, last_id = 0, 0
+    while True:
+        ids = [row.id for row in query.filter(Order.id > last_id).limit(chunk_size)]
+        if not ids:
+            return count
+        deltas = {}
+        for order, lines in _load_orders(ids):
+            _add_order(deltas, order, lines)
+        apply_deltas(deltas)
+        count += len(ids)
+        last_id = ids[-1]
+
+def _parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise AnalyticsError(f'Invalid {name} format')
+
+def sales_series(granularity='day', start=None, end=None, product_id=None, category=None):
+    """Revenue, order count, units and average order value per bucket.
+
+    Every bucket between start and end is returned, empty ones as zeros.
+    Hour buckets read the hourly rollup; day and week buckets read the
+    daily one.
+    """
+    if granularity not in GRANULARITIES:
+        raise AnalyticsError(f'Invalid granularity: {granularity}')
+    end = _parse_time(end, 'to') if end else datetime.utcnow()
+    start = _parse_time(start, 'from') if start else end - DEFAULT_RANGES[granularity]
+    first = bucket_start(start, granularity)
+    if end <= first:
+        raise AnalyticsError('from must be before to')
+    if (end - first) / _step(granularity) > MAX_BUCKETS:
+        raise AnalyticsError(f'Range spans more than {MAX_BUCKETS} buckets; use a coarser granularity')
+
+    if product_id and category:
+        raise AnalyticsError('Filter by product_id or category, not both')
+    if product_id:
+        try:
+            dimension, key = 'product', str(int(product_id))
+        except (ValueError, TypeError):
+            raise AnalyticsError('Invalid product_id format')
+    elif category:
+        dimension, key = 'category', category
+    else:
+        dimension, key = 'all', ''
+
+    rows = SalesRollup.query.with_entities(
+        SalesRollup.bucket, SalesRollup.order_count, SalesRollup.units, SalesRollup.revenue
+    ).filter(
+        SalesRollup.granularity == ('hour' if granularity == 'hour' else 'day'),
+        SalesRollup.dimension == dimension,
+        SalesRollup.dimension_key == key,
+        SalesRollup.bucket >= first,
+        SalesRollup.bucket < end
+    )
+    totals = {}
+    for bucket, order_count, units, revenue in rows:
+        total = totals.setdefault(bucket_start(bucket, granularity), [0, 0, Decimal('0')])
+        total[0] += order_count
+        total[1] += units
+        total[2] += Decimal(str(revenue))
+
+    series = []
+    bucket = first
+    while bucket < end:
+        order_count, units, revenue = totals.get(bucket, (0, 0, Decimal('0')))
+        series.append({
+            'bucket': bucket.isoformat(),
+            'revenue': float(revenue),
+            'order_count': order_count,
+            'units': units,
+            'average_order_value': round(float(revenue) / order_count, 2) if order_count else 0.0
+        })
+        bucket += _step(granularity)
+    return series
@@ -5,6 +5,9 @@ from app.models.user import User
 from app.models.product import Product
 from app.models.order import Order
 from app.models.order_item import OrderItem
+from app.models.job import Job
+from app.models.outbox_event import OutboxEvent
+from app.services import outbox
 
 class AdminTestCase(unittest.TestCase):
     """Test case for admin endpoints"""
@@ -109,6 +112,35 @@ class AdminTestCase(unittest.TestCase):
         self.assertIsInstance(data, list)
         self.assertEqual(len(data), 2)
     
+    def test_admin_listings_stream_json_and_ndjson(self):
+        """Test admin listings stream in chunks as a JSON array or NDJSON"""
+        from unittest import mock
+        from app.routes import admin_routes
+        with self.app.app_context():
+            db.session.add_all([Product(name=f'Bulk {i}', price=1.0 + i, stock_quantity=i) for i in range(5)])
+            db.session.commit()
+        headers = self.get_admin_headers()
+        
+        with mock.patch.object(admin_routes, 'STREAM_CHUNK_SIZE', 2):
+            response = self.client.get('/api/admin/products', headers=headers)
+            self.assertTrue(response.is_streamed)
+            self.assertEqual(response.mimetype, 'application/json')
+            data = json.loads(response.data)
+            self.assertEqual([p['name'] for p in data[2:]], [f'Bulk {i}' for i in range(5)])
+            
+            response = self.client.get('/api/admin/users',
+                                       headers={**headers, 'Accept': 'application/x-ndjson'})
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            lines = response.get_data(as_text=True).splitlines()
+            self.assertEqual([json.loads(line)['email'] for line in lines], ['admin@test.com', 'user@test.com'])
+            self.assertNotIn('password_hash', lines[0])
+        
+        with self.app.app_context():
+            Product.query.delete()
+            db.session.commit()
+        response = self.client.get('/api/admin/products', headers=headers)
+        self.assertEqual(json.loads(response.data), [])
+    
     def test_admin_create_product(self):
         """Test admin POST /api/admin/products"""
         headers = self.get_admin_headers()
@@ -151,6 +183,44 @@ class AdminTestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data['product']['name'], 'Updated Product Name')
         self.assertEqual(data['product']['price'], 49.99)
+
+    def test_update_product_ignores_served_image_url(self):
+        """Echoing the served image URL back must not pin it as an external URL"""
+        import base64
+        import tempfile
+        headers = self.get_admin_headers()
+        data_uri = 'data:image/png;base64,' + base64.b64encode(b'\x89PNG\r\n\x1a\nfake').decode()
+
+        with tempfile.TemporaryDirectory() as store_path:
+            self.app.config['IMAGE_STORE_PATH'] = store_path
+            response = self.client.put(
+                f'/api/admin/products/{self.product_ids[0]}',
+                data=json.dumps({'image_data': data_uri}),
+                content_type='application/json',
+                headers=headers
+            )
+            product = json.loads(response.data)['product']
+
+            for url in (f'/api/admin/products/{self.product_ids[0]}',
+                        f'/api/products/{self.product_ids[0]}'):
+                product['name'] = 'Renamed'
+                response = self.client.put(
+                    url, data=json.dumps(product),
+                    content_type='application/json', headers=headers
+                )
+                self.assertEqual(response.status_code, 200)
+
+            with self.app.app_context():
+                self.assertIsNone(db.session.get(Product, self.product_ids[0]).image_url)
+
+            response = self.client.put(
+                f'/api/admin/products/{self.product_ids[0]}',
+                data=json.dumps({'image_url': 'https://cdn.example.com/a.png'}),
+                content_type='application/json',
+                headers=headers
+            )
+            self.assertEqual(json.loads(response.data)['product']['image_url'],
+                             'https://cdn.example.com/a.png')
     
     def test_admin_delete_product(self):
         """Test admin DELETE /api/admin/products/<id>"""
@@ -187,6 +257,53 @@ class AdminTestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIsInstance(data, list)
     
+    def test_admin_orders_filter_sort_and_page(self):
+        """Test admin order listing filters in SQL and pages with a cursor"""
+        from datetime import datetime
+        with self.app.app_context():
+            for day, (user_id, status, total) in enumerate([
+                (self.regular_user_id, 'pending', 10.0),
+                (self.regular_user_id, 'shipped', 50.0),
+                (self.admin_user_id, 'shipped', 75.0),
+                (self.regular_user_id, 'shipped', 120.0),
+            ], start=1):
+                order = Order(user_id=user_id, status=status, total_amount=total,
+                              shipping_address='1 Main St', created_at=datetime(2026, 3, day, 12))
+                db.session.add(order)
+                db.session.flush()
+                db.session.add(OrderItem(order_id=order.id, product_id=self.product_ids[0],
+                                         quantity=1, price=total, product_name='Item'))
+            db.session.commit()
+        
+        headers = self.get_admin_headers()
+        response = self.client.get('/api/admin/orders?status=shipped&limit=2', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Total-Count'], '3')
+        page = json.loads(response.data)
+        self.assertEqual([o['total_amount'] for o in page], [120.0, 75.0])
+        self.assertEqual(len(page[0]['order_items']), 1)
+        
+        response = self.client.get(
+            f"/api/admin/orders?status=shipped&limit=2&cursor={response.headers['X-Next-Cursor']}",
+            headers=headers
+        )
+        self.assertEqual([o['total_amount'] for o in json.loads(response.data)], [50.0])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+        
+        response = self.client.get(
+            f'/api/admin/orders?user_id={self.regular_user_id}&created_from=2026-03-02'
+            '&created_to=2026-03-04&min_total=20&sort=total_amount&order=asc',
+            headers=headers
+        )
+        self.assertEqual([o['total_amount'] for o in json.loads(response.data)], [50.0, 120.0])
+        
+        response = self.client.get('/api/admin/orders?created_to=2026-03-01', headers=headers)
+        self.assertEqual([o['total_amount'] for o in json.loads(response.data)], [10.0])
+        
+        for query in ('status=lost', 'sort=email', 'created_from=yesterday', 'min_total=abc'):
+            response = self.client.get(f'/api/admin/orders?{query}', headers=headers)
+            self.assertEqual(response.status_code, 400, query)
+    
     def test_admin_get_dashboard_stats(self):
         """Test admin GET /api/admin/stats"""
         headers = self.get_admin_headers()
@@ -199,6 +316,50 @@ class AdminTestCase(unittest.TestCase):
         self.assertIn('total_orders', data)
         self.assertIn('total_revenue', data)
     
+    def test_dashboard_stats_are_maintained_and_reconciled(self):
+        """Test stats track ORM writes and reconcile fixes bulk-write drift"""
+        from app.models.dashboard_stat import DashboardStat
+        from app.services import dashboard_stats
+        headers = self.get_admin_headers()
+        with self.app.app_context():
+            orders = [Order(user_id=self.regular_user_id, total_amount=total, shipping_address='1 Main St')
+                      for total in (10.25, 30.0, 5.5)]
+            db.session.add_all(orders)
+            db.session.commit()
+            orders[1].total_amount = 40.0
+            db.session.delete(orders[2])
+            db.session.commit()
+            
+            # A rolled back write leaves the counters alone
+            db.session.add(Order(user_id=self.regular_user_id, total_amount=99.0, shipping_address='x'))
+            db.session.flush()
+            db.session.rollback()
+        
+        self.client.delete(f'/api/admin/products/{self.product_ids[0]}', headers=headers)
+        response = self.client.get('/api/admin/stats', headers=headers)
+        self.assertEqual(json.loads(response.data), {
+            'total_users': 2, 'total_products': 1, 'total_orders': 2, 'total_revenue': 50.25
+        })
+        
+        with self.app.app_context():
+            # Core writes bypass the ORM events until reconciliation
+            db.session.execute(User.__table__.insert().values(
+                email='bulk@test.com', password_hash='x', first_name='Bulk', last_name='User'
+            ))
+            db.session.execute(DashboardStat.__table__.delete().where(DashboardStat.name == 'total_orders'))
+            db.session.commit()
+            self.assertEqual(dashboard_stats.read_stats()['total_users'], 2)
+            
+            corrections = dashboard_stats.reconcile()
+            db.session.commit()
+            self.assertEqual(set(corrections), {'total_users', 'total_orders'})
+            self.assertEqual(dashboard_stats.reconcile(), {})
+        
+        response = self.client.get('/api/admin/stats', headers=headers)
+        self.assertEqual(json.loads(response.data), {
+            'total_users': 3, 'total_products': 1, 'total_orders': 2, 'total_revenue': 50.25
+        })
+    
     def test_non_admin_access_denied(self):
         """Test that non-admin users cannot access admin endpoints"""
         headers = self.get_user_headers()
@@ -231,5 +392,352 @@ class AdminTestCase(unittest.TestCase):
             db.session.remove()
             db.drop_all()
 
+    def create_order(self, status='pending'):
+        with self.app.app_context():
+            order = Order(user_id=self.regular_user_id, total_amount=19.99,
+                          status=status, shipping_address='1 Test St')
+            db.session.add(order)
+            db.session.commit()
+            return order.id
+    
+    def test_dashboard_stats_follow_the_flushing_session(self):
+        """Test counter deltas are written in the flushing session's transaction"""
+        from sqlalchemy.orm import Session
+        from app.services import dashboard_stats
+        with self.app.app_context():
+            with Session(db.engine) as session:
+                session.add(Order(user_id=self.regular_user_id, total_amount=12.5, shipping_address='x'))
+                session.flush()
+                self.assertFalse(db.session().in_transaction())
+                session.commit()
+            self.assertEqual(dashboard_stats.read_stats()['total_orders'], 1)
+            self.assertEqual(dashboard_stats.read_stats()['total_revenue'], 12.5)
+
+    def test_update_order_status_writes_outbox_event(self):
+        """Test status changes are recorded in the outbox and relayed"""
+        order_id = self.create_order()
+        headers = self.get_admin_headers()
+        for status in ('processing', 'shipped', 'shipped'):
+            response = self.client.put(
+                f'/api/admin/orders/{order_id}/status',
+                data=json.dumps({'status': status}),
+                content_type='application/json',
+                headers=headers
+            )
+            self.assertEqual(response.status_code, 200)
+        
+        with self.app.app_context():
+            events = OutboxEvent.query.order_by(OutboxEvent.id).all()
+            self.assertEqual([e.to_dict()['payload']['status'] for e in events], ['processing', 'shipped'])
+            self.assertEqual(events[1].to_dict()['payload']['previous_status'], 'processing')
+            self.assertEqual(Job.query.count(), 0)
+            
+            self.app.config['OUTBOX_SINKS'] = 'log,email'
+            self.assertEqual(outbox.relay_once(), 2)
+            self.assertEqual(outbox.relay_once(), 0)
+            # Only the shipped event notifies the customer
+            job = Job.query.one()
+            self.assertEqual((job.name, json.loads(job.payload)), ('send_order_status_emails', {'order_ids': [order_id]}))
+    
+    def test_outbox_relay_retries_failed_batches(self):
+        """Test a failing sink leaves events unpublished for retry"""
+        order_id = self.create_order()
+        with self.app.app_context():
+            db.session.get(Order, order_id).update_status('delivered')
+            db.session.commit()
+            
+            self.app.config.update(OUTBOX_SINKS='webhook', OUTBOX_WEBHOOK_URL='http://127.0.0.1:9/hook')
+            self.assertEqual(outbox.relay_once(), 0)
+            event = OutboxEvent.query.one()
+            self.assertIsNone(event.published_at)
+            self.assertEqual(event.attempts, 1)
+            self.assertIsNotNone(event.last_error)
+
+    def test_outbox_sinks_are_delivered_independently(self):
+        """Test a failing webhook neither blocks nor repeats the email sink"""
+        from datetime import datetime
+        from unittest import mock
+        from app.models.outbox_event import OutboxDelivery
+        order_id = self.create_order()
+        with self.app.app_context():
+            db.session.get(Order, order_id).update_status('shipped')
+            db.session.commit()
+
+            self.app.config.update(OUTBOX_SINKS='email,webhook', OUTBOX_WEBHOOK_URL='http://127.0.0.1:9/hook')
+            self.assertEqual(outbox.relay_once(), 0)
+            self.assertEqual(Job.query.count(), 1)
+            event = OutboxEvent.query.one()
+            self.assertEqual(event.attempts, 1)
+            self.assertGreater(event.next_attempt_at, datetime.utcnow())
+            self.assertIn('webhook', event.last_error)
+
+            # Backed off: an immediate relay does not retry it
+            self.assertEqual(outbox.relay_once(), 0)
+            self.assertEqual(OutboxEvent.query.one().attempts, 1)
+
+            OutboxEvent.query.update({'next_attempt_at': datetime.utcnow()})
+            db.session.commit()
+            with mock.patch.object(outbox.WebhookSink, 'publish') as publish:
+                self.assertEqual(outbox.relay_once(), 1)
+            publish.assert_called_once()
+            self.assertEqual(Job.query.count(), 1)
+            event = OutboxEvent.query.one()
+            self.assertIsNotNone(event.published_at)
+            self.assertEqual(OutboxDelivery.query.count(), 0)
+
+    def test_sales_analytics_rollups(self):
+        """Test rollups follow placed/cancelled orders and backfill rebuilds them"""
+        from datetime import datetime, timedelta
+        from app.models.sales_rollup import SalesRollup
+        from app.services import order_service, sales_analytics
+        headers = self.get_admin_headers()
+        with self.app.app_context():
+            self.app.config['OUTBOX_SINKS'] = 'sales'
+            first = order_service.create_order(self.regular_user_id, [
+                {'product_id': self.product_ids[0], 'quantity': 2},
+                {'product_id': self.product_ids[1], 'quantity': 1}
+            ], '1 Main St')
+            order_service.create_order(self.regular_user_id, [
+                {'product_id': self.product_ids[0], 'quantity': 1}
+            ], '1 Main St')
+            self.assertEqual(outbox.relay_once(), 2)
+            
+            first.update_status('cancelled')
+            order_service.create_order(self.admin_user_id, [
+                {'product_id': self.product_ids[1], 'quantity': 3}
+            ], '1 Main St')
+            db.session.commit()
+            self.assertEqual(outbox.relay_once(), 2)
+        
+        def fetch(query):
+            response = self.client.get(f'/api/admin/analytics/sales?{query}', headers=headers)
+            self.assertEqual(response.status_code, 200, response.data)
+            return [b for b in json.loads(response.data)['buckets'] if b['order_count']]
+        
+        start = (datetime.utcnow() - timedelta(hours=3)).isoformat()
+        expected = [{'revenue': 109.96, 'order_count': 2, 'units': 4, 'average_order_value': 54.98}]
+        for granularity in ('hour', 'day', 'week'):
+            buckets = fetch(f'granularity={granularity}&from={start}')
+            self.assertEqual([{k: v for k, v in b.items() if k != 'bucket'} for b in buckets], expected)
+        self.assertEqual(fetch(f'granularity=hour&from={start}&category=clothing')[0]['revenue'], 89.97)
+        self.assertEqual(fetch(f'from={start}&product_id={self.product_ids[0]}')[0]['units'], 1)
+        
+        with self.app.app_context():
+            rows = sorted((r.granularity, r.dimension, r.dimension_key, r.order_count, r.units, float(r.revenue))
+                          for r in SalesRollup.query.filter(SalesRollup.order_count != 0))
+            SalesRollup.query.delete()
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            self.assertEqual(sales_analytics.backfill(today, today + timedelta(days=1)), 2)
+            db.session.commit()
+            rebuilt = sorted((r.granularity, r.dimension, r.dimension_key, r.order_count, r.units, float(r.revenue))
+                             for r in SalesRollup.query)
+            self.assertEqual(rebuilt, rows)
+        
+        for query in ('granularity=minute', 'from=soon', 'granularity=hour&from=2000-01-01',
+                      'product_id=1&category=clothing'):
+            response = self.client.get(f'/api/admin/analytics/sales?{query}', headers=headers)
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_sales_backfill_skips_dead_and_delivered_events(self):
+        """Test only events still owed to the sales sink block a backfill"""
+        from datetime import datetime, timedelta
+        from app.services import order_service, sales_analytics
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        with self.app.app_context():
+            self.app.config.update(OUTBOX_SINKS='sales,webhook', OUTBOX_WEBHOOK_URL='http://127.0.0.1:9/hook')
+            order_service.create_order(self.regular_user_id, [
+                {'product_id': self.product_ids[0], 'quantity': 1}
+            ], '1 Main St')
+            with self.assertRaises(sales_analytics.AnalyticsError):
+                sales_analytics.backfill(today, today + timedelta(days=1))
+            db.session.rollback()
+
+            # The webhook failed but the sales sink has the event
+            self.assertEqual(outbox.relay_once(), 0)
+            self.assertEqual(sales_analytics.backfill(today, today + timedelta(days=1)), 1)
+            db.session.rollback()
+
+            # An event the relay gave up on is covered by the backfill itself
+            order_service.create_order(self.regular_user_id, [
+                {'product_id': self.product_ids[1], 'quantity': 1}
+            ], '1 Main St')
+            OutboxEvent.query.filter(OutboxEvent.published_at.is_(None)).update(
+                {'attempts': self.app.config['OUTBOX_MAX_ATTEMPTS']}
+            )
+            self.assertEqual(sales_analytics.backfill(today, today + timedelta(days=1)), 2)
+            db.session.commit()
+
+    def test_export_orders_streams_csv_with_watermark(self):
+        """Test exports stream in chunks and continue from the watermark"""
+        import csv
+        import io
+        from datetime import datetime
+        from app.services.order_export import parquet_available
+        with self.app.app_context():
+            for day in range(1, 6):
+                order = Order(user_id=self.regular_user_id, total_amount=10.0 * day, shipping_address='1 Main St',
+                              created_at=datetime(2026, 3, day), updated_at=datetime(2026, 3, day))
+                db.session.add(order)
+                db.session.flush()
+                db.session.add(OrderItem(order_id=order.id, product_id=self.product_ids[0],
+                                         quantity=day, price=10.0, product_name='Item'))
+            db.session.commit()
+        self.app.config['EXPORT_CHUNK_SIZE'] = 2
+        headers = self.get_admin_headers()
+        
+        response = self.client.get('/api/admin/exports/orders', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers['X-Export-Watermark'], '2026-03-05T00:00:00')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['total_amount'] for row in rows], ['10.0', '20.0', '30.0', '40.0', '50.0'])
+        self.assertEqual(rows[0]['created_at'], '2026-03-01T00:00:00')
+        
+        response = self.client.get('/api/admin/exports/order_items?since=2026-03-04T00:00:00', headers=headers)
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['quantity'] for row in rows], ['4', '5'])
+        
+        response = self.client.get('/api/admin/exports/orders?format=parquet', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        if parquet_available():
+            self.assertEqual(response.data[:4], b'PAR1')
+        else:
+            self.assertEqual(response.mimetype, 'text/csv')
+        
+        for path in ('users', 'orders?format=xml', 'orders?since=yesterday'):
+            response = self.client.get(f'/api/admin/exports/{path}', headers=headers)
+            self.assertEqual(response.status_code, 400, path)
+
+    def test_bulk_product_import_and_export(self):
+        """Test imports upsert by name in chunks with progress, and export round-trips"""
+        import csv
+        import io
+        import tempfile
+        from app.models.product_import import ProductImport
+        from app.services import dashboard_stats, job_queue
+        headers = self.get_admin_headers()
+        upload = (
+            'name,description,price,stock_quantity,category\n'
+            'Admin Test Product 1,Updated,24.5,7,\n'
+            'Lamp,,15,3,home\n'
+            'Broken,,-1,3,home\n'
+            'Rug,First,40,1,home\n'
+            'Rug,Second,45,2,home\n'
+        )
+        with tempfile.TemporaryDirectory() as store_path:
+            self.app.config.update(IMAGE_STORE_PATH=store_path, PRODUCT_IMPORT_CHUNK_SIZE=2)
+            response = self.client.post('/api/admin/products/import', data=upload,
+                                        content_type='text/csv', headers=headers)
+            self.assertEqual(response.status_code, 202, response.data)
+            progress = json.loads(response.data)
+            self.assertEqual((progress['status'], progress['total_rows']), ('queued', 5))
+            
+            with self.app.app_context():
+                self.assertEqual(set(job_queue.work_once().values()), {'done'})
+            progress = json.loads(self.client.get(response.headers['Location'], headers=headers).data)
+            self.assertEqual(
+                {k: progress[k] for k in ('status', 'processed_rows', 'created', 'updated', 'rejected')},
+                {'status': 'done', 'processed_rows': 5, 'created': 2, 'updated': 2, 'rejected': 1}
+            )
+            self.assertEqual(progress['errors'][0]['row'], 3)
+            
+            with self.app.app_context():
+                updated = db.session.get(Product, self.product_ids[0])
+                self.assertEqual((updated.price, updated.stock_quantity, updated.category),
+                                 (24.5, 7, 'electronics'))
+                # Rows split across chunks: the later one updates the earlier insert
+                rug = Product.query.filter_by(name='Rug').one()
+                self.assertEqual((rug.description, rug.price), ('Second', 45.0))
+                self.assertEqual(Product.query.filter_by(name='Lamp').one().description, '')
+                self.assertEqual(dashboard_stats.read_stats()['total_products'], 4)
+            
+            # A retried job resumes after the rows already committed
+            ndjson = b'{"name": "Vase", "price": 9, "stock_quantity": 1}\nnot json\n{"name": "Mat", "price": 5, "stock_quantity": 2}\n'
+            response = self.client.post('/api/admin/products/import',
+                                        data={'file': (io.BytesIO(ndjson), 'catalog.ndjson')},
+                                        content_type='multipart/form-data', headers=headers)
+            self.assertEqual(response.status_code, 202, response.data)
+            import_id = json.loads(response.data)['id']
+            with self.app.app_context():
+                db.session.get(ProductImport, import_id).processed_rows = 1
+                db.session.commit()
+                job_queue.work_once()
+                self.assertIsNone(Product.query.filter_by(name='Vase').first())
+                self.assertIsNotNone(Product.query.filter_by(name='Mat').first())
+                self.assertEqual(db.session.get(ProductImport, import_id).error_count, 1)
+            
+            response = self.client.post('/api/admin/products/import', data='title,cost\nA,1\n',
+                                        content_type='text/csv', headers=headers)
+            self.assertEqual(response.status_code, 400)
+        
+        response = self.client.get('/api/admin/products/export', headers=headers)
+        self.assertTrue(response.is_streamed)
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['name'] for row in rows],
+                         ['Admin Test Product 1', 'Admin Test Product 2', 'Lamp', 'Rug', 'Mat'])
+        self.assertEqual(list(rows[0]), ['id', 'name', 'description', 'price', 'stock_quantity', 'category', 'image_url'])
+        
+        response = self.client.get('/api/admin/products/export?format=ndjson', headers=headers)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 5)
+        self.assertEqual(self.client.get('/api/admin/products/export?format=xml', headers=headers).status_code, 400)
+
+    def test_product_import_runs_are_exclusive(self):
+        """Test one run holds an import at a time and the upload is removed when finished"""
+        import tempfile
+        from datetime import datetime, timedelta
+        from unittest import mock
+        from app.models.product_import import ProductImport
+        from app.services import job_queue, product_import
+        from app.utils.image_store import get_image_store
+        upload = 'name,price,stock_quantity\nadmin test product 2,31,4\nLamp,15,3\n'
+        with tempfile.TemporaryDirectory() as store_path:
+            self.app.config.update(IMAGE_STORE_PATH=store_path, PRODUCT_IMPORT_CHUNK_SIZE=1, JOBS_BACKOFF_BASE=0)
+            with self.app.app_context():
+                def create():
+                    created = product_import.create_import(self.admin_user_id, upload.encode(), 'csv')
+                    db.session.commit()
+                    return created.id, created.blob_key
+                import_id, blob_key = create()
+                store = get_image_store()
+
+                # A live run elsewhere holds the import
+                db.session.get(ProductImport, import_id).status = 'running'
+                db.session.get(ProductImport, import_id).heartbeat_at = datetime.utcnow()
+                db.session.commit()
+                self.assertFalse(product_import.run_import(import_id))
+                self.assertEqual(db.session.get(ProductImport, import_id).processed_rows, 0)
+
+                # Another run takes over after the first chunk: this one stops without committing more
+                upsert_chunk = product_import.upsert_chunk
+                def taken_over(products):
+                    result = upsert_chunk(products)
+                    if db.session.get(ProductImport, import_id).processed_rows:
+                        ProductImport.query.filter_by(id=import_id).update({'locked_by': 'other'})
+                    return result
+                db.session.get(ProductImport, import_id).heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+                db.session.commit()
+                with mock.patch.object(product_import, 'upsert_chunk', side_effect=taken_over):
+                    self.assertFalse(product_import.run_import(import_id))
+                self.assertEqual(db.session.get(ProductImport, import_id).processed_rows, 1)
+
+                # Names match existing products regardless of case
+                db.session.get(ProductImport, import_id).status = 'failed'
+                db.session.commit()
+                self.assertTrue(product_import.run_import(import_id))
+                finished = db.session.get(ProductImport, import_id)
+                self.assertEqual((finished.status, finished.created_count, finished.updated_count), ('done', 1, 1))
+                self.assertEqual(db.session.get(Product, self.product_ids[1]).price, 31.0)
+                self.assertEqual(Product.query.count(), 3)
+                self.assertFalse(store.exists(blob_key))
+
+                # A dead import job marks the import dead and drops its upload
+                import_id, blob_key = create()
+                with mock.patch.object(product_import, 'iter_rows', side_effect=ValueError('boom')):
+                    outcomes = [job_queue.work_once() for _ in range(3)]
+                self.assertEqual(list(outcomes[-1].values()), ['dead'])
+                self.assertEqual(db.session.get(ProductImport, import_id).status, 'dead')
+                self.assertFalse(store.exists(blob_key))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -253,6 +253,144 @@ class CartTestCase(unittest.TestCase):
         
         self.assertEqual(response.status_code, 404)
     
+    def test_add_to_cart_twice_increments_quantity(self):
+        """Test repeated POST /api/cart/add upserts a single line"""
+        headers = self.get_auth_headers()
+        for _ in range(2):
+            response = self.client.post(
+                '/api/cart/add',
+                data=json.dumps({'product_id': self.product_ids[0], 'quantity': 2}),
+                content_type='application/json',
+                headers=headers
+            )
+            self.assertEqual(response.status_code, 200)
+
+        cart = json.loads(response.data)['cart']
+        self.assertEqual(cart['total_items'], 1)
+        self.assertEqual(cart['items'][0]['quantity'], 4)
+        self.assertIsNotNone(cart['items'][0]['id'])
+
+        # The response built from session state matches a fresh read
+        fresh = json.loads(self.client.get('/api/cart', headers=headers).data)
+        self.assertEqual(fresh['items'], cart['items'])
+
+        # Stock is checked against the combined quantity
+        response = self.client.post(
+            '/api/cart/add',
+            data=json.dumps({'product_id': self.product_ids[0], 'quantity': 7}),
+            content_type='application/json',
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['available_stock'], 10)
+    
+    def test_add_to_cart_idempotency_key(self):
+        """Test a retried add with the same Idempotency-Key is applied once"""
+        headers = {**self.get_auth_headers(), 'Idempotency-Key': 'add-1'}
+        responses = [
+            self.client.post(
+                '/api/cart/add',
+                data=json.dumps({'product_id': self.product_ids[0], 'quantity': 2}),
+                content_type='application/json',
+                headers=headers
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertNotIn('Idempotent-Replayed', responses[0].headers)
+        self.assertEqual(responses[1].headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(responses[0].data, responses[1].data)
+
+        cart = json.loads(self.client.get('/api/cart', headers=headers).data)
+        self.assertEqual(cart['items'][0]['quantity'], 2)
+    
+    def test_cart_compact_and_expanded_product(self):
+        """Test cart lines carry a product summary unless details are requested"""
+        headers = self.get_auth_headers()
+        for product_id, quantity in ((self.product_ids[0], 3), (self.product_ids[1], 1)):
+            self.client.post(
+                '/api/cart/add',
+                data=json.dumps({'product_id': product_id, 'quantity': quantity}),
+                content_type='application/json',
+                headers=headers
+            )
+
+        data = json.loads(self.client.get('/api/cart', headers=headers).data)
+        self.assertEqual(
+            set(data['items'][0]['product']),
+            {'id', 'name', 'price', 'stock_quantity', 'image_url'}
+        )
+        # Exact cents: 15.99 * 3 + 25.99
+        self.assertEqual(data['items'][0]['subtotal'], 47.97)
+        self.assertEqual(data['total_amount'], 73.96)
+
+        data = json.loads(self.client.get('/api/cart?include=product_details', headers=headers).data)
+        self.assertEqual(data['items'][0]['product']['category'], 'electronics')
+        self.assertEqual(data['items'][0]['product']['description'], 'Cart Description 1')
+    
+    def test_batch_cart_operations(self):
+        """Test POST /api/cart/batch applies operations in order in one call"""
+        headers = self.get_auth_headers()
+        self.client.post(
+            '/api/cart/add',
+            data=json.dumps({'product_id': self.product_ids[1], 'quantity': 1}),
+            content_type='application/json',
+            headers=headers
+        )
+
+        operations = [
+            {'op': 'add', 'product_id': self.product_ids[0], 'quantity': 2},
+            {'op': 'add', 'product_id': self.product_ids[0], 'quantity': 1},
+            {'op': 'remove', 'product_id': self.product_ids[1]}
+        ]
+        response = self.client.post(
+            '/api/cart/batch',
+            data=json.dumps({'operations': operations}),
+            content_type='application/json',
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        cart = json.loads(response.data)['cart']
+        self.assertEqual(cart['total_items'], 1)
+        self.assertEqual(cart['items'][0]['product_id'], self.product_ids[0])
+        self.assertEqual(cart['items'][0]['quantity'], 3)
+
+        # A failing operation rolls back the whole batch
+        operations = [
+            {'op': 'update', 'product_id': self.product_ids[0], 'quantity': 1},
+            {'op': 'add', 'product_id': 9999, 'quantity': 1}
+        ]
+        response = self.client.post(
+            '/api/cart/batch',
+            data=json.dumps({'operations': operations}),
+            content_type='application/json',
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.data)['index'], 1)
+
+        cart = json.loads(self.client.get('/api/cart', headers=headers).data)
+        self.assertEqual(cart['items'][0]['quantity'], 3)
+    
+    def test_get_cart_conditional(self):
+        """Test GET /api/cart answers 304 until the cart changes"""
+        headers = self.get_auth_headers()
+        response = self.client.get('/api/cart', headers=headers)
+        etag = response.headers['ETag']
+        self.assertIn('private', response.headers['Cache-Control'])
+
+        response = self.client.get('/api/cart', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(
+            '/api/cart/add',
+            data=json.dumps({'product_id': self.product_ids[0], 'quantity': 1}),
+            content_type='application/json',
+            headers=headers
+        )
+        response = self.client.get('/api/cart', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+    
     def tearDown(self):
         with self.app.app_context():
             db.session.remove()
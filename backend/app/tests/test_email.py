@@ -0,0 +1,141 @@
+import socketserver
+import threading
+import unittest
+from email import message_from_bytes
+from app import create_app, db
+from app.models.user import User
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.job import Job
+from app.services import job_queue
+from app.utils.email_service import (
+    SMTPEmailBackend, build_order_confirmation_email, get_email_backend, queue_order_status_emails
+)
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages"""
+
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b'220 localhost test SMTP\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().upper()
+            if command == b'DATA':
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                body = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line == b'.\r\n':
+                        break
+                    body.append(data_line)
+                self.server.messages.append(message_from_bytes(b''.join(body)))
+                self.wfile.write(b'250 OK\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local debugging SMTP server that records what it receives"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connections = 0
+        self.messages = []
+
+class EmailTestCase(unittest.TestCase):
+    """Test case for email rendering and SMTP delivery"""
+
+    def setUp(self):
+        self.smtp = SMTPSink()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+
+        self.app = create_app()
+        self.app.config.update({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'JWT_SECRET_KEY': 'test-secret-key',
+            'EMAIL_BACKEND': 'smtp',
+            'SMTP_SERVER': '127.0.0.1',
+            'SMTP_PORT': self.smtp.server_address[1],
+            'SMTP_USERNAME': None,
+            'SMTP_USE_TLS': False
+        })
+
+        with self.app.app_context():
+            db.create_all()
+            self.order_ids = []
+            for i in range(3):
+                user = User(email=f'customer{i}@test.com', first_name='Mail', last_name='User')
+                user.set_password('password')
+                db.session.add(user)
+                db.session.flush()
+                order = Order(user_id=user.id, total_amount=21.0, status='shipped',
+                              shipping_address='<b>1 Main St</b>, Springfield')
+                db.session.add(order)
+                db.session.flush()
+                db.session.add(OrderItem(order_id=order.id, product_id=1, quantity=2,
+                                         price=10.5, product_name='Bath & Body Set'))
+                self.order_ids.append(order.id)
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            get_email_backend().close()
+            db.session.remove()
+            db.drop_all()
+        self.smtp.shutdown()
+        self.smtp.server_close()
+
+    def test_order_confirmation_template(self):
+        """Test the confirmation renders items and escapes order data"""
+        with self.app.app_context():
+            order = db.session.get(Order, self.order_ids[0])
+            msg = build_order_confirmation_email('customer0@test.com', order)
+
+        html = msg.get_payload()[0].get_payload()
+        self.assertEqual(msg['Subject'], f'Order Confirmation - #{self.order_ids[0]}')
+        self.assertIn('Bath &amp; Body Set', html)
+        self.assertIn('$21.00', html)
+        self.assertIn('&lt;b&gt;1 Main St&lt;/b&gt;<br> Springfield', html)
+
+    def test_status_emails_share_one_smtp_session(self):
+        """Test bulk status updates and later jobs reuse one SMTP connection"""
+        with self.app.app_context():
+            queue_order_status_emails(self.order_ids)
+            queue_order_status_emails(self.order_ids[:1])
+            db.session.commit()
+
+            self.assertEqual(set(job_queue.work_once().values()), {'done'})
+            self.assertEqual(Job.query.filter_by(status='done').count(), 2)
+            self.assertEqual(get_email_backend().connections_opened, 1)
+
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 4)
+        self.assertEqual(
+            sorted(msg['To'] for msg in self.smtp.messages[:3]),
+            ['customer0@test.com', 'customer1@test.com', 'customer2@test.com']
+        )
+        self.assertEqual(self.smtp.messages[0]['Subject'], f'Order #{self.order_ids[0]} Shipped')
+
+    def test_smtp_backend_recycles_sessions(self):
+        """Test a session is replaced after max_messages"""
+        backend = SMTPEmailBackend('127.0.0.1', self.smtp.server_address[1], max_messages=2)
+        with self.app.app_context():
+            messages = [
+                build_order_confirmation_email('customer0@test.com', db.session.get(Order, self.order_ids[0]))
+                for _ in range(5)
+            ]
+
+        self.assertEqual(backend.send_messages(messages), 5)
+        backend.close()
+        self.assertEqual(backend.connections_opened, 3)
+        self.assertEqual(len(self.smtp.messages), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
 import unittest
+from unittest.mock import patch
 from app import create_app, db
 from app.models.user import User
 from app.models.product import Product
 from app.models.order import Order
+from app.models.stock_reservation import StockReservation
+from app.models.job import Job
+from app.services import checkout_queue, inventory_service, job_queue
+from datetime import datetime, timedelta
 
 class OrderTestCase(unittest.TestCase):
     def setUp(self):
@@ -27,6 +32,12 @@ class OrderTestCase(unittest.TestCase):
             
             self.user_id = user.id
             self.product_id = product.id
+            
+            # Second product for multi-line orders
+            other = Product(name='Other Product', description='Other Desc', price=2.5, stock_quantity=1)
+            db.session.add(other)
+            db.session.commit()
+            self.other_product_id = other.id
     
     def tearDown(self):
         with self.app.app_context():
@@ -55,5 +66,420 @@ class OrderTestCase(unittest.TestCase):
         self.assertEqual(data['order']['total_amount'], 20.0)
         self.assertEqual(data['order']['status'], 'pending')
 
+    def get_auth_headers(self):
+        login_response = self.client.post('/api/auth/login', json={
+            'email': 'test@example.com',
+            'password': 'password'
+        })
+        token = login_response.get_json()['access_token']
+        return {'Authorization': f'Bearer {token}'}
+    
+    def test_create_order_multiple_lines(self):
+        headers = self.get_auth_headers()
+        order_response = self.client.post('/api/orders/',
+            json={
+                'items': [
+                    {'product_id': self.product_id, 'quantity': 2},
+                    {'product_id': self.other_product_id, 'quantity': 1},
+                    {'product_id': self.product_id, 'quantity': 1}
+                ],
+                'shipping_address': '123 Test St'
+            },
+            headers=headers
+        )
+        
+        self.assertEqual(order_response.status_code, 201)
+        order = order_response.get_json()['order']
+        self.assertEqual(order['total_amount'], 32.5)
+        quantities = {item['product_id']: item['quantity'] for item in order['order_items']}
+        self.assertEqual(quantities, {self.product_id: 3, self.other_product_id: 1})
+        
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Product, self.product_id).stock_quantity, 2)
+            self.assertEqual(db.session.get(Product, self.other_product_id).stock_quantity, 0)
+    
+    def test_create_order_insufficient_stock_rolls_back(self):
+        headers = self.get_auth_headers()
+        order_response = self.client.post('/api/orders/',
+            json={
+                'items': [
+                    {'product_id': self.product_id, 'quantity': 1},
+                    {'product_id': self.other_product_id, 'quantity': 2}
+                ],
+                'shipping_address': '123 Test St'
+            },
+            headers=headers
+        )
+        
+        self.assertEqual(order_response.status_code, 400)
+        self.assertIn('Other Product', order_response.get_json()['error'])
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Product, self.product_id).stock_quantity, 5)
+            self.assertEqual(Order.query.count(), 0)
+
+    def stock_of(self, product_id):
+        with self.app.app_context():
+            return db.session.get(Product, product_id).stock_quantity
+    
+    def test_reservation_holds_stock_until_order(self):
+        headers = self.get_auth_headers()
+        response = self.client.post('/api/orders/reservations',
+            json={'items': [{'product_id': self.product_id, 'quantity': 4}]},
+            headers=headers
+        )
+        
+        self.assertEqual(response.status_code, 201)
+        reservation_key = response.get_json()['reservation_key']
+        self.assertEqual(self.stock_of(self.product_id), 1)
+        
+        # Held stock cannot be sold to anyone else
+        response = self.client.post('/api/orders/',
+            json={'items': [{'product_id': self.product_id, 'quantity': 2}], 'shipping_address': '123 Test St'},
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/orders/',
+            json={'reservation_key': reservation_key, 'shipping_address': '123 Test St'},
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 201)
+        order = response.get_json()['order']
+        self.assertEqual(order['total_amount'], 40.0)
+        self.assertEqual(self.stock_of(self.product_id), 1)
+        
+        # A claimed reservation cannot be used twice
+        response = self.client.post('/api/orders/',
+            json={'reservation_key': reservation_key, 'shipping_address': '123 Test St'},
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 409)
+        with self.app.app_context():
+            reservation = StockReservation.query.filter_by(reservation_key=reservation_key).one()
+            self.assertEqual(reservation.status, 'committed')
+            self.assertEqual(reservation.order_id, order['id'])
+    
+    def test_release_reservation_restocks(self):
+        headers = self.get_auth_headers()
+        response = self.client.post('/api/orders/reservations',
+            json={'items': [{'product_id': self.product_id, 'quantity': 3}]},
+            headers=headers
+        )
+        reservation_key = response.get_json()['reservation_key']
+        
+        response = self.client.delete(f'/api/orders/reservations/{reservation_key}', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock_of(self.product_id), 5)
+        
+        response = self.client.delete(f'/api/orders/reservations/{reservation_key}', headers=headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.stock_of(self.product_id), 5)
+    
+    def test_expired_reservation_is_swept(self):
+        headers = self.get_auth_headers()
+        response = self.client.post('/api/orders/reservations',
+            json={'items': [{'product_id': self.other_product_id, 'quantity': 1}]},
+            headers=headers
+        )
+        reservation_key = response.get_json()['reservation_key']
+        self.assertEqual(self.stock_of(self.other_product_id), 0)
+        
+        with self.app.app_context():
+            self.assertEqual(inventory_service.sweep_expired(), 0)
+            later = datetime.utcnow() + timedelta(seconds=self.app.config['RESERVATION_TTL'] + 1)
+            self.assertEqual(inventory_service.sweep_expired(now=later), 1)
+            db.session.commit()
+        self.assertEqual(self.stock_of(self.other_product_id), 1)
+        
+        response = self.client.post('/api/orders/',
+            json={'reservation_key': reservation_key, 'shipping_address': '123 Test St'},
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 409)
+    
+    def test_reserve_retries_after_sweeping_expired_holds(self):
+        with self.app.app_context():
+            inventory_service.reserve(self.user_id, {self.other_product_id: 1})
+            StockReservation.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+        self.assertEqual(self.stock_of(self.other_product_id), 0)
+
+        # The first take is short on the expired product; the line that fit
+        # must not be taken a second time by the retry after the sweep
+        with self.app.app_context():
+            inventory_service.reserve(self.user_id, {self.product_id: 1, self.other_product_id: 1})
+            db.session.commit()
+            held = StockReservation.query.filter_by(status='held').count()
+        self.assertEqual(held, 2)
+        self.assertEqual(self.stock_of(self.product_id), 4)
+        self.assertEqual(self.stock_of(self.other_product_id), 0)
+
+    def test_cancel_order_restocks_once(self):
+        headers = self.get_auth_headers()
+        response = self.client.post('/api/orders/',
+            json={'items': [{'product_id': self.product_id, 'quantity': 2}], 'shipping_address': '123 Test St'},
+            headers=headers
+        )
+        order_id = response.get_json()['order']['id']
+        self.assertEqual(self.stock_of(self.product_id), 3)
+        
+        with self.app.app_context():
+            order = db.session.get(Order, order_id)
+            self.assertTrue(order.update_status('cancelled'))
+            self.assertTrue(order.update_status('cancelled'))
+            self.assertFalse(order.update_status('processing'))
+            db.session.commit()
+            self.assertEqual(db.session.get(Order, order_id).status, 'cancelled')
+        self.assertEqual(self.stock_of(self.product_id), 5)
+
+    def enable_checkout_queue(self, **config):
+        self.app.config.update(
+            CHECKOUT_QUEUE='hot',
+            FLASH_SALE_PRODUCTS={self.product_id},
+            CHECKOUT_QUEUE_WORKER=False,
+            **config
+        )
+    
+    def test_memory_checkout_queue_refuses_several_workers(self):
+        env = {'CHECKOUT_QUEUE': 'hot', 'CHECKOUT_QUEUE_BACKEND': 'memory', 'WEB_CONCURRENCY': '4'}
+        with patch.dict('os.environ', env):
+            with self.assertRaises(RuntimeError):
+                create_app()
+        with patch.dict('os.environ', dict(env, WEB_CONCURRENCY='1')):
+            create_app()
+        with patch.dict('os.environ', dict(env, CHECKOUT_QUEUE='off')):
+            create_app()
+    
+    def test_flash_sale_checkout_is_queued(self):
+        self.enable_checkout_queue()
+        headers = self.get_auth_headers()
+        responses = [
+            self.client.post('/api/orders/',
+                json={'items': [{'product_id': self.product_id, 'quantity': 2}], 'shipping_address': '123 Test St'},
+                headers=headers
+            )
+            for _ in range(3)
+        ]
+        self.assertEqual([r.status_code for r in responses], [202, 202, 202])
+        self.assertEqual(responses[0].get_json()['status'], 'queued')
+        self.assertEqual(self.stock_of(self.product_id), 5)
+        
+        with self.app.app_context():
+            self.assertEqual(checkout_queue.drain(checkout_queue.get_checkout_queue()), 3)
+        
+        tickets = [self.client.get(r.headers['Location'], headers=headers).get_json() for r in responses]
+        self.assertEqual([t['status'] for t in tickets], ['done', 'done', 'failed'])
+        self.assertEqual(tickets[0]['order']['total_amount'], 20.0)
+        self.assertIn('Insufficient stock', tickets[2]['error'])
+        self.assertEqual(self.stock_of(self.product_id), 1)
+        with self.app.app_context():
+            self.assertEqual(Order.query.count(), 2)
+    
+    def test_checkout_batch_falls_back_when_stock_moves(self):
+        queue = checkout_queue.MemoryCheckoutQueue()
+        tickets = [
+            checkout_queue.Ticket(self.user_id, [{'product_id': self.product_id, 'quantity': 2}],
+                                  {self.product_id: 2}, '123 Test St'),
+            checkout_queue.Ticket(self.user_id, [{'product_id': self.product_id, 'quantity': 1},
+                                                 {'product_id': self.other_product_id, 'quantity': 1}],
+                                  {self.product_id: 1, self.other_product_id: 1}, '123 Test St')
+        ]
+        take_stock = inventory_service.take_stock
+        calls = []
+
+        def short_batch(quantities):
+            # The batch UPDATE comes back short as if stock moved outside the queue
+            calls.append(quantities)
+            if len(calls) == 1:
+                return take_stock({**quantities, self.other_product_id: 2})
+            return take_stock(quantities)
+
+        with self.app.app_context():
+            with patch.object(inventory_service, 'take_stock', side_effect=short_batch):
+                checkout_queue.process_batch(queue, tickets)
+
+        # Each order took its own stock once the batch take was undone
+        self.assertEqual(len(calls), 3)
+        self.assertEqual([t.status for t in tickets], ['done', 'done'])
+        self.assertEqual(self.stock_of(self.product_id), 2)
+        self.assertEqual(self.stock_of(self.other_product_id), 0)
+
+    def test_flash_sale_admission_control(self):
+        self.enable_checkout_queue(CHECKOUT_QUEUE_MAX_PENDING=1)
+        headers = self.get_auth_headers()
+        order = {'items': [{'product_id': self.product_id, 'quantity': 1}], 'shipping_address': '123 Test St'}
+        
+        self.assertEqual(self.client.post('/api/orders/', json=order, headers=headers).status_code, 202)
+        response = self.client.post('/api/orders/', json=order, headers=headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+        
+        # Products outside the sale skip the queue
+        response = self.client.post('/api/orders/',
+            json={'items': [{'product_id': self.other_product_id, 'quantity': 1}], 'shipping_address': '123 Test St'},
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_idempotent_order_retry(self):
+        headers = {**self.get_auth_headers(), 'Idempotency-Key': 'checkout-1'}
+        order = {'items': [{'product_id': self.product_id, 'quantity': 2}], 'shipping_address': '123 Test St'}
+        
+        first = self.client.post('/api/orders/', json=order, headers=headers)
+        retry = self.client.post('/api/orders/', json=order, headers=headers)
+        
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(retry.get_json()['order']['id'], first.get_json()['order']['id'])
+        self.assertEqual(self.stock_of(self.product_id), 3)
+        with self.app.app_context():
+            self.assertEqual(Order.query.count(), 1)
+        
+        # Reusing the key for a different body is rejected
+        order['items'][0]['quantity'] = 1
+        response = self.client.post('/api/orders/', json=order, headers=headers)
+        self.assertEqual(response.status_code, 422)
+
+    def test_idempotent_replay_keeps_headers_and_query(self):
+        self.enable_checkout_queue()
+        headers = {**self.get_auth_headers(), 'Idempotency-Key': 'checkout-2'}
+        order = {'items': [{'product_id': self.product_id, 'quantity': 1}], 'shipping_address': '123 Test St'}
+
+        first = self.client.post('/api/orders/', json=order, headers=headers)
+        retry = self.client.post('/api/orders/', json=order, headers=headers)
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(retry.headers['Location'], first.headers['Location'])
+
+        # The query string is part of the request the key was used for
+        response = self.client.post('/api/orders/?dry_run=1', json=order, headers=headers)
+        self.assertEqual(response.status_code, 422)
+
+    def place_order(self):
+        return self.client.post('/api/orders/',
+            json={'items': [{'product_id': self.product_id, 'quantity': 1}], 'shipping_address': '123 Test St'},
+            headers=self.get_auth_headers()
+        )
+    
+    def test_order_confirmation_is_queued_as_job(self):
+        with patch('app.utils.email_service.deliver_email') as deliver:
+            order_id = self.place_order().get_json()['order']['id']
+            deliver.assert_not_called()
+            
+            with self.app.app_context():
+                job = Job.query.one()
+                self.assertEqual((job.name, job.status), ('send_order_confirmation', 'queued'))
+                self.assertEqual(list(job_queue.work_once().values()), ['done'])
+                self.assertEqual(db.session.get(Job, job.id).status, 'done')
+        
+        msg = deliver.call_args[0][0]
+        self.assertEqual(msg['To'], 'test@example.com')
+        self.assertEqual(msg['Subject'], f'Order Confirmation - #{order_id}')
+    
+    def test_failing_job_is_retried_then_dead_lettered(self):
+        self.app.config['JOBS_BACKOFF_BASE'] = 0
+        self.place_order()
+        with patch('app.utils.email_service.deliver_email', side_effect=OSError('smtp down')):
+            with self.app.app_context():
+                job_id = Job.query.one().id
+                outcomes = [job_queue.work_once()[job_id] for _ in range(5)]
+                self.assertEqual(outcomes, ['retry'] * 4 + ['dead'])
+                self.assertEqual(job_queue.work_once(), {})
+                job = db.session.get(Job, job_id)
+                self.assertEqual((job.status, job.attempts), ('dead', 5))
+                self.assertIn('smtp down', job.last_error)
+                
+                self.assertEqual(job_queue.requeue_dead(), 1)
+        with patch('app.utils.email_service.deliver_email'):
+            with self.app.app_context():
+                self.assertEqual(job_queue.work_once(), {job_id: 'done'})
+
+    def read_stream(self, response):
+        chunks = []
+        for chunk in response.response:
+            chunks.append(chunk.decode() if isinstance(chunk, bytes) else chunk)
+        response.close()
+        return ''.join(chunks)
+    
+    def test_order_status_stream(self):
+        self.app.config.update(ORDER_STREAM_HEARTBEAT=1, ORDER_STREAM_MAX_DURATION=1)
+        order_id = self.place_order().get_json()['order']['id']
+        token = self.get_auth_headers()['Authorization'].split()[1]
+        
+        response = self.client.get(f'/api/orders/stream?jwt={token}', buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        with self.app.app_context():
+            db.session.get(Order, order_id).update_status('shipped')
+            db.session.commit()
+        
+        body = self.read_stream(response)
+        self.assertIn('event: order.status_changed', body)
+        self.assertIn('"status": "shipped"', body)
+        event_id = int(body.split('id: ')[1].split()[0])
+        
+        # A reconnect replays what was missed after Last-Event-ID
+        with self.app.app_context():
+            db.session.get(Order, order_id).update_status('delivered')
+            db.session.commit()
+        response = self.client.get('/api/orders/stream',
+            headers={**self.get_auth_headers(), 'Last-Event-ID': str(event_id)}, buffered=False)
+        body = self.read_stream(response)
+        self.assertIn('"status": "delivered"', body)
+        self.assertNotIn('"status": "shipped"', body)
+
+    def test_order_history_is_paginated_summaries(self):
+        headers = self.get_auth_headers()
+        created = []
+        for quantity in (1, 2, 1):
+            response = self.client.post('/api/orders/',
+                json={'items': [{'product_id': self.product_id, 'quantity': quantity}], 'shipping_address': '123 Test St'},
+                headers=headers
+            )
+            created.append(response.get_json()['order']['id'])
+        
+        response = self.client.get('/api/orders/?limit=2', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Total-Count'], '3')
+        page = response.get_json()
+        self.assertEqual([o['id'] for o in page], created[::-1][:2])
+        self.assertNotIn('order_items', page[0])
+        self.assertEqual((page[1]['item_count'], page[1]['total_quantity']), (1, 2))
+        
+        response = self.client.get(f"/api/orders/?limit=2&cursor={response.headers['X-Next-Cursor']}", headers=headers)
+        self.assertEqual([o['id'] for o in response.get_json()], created[:1])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+        
+        response = self.client.get('/api/orders/?include=items&limit=1', headers=headers)
+        self.assertEqual(response.get_json()[0]['order_items'][0]['quantity'], 1)
+        
+        self.assertEqual(self.client.get('/api/orders/?cursor=bogus', headers=headers).status_code, 400)
+    
+    def test_get_order_detail(self):
+        headers = self.get_auth_headers()
+        order_id = self.place_order().get_json()['order']['id']
+        
+        response = self.client.get(f'/api/orders/{order_id}', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['order_items'][0]['product_id'], self.product_id)
+        
+        response = self.client.get(f'/api/orders/{order_id}',
+            headers={**headers, 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        
+        with self.app.app_context():
+            other = User(email='other@example.com', first_name='Other', last_name='User')
+            other.set_password('password')
+            db.session.add(other)
+            db.session.commit()
+        token = self.client.post('/api/auth/login', json={
+            'email': 'other@example.com', 'password': 'password'
+        }).get_json()['access_token']
+        response = self.client.get(f'/api/orders/{order_id}', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 404)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,8 +1,13 @@
 import unittest
 import json
+import base64
+import tempfile
+from io import BytesIO
 from app import create_app, db
 from app.models.product import Product
 from app.models.user import User
+from app.utils.image_variants import Image
+from app.utils.cache import MemoryCache, RedisCache
 
 class ProductTestCase(unittest.TestCase):
     """Test case for the products endpoints"""
@@ -126,6 +131,271 @@ class ProductTestCase(unittest.TestCase):
         self.assertIn('electronics', data)
         self.assertIn('clothing', data)
     
+    def test_get_products_keyset_pagination(self):
+        """Test GET /api/products with limit and cursor"""
+        response = self.client.get('/api/products/?limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Total-Count'], '2')
+
+        data = json.loads(response.data)
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['id'], self.product_ids[0])
+
+        cursor = response.headers['X-Next-Cursor']
+        response = self.client.get(f'/api/products/?limit=1&cursor={cursor}')
+        data = json.loads(response.data)
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['id'], self.product_ids[1])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_get_products_sorted_by_price_desc(self):
+        """Test keyset pagination on price in descending order"""
+        response = self.client.get('/api/products/?limit=1&sort=price&order=desc')
+        data = json.loads(response.data)
+        self.assertEqual(data[0]['name'], 'Test Product 2')
+
+        cursor = response.headers['X-Next-Cursor']
+        response = self.client.get(f'/api/products/?limit=1&sort=price&order=desc&cursor={cursor}')
+        data = json.loads(response.data)
+        self.assertEqual(data[0]['name'], 'Test Product 1')
+
+    def test_get_products_field_projection(self):
+        """Test GET /api/products projects fields and never ships image_data"""
+        response = self.client.get('/api/products/')
+        data = json.loads(response.data)
+        self.assertNotIn('image_data', data[0])
+
+        response = self.client.get('/api/products/?fields=name,price')
+        data = json.loads(response.data)
+        self.assertEqual(set(data[0].keys()), {'id', 'name', 'price'})
+
+    def test_get_products_invalid_pagination_params(self):
+        """Test GET /api/products rejects bad limit, cursor and fields"""
+        self.assertEqual(self.client.get('/api/products/?limit=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/?cursor=bogus').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/?fields=password').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/?sort=name').status_code, 400)
+
+    def test_get_product_image(self):
+        """Test GET /api/products/<id>/image streams bytes from the image store"""
+        image_bytes = b'\x89PNG\r\n\x1a\nfake-image'
+        data_uri = 'data:image/png;base64,' + base64.b64encode(image_bytes).decode()
+
+        with tempfile.TemporaryDirectory() as store_path:
+            self.app.config['IMAGE_STORE_PATH'] = store_path
+            with self.app.app_context():
+                product = db.session.get(Product, self.product_ids[0])
+                product.set_image_from_base64(data_uri)
+                db.session.commit()
+                image_key = product.image_key
+
+            response = self.client.get(f'/api/products/{self.product_ids[0]}')
+            image_url = json.loads(response.data)['image_url']
+            self.assertIn(f'/api/products/{self.product_ids[0]}/image?v=', image_url)
+            self.assertNotIn('image_data', json.loads(response.data))
+
+            response = self.client.get(image_url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, image_bytes)
+            self.assertEqual(response.mimetype, 'image/png')
+            self.assertIn('immutable', response.headers['Cache-Control'])
+            response.close()
+
+            response = self.client.get(
+                image_url, headers={'If-None-Match': f'"{image_key}"'}
+            )
+            self.assertEqual(response.status_code, 304)
+
+    def test_get_product_image_missing(self):
+        """Test GET /api/products/<id>/image for a product without an image"""
+        response = self.client.get(f'/api/products/{self.product_ids[1]}/image')
+        self.assertEqual(response.status_code, 404)
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_get_product_image_variant(self):
+        """Test GET /api/products/<id>/image?size= serves a resized variant"""
+        buffer = BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(buffer, 'PNG')
+        data_uri = 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+        with tempfile.TemporaryDirectory() as store_path:
+            self.app.config['IMAGE_STORE_PATH'] = store_path
+            with self.app.app_context():
+                product = db.session.get(Product, self.product_ids[0])
+                product.set_image_from_base64(data_uri)
+                db.session.commit()
+            # Wait for the background pool to finish the variants
+            self.app.extensions['image_variant_executor'].shutdown(wait=True)
+
+            url = f'/api/products/{self.product_ids[0]}/image?size=100'
+            response = self.client.get(url, headers={'Accept': 'image/webp,*/*'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'image/webp')
+            self.assertEqual(Image.open(BytesIO(response.data)).size, (128, 64))
+            response.close()
+
+            response = self.client.get(url)
+            self.assertEqual(response.mimetype, 'image/jpeg')
+            response.close()
+
+            response = self.client.get(f'/api/products/{self.product_ids[0]}/image?size=4096')
+            self.assertEqual(response.mimetype, 'image/png')
+            response.close()
+
+    def test_search_products(self):
+        """Test GET /api/products/search ranks name matches and matches prefixes"""
+        with self.app.app_context():
+            db.session.add(Product(
+                name='Wireless Mouse',
+                description='Pairs with any electronics product',
+                price=9.99,
+                stock_quantity=3,
+                category='accessories'
+            ))
+            db.session.commit()
+
+        response = self.client.get('/api/products/search?q=electr')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        # Category match outranks a description-only match
+        self.assertEqual([p['name'] for p in data], ['Test Product 1', 'Wireless Mouse'])
+
+        response = self.client.get('/api/products/search?q=wire mou')
+        data = json.loads(response.data)
+        self.assertEqual([p['name'] for p in data], ['Wireless Mouse'])
+
+        self.assertEqual(self.client.get('/api/products/search').status_code, 400)
+
+    def test_search_index_follows_product_writes(self):
+        """Test the in-process search index is updated on commit"""
+        response = self.client.get('/api/products/search?q=clothing')
+        self.assertEqual(len(json.loads(response.data)), 1)
+
+        with self.app.app_context():
+            product = db.session.get(Product, self.product_ids[1])
+            product.category = 'apparel'
+            db.session.commit()
+
+        response = self.client.get('/api/products/search?q=clothing')
+        self.assertEqual(json.loads(response.data), [])
+        response = self.client.get('/api/products/search?q=apparel')
+        self.assertEqual(len(json.loads(response.data)), 1)
+
+    def test_suggest_products(self):
+        """Test GET /api/products/suggest matches name words and categories"""
+        response = self.client.get('/api/products/suggest?prefix=test pro')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([p['name'] for p in data['products']], ['Test Product 1', 'Test Product 2'])
+
+        response = self.client.get('/api/products/suggest?prefix=product 2')
+        data = json.loads(response.data)
+        self.assertEqual([p['id'] for p in data['products']], [self.product_ids[1]])
+
+        response = self.client.get('/api/products/suggest?prefix=ELEC')
+        data = json.loads(response.data)
+        self.assertEqual(data['categories'], ['electronics'])
+
+    def test_suggest_follows_product_writes(self):
+        """Test the typeahead index is updated on commit"""
+        self.client.get('/api/products/suggest?prefix=gad')
+
+        with self.app.app_context():
+            db.session.add(Product(name='Gadget', price=5.0, stock_quantity=1, category='gadgets'))
+            db.session.delete(db.session.get(Product, self.product_ids[1]))
+            db.session.commit()
+
+        data = json.loads(self.client.get('/api/products/suggest?prefix=gad').data)
+        self.assertEqual(data['categories'], ['gadgets'])
+        self.assertEqual([p['name'] for p in data['products']], ['Gadget'])
+
+        data = json.loads(self.client.get('/api/products/suggest?prefix=cloth').data)
+        self.assertEqual(data, {'categories': [], 'products': []})
+
+    def test_product_detail_cache_invalidated_on_write(self):
+        """Test GET /api/products/<id> is cached and invalidated on commit"""
+        product_id = self.product_ids[0]
+        self.client.get(f'/api/products/{product_id}')
+        cache = self.app.extensions['cache']
+        self.assertIsInstance(cache, MemoryCache)
+        self.assertEqual(cache.get(f'product:{product_id}')['name'], 'Test Product 1')
+
+        with self.app.app_context():
+            db.session.get(Product, product_id).name = 'Renamed Product'
+            db.session.commit()
+        self.assertIsNone(cache.get(f'product:{product_id}'))
+
+        data = json.loads(self.client.get(f'/api/products/{product_id}').data)
+        self.assertEqual(data['name'], 'Renamed Product')
+
+    def test_categories_cache_with_redis_backend(self):
+        """Test GET /api/products/categories through a Redis-protocol backend"""
+        class FakeRedis:
+            def __init__(self):
+                self.data = {}
+            def get(self, key):
+                return self.data.get(key)
+            def setex(self, key, ttl, value):
+                self.data[key] = value
+            def delete(self, *keys):
+                for key in keys:
+                    self.data.pop(key, None)
+
+        client = FakeRedis()
+        self.app.extensions['cache'] = RedisCache(client)
+
+        self.client.get('/api/products/categories')
+        self.assertIn('spaising:products:categories', client.data)
+
+        with self.app.app_context():
+            db.session.add(Product(name='Hat', price=5.0, stock_quantity=1, category='hats'))
+            db.session.commit()
+        self.assertNotIn('spaising:products:categories', client.data)
+
+        data = json.loads(self.client.get('/api/products/categories').data)
+        self.assertIn('hats', data)
+
+    def test_conditional_get_products(self):
+        """Test catalog endpoints answer 304 for a matching If-None-Match"""
+        for url in ('/api/products/', f'/api/products/{self.product_ids[0]}', '/api/products/categories'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers['ETag']
+            self.assertTrue(etag.startswith('W/'))
+
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+
+        # A write changes the validator
+        etag = self.client.get('/api/products/').headers['ETag']
+        with self.app.app_context():
+            db.session.delete(db.session.get(Product, self.product_ids[1]))
+            db.session.commit()
+        response = self.client.get('/api/products/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)), 1)
+
+    def test_conditional_get_products_sees_same_second_stock_change(self):
+        """Test a stock change that leaves MAX(updated_at) alone still changes the ETag"""
+        from datetime import datetime
+        from app.services import inventory_service
+        with self.app.app_context():
+            # The first product keeps the newest timestamp whatever happens to the second
+            db.session.execute(Product.__table__.update().where(Product.id == self.product_ids[0])
+                               .values(updated_at=datetime(2099, 1, 1)))
+            db.session.commit()
+        etags = {url: self.client.get(url).headers['ETag'] for url in ('/api/products/', '/api/products/categories')}
+
+        with self.app.app_context():
+            self.assertEqual(inventory_service.take_stock({self.product_ids[1]: 2}), [])
+            db.session.commit()
+        for url, etag in etags.items():
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200, url)
+        data = json.loads(self.client.get('/api/products/').data)
+        self.assertEqual(data[1]['stock_quantity'], 3)
+
     def tearDown(self):
         """Clean up after tests"""
         with self.app.app_context():
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+class CacheError(ValueError):
+    """Raised for unknown or misconfigured cache backends"""
+
+class CacheBackend:
+    """Key/value cache interface. Values must be JSON-serializable."""
+
+    def get(self, key):
+        """Return the cached value or None"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_or_set(self, key, loader, ttl=None):
+        """Read-through: return the cached value, or call loader() and cache it.
+
+        A loader returning None is not cached, so misses are retried.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+class NullCache(CacheBackend):
+    """Caching disabled; every read falls through to the loader"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+class MemoryCache(CacheBackend):
+    """In-process TTL + LRU cache (per worker process)"""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class RedisCache(CacheBackend):
+    """Cache over any client speaking the Redis get/setex/delete protocol.
+
+    Shared by all workers. Tests can pass an in-memory fake client.
+    """
+
+    def __init__(self, client, default_ttl=300, prefix='spaising:'):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.setex(self.prefix + key, ttl or self.default_ttl, json.dumps(value))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+def _redis_backend(app):
+    try:
+        import redis
+    except ImportError:
+        raise CacheError('CACHE_BACKEND=redis requires the redis package')
+    client = redis.Redis.from_url(app.config['CACHE_REDIS_URL'])
+    return RedisCache(client, default_ttl=app.config['CACHE_DEFAULT_TTL'])
+
+# Backend name (CACHE_BACKEND) -> factory taking the Flask app
+CACHE_BACKENDS = {
+    'null': lambda app: NullCache(),
+    'memory': lambda app: MemoryCache(default_ttl=app.config['CACHE_DEFAULT_TTL']),
+    'redis': _redis_backend
+}
+
+def get_cache():
+    """Return the cache for the current app, creating it on first use"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('cache')
+    if cache is None:
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend not in CACHE_BACKENDS:
+            raise CacheError(f'Unknown cache backend: {backend}')
+        cache = CACHE_BACKENDS[backend](app)
+        app.extensions['cache'] = cache
+    return cache
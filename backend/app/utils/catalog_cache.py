@@ -0,0 +1,35 @@
+from flask import current_app
+from app import db
+from app.models.product import Product
+from app.utils.model_events import on_commit, run_after_commit
+
+# Cache keys for read-through catalog lookups
+CATEGORIES_KEY = 'products:categories'
+CATALOG_VERSION_KEY = 'products:version'
+
+def product_key(product_id):
+    return f'product:{product_id}'
+
+def invalidate_products(product_ids):
+    """Drop cached detail entries for product_ids and the catalog-wide keys.
+
+    Called automatically after ORM commits; bulk UPDATE paths that bypass
+    the ORM use invalidate_products_after_commit.
+    """
+    cache = current_app.extensions.get('cache')
+    if cache is None:
+        return
+    cache.delete(CATEGORIES_KEY, CATALOG_VERSION_KEY, *[product_key(pid) for pid in set(product_ids)])
+
+def invalidate_products_after_commit(product_ids):
+    """Invalidate product_ids once the current transaction commits"""
+    product_ids = list(product_ids)
+    run_after_commit(db.session(), lambda: invalidate_products(product_ids))
+
+def _snapshot(product):
+    return {'id': product.id}
+
+def _apply_product_changes(changes):
+    invalidate_products(data['id'] for _, data in changes)
+
+on_commit(Product, _snapshot, _apply_product_changes)
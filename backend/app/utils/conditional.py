@@ -0,0 +1,46 @@
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request
+
+def conditional(version_func, private=False):
+    """Serve GET responses with a weak ETag and answer 304 when it matches.
+
+    version_func(*view_args) returns (last_modified, token), or None to
+    skip validation. token must change whenever the response would;
+    MAX(updated_at) alone cannot promise that at one-second resolution.
+    It runs before the view, so a matching If-None-Match never loads or
+    serializes the payload. The ETag hashes the token with the request
+    path and query string, so differently filtered listings never share one.
+
+    If-Modified-Since alone is not trusted: updated_at has one-second
+    resolution and cannot see deletions, so only If-None-Match yields 304.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            version = version_func(*args, **kwargs)
+            if version is None:
+                return f(*args, **kwargs)
+            last_modified, token = version
+            etag = hashlib.sha1(repr((request.full_path, token)).encode()).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # Let clients keep the payload but always revalidate it
+            response.cache_control.no_cache = True
+            if private:
+                response.cache_control.private = True
+            return response
+        return decorated
+    return decorator
@@ -1,126 +1,253 @@
 import os
-from threading import Thread
+import queue
+import smtplib
+import threading
+import time
 from flask import current_app
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from sqlalchemy.orm import joinedload
+from app import db
+from app.services.job_queue import enqueue, task
 
-def send_async_email(app, msg):
-    """Send email asynchronously"""
-    with app.app_context():
-        try:
-            # For development - print email to console
+# Templates under app/templates/emails, compiled once per process
+EMAIL_TEMPLATES = ('order_confirmation.html', 'order_status.html')
+
+# Order statuses that send the customer an update
+NOTIFY_STATUSES = ('shipped', 'delivered', 'cancelled')
+
+def get_email_templates():
+    """Return the email Jinja2 environment, compiling every template on first use.
+
+    Compiled bytecode is cached on disk (EMAIL_TEMPLATE_CACHE_DIR) so new
+    worker processes skip parsing, and templates stay in the environment's
+    cache so each email is a single render.
+    """
+    app = current_app._get_current_object()
+    env = app.extensions.get('email_templates')
+    if env is None:
+        cache_dir = app.config.get('EMAIL_TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja-cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        env = Environment(
+            loader=FileSystemLoader(os.path.join(app.root_path, 'templates', 'emails')),
+            autoescape=select_autoescape(['html']),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            auto_reload=app.debug,
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+        for name in EMAIL_TEMPLATES:
+            env.get_template(name)
+        app.extensions['email_templates'] = env
+    return env
+
+def render_email(template, **context):
+    return get_email_templates().get_template(template).render(**context)
+
+def build_message(to, subject, html):
+    msg = MIMEMultipart()
+    msg['Subject'] = subject
+    msg['From'] = current_app.config.get('EMAIL_FROM') or 'noreply@spaisingstore.com'
+    msg['To'] = to
+    msg.attach(MIMEText(html, 'html'))
+    return msg
+
+class EmailBackend:
+    """Delivers built messages"""
+
+    def send_messages(self, messages):
+        """Send messages and return how many were sent"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class ConsoleEmailBackend(EmailBackend):
+    """Prints messages instead of sending them (development)"""
+
+    def send_messages(self, messages):
+        for msg in messages:
             print(f"📧 EMAIL CONTENT:")
             print(f"To: {msg['To']}")
             print(f"Subject: {msg['Subject']}")
             print(f"Body:\n{msg.get_payload()}")
-            print("=" * 50)         
-                
-        except Exception as e:
-            print(f"❌ Email sending failed: {str(e)}")
-
-def send_order_confirmation_email(user_email, order):
-    try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['Subject'] = f"Order Confirmation - #{order.id}"
-        msg['From'] = os.getenv('EMAIL_FROM', 'noreply@spaisingstore.com')
-        msg['To'] = user_email
-        
-        # Create HTML email content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #667eea, #764ba2); color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 20px; }}
-                .order-details {{ background: white; padding: 20px; border-radius: 5px; margin: 20px 0; }}
-                .footer {{ text-align: center; padding: 20px; color: #666; font-size: 12px; }}
-                table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-                th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
-                th {{ background-color: #f8f9fa; }}
-                .total-row {{ font-weight: bold; background-color: #e9ecef; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Spaising's Store</h1>
-                    <h2>Order Confirmation</h2>
-                </div>
-                
-                <div class="content">
-                    <p>Dear Customer,</p>
-                    <p>Thank you for your order! Here are your order details:</p>
-                    
-                    <div class="order-details">
-                        <h3>Order #{order.id}</h3>
-                        <p><strong>Order Date:</strong> {order.created_at.strftime('%B %d, %Y %I:%M %p')}</p>
-                        <p><strong>Status:</strong> <span style="color: #28a745;">{order.status}</span></p>
-                        
-                        <h4>Shipping Address:</h4>
-                        <p>{order.shipping_address.replace(',', '<br>')}</p>
-                        
-                        <h4>Order Items:</h4>
-                        <table>
-                            <thead>
-                                <tr>
-                                    <th>Product</th>
-                                    <th>Quantity</th>
-                                    <th>Price</th>
-                                    <th>Subtotal</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-        """
-        
-        # Add order items
-        for item in order.order_items:
-            html_content += f"""
-                                <tr>
-                                    <td>{item.product_name}</td>
-                                    <td>{item.quantity}</td>
-                                    <td>${item.price:.2f}</td>
-                                    <td>${(item.quantity * item.price):.2f}</td>
-                                </tr>
-            """
-        
-        # Add total
-        html_content += f"""
-                                <tr class="total-row">
-                                    <td colspan="3"><strong>Total Amount:</strong></td>
-                                    <td><strong>${order.total_amount:.2f}</strong></td>
-                                </tr>
-                            </tbody>
-                        </table>
-                    </div>
-                    
-                    <p>Your order will be processed and shipped within 2-3 business days.</p>
-                    <p>You can track your order status by logging into your account.</p>
-                    
-                    <p>Thank you for shopping with us!</p>
-                    <p><strong>The Spaising's Store Team</strong></p>
-                </div>
-                
-                <div class="footer">
-                    <p>This is an automated email. Please do not reply to this message.</p>
-                    <p>&copy; 2024 Spaising's Store. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        msg.attach(MIMEText(html_content, 'html'))
-        
-        # Send email asynchronously
-        Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()
-        
-        print(f"✅ Order confirmation email sent to {user_email}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Failed to send email: {str(e)}")
-        return False
\ No newline at end of file
+            print("=" * 50)
+        return len(messages)
+
+class SMTPEmailBackend(EmailBackend):
+    """Sends over a small pool of long-lived SMTP sessions.
+
+    A batch goes out over one session, and sessions are returned to the
+    pool for the next batch, so bulk mail costs one connect and login per
+    pooled session rather than per message. Sessions idle for longer than
+    idle_timeout are checked with NOOP before reuse, and are recycled after
+    max_messages to stay under server per-session limits.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_tls=False, timeout=30,
+                 pool_size=2, max_messages=100, idle_timeout=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connect(self):
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        with self._lock:
+            self.connections_opened += 1
+        return [connection, 0, time.monotonic()]  # connection, messages sent, last used
+
+    def _acquire(self):
+        try:
+            session = self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        if time.monotonic() - session[2] > self.idle_timeout:
+            try:
+                if session[0].noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected('NOOP failed')
+            except smtplib.SMTPException:
+                self._quit(session)
+                return self._connect()
+        return session
+
+    def _release(self, session):
+        session[2] = time.monotonic()
+        if session[1] >= self.max_messages:
+            self._quit(session)
+            return
+        try:
+            self._pool.put_nowait(session)
+        except queue.Full:
+            self._quit(session)
+
+    def _quit(self, session):
+        try:
+            session[0].quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def send_messages(self, messages):
+        if not messages:
+            return 0
+        session = self._acquire()
+        sent = 0
+        try:
+            for msg in messages:
+                if session[1] >= self.max_messages:
+                    self._quit(session)
+                    session = self._connect()
+                try:
+                    session[0].send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # A pooled session may have been dropped by the server
+                    session = self._connect()
+                    session[0].send_message(msg)
+                session[1] += 1
+                sent += 1
+        except Exception:
+            self._quit(session)
+            raise
+        self._release(session)
+        return sent
+
+    def close(self):
+        while True:
+            try:
+                self._quit(self._pool.get_nowait())
+            except queue.Empty:
+                return
+
+def _smtp_backend(app):
+    return SMTPEmailBackend(
+        app.config['SMTP_SERVER'],
+        app.config['SMTP_PORT'],
+        username=app.config.get('SMTP_USERNAME'),
+        password=app.config.get('SMTP_PASSWORD'),
+        use_tls=app.config.get('SMTP_USE_TLS', False),
+        pool_size=app.config.get('SMTP_POOL_SIZE', 2),
+        max_messages=app.config.get('SMTP_MAX_MESSAGES_PER_CONNECTION', 100)
+    )
+
+# Backend name (EMAIL_BACKEND) -> factory taking the Flask app
+EMAIL_BACKENDS = {
+    'console': lambda app: ConsoleEmailBackend(),
+    'smtp': _smtp_backend
+}
+
+def get_email_backend():
+    """Return the email backend for the current app, creating it on first use"""
+    app = current_app._get_current_object()
+    backend = app.extensions.get('email_backend')
+    if backend is None:
+        name = app.config.get('EMAIL_BACKEND', 'console')
+        if name not in EMAIL_BACKENDS:
+            raise ValueError(f'Unknown email backend: {name}')
+        backend = EMAIL_BACKENDS[name](app)
+        app.extensions['email_backend'] = backend
+    return backend
+
+def deliver_email(*messages):
+    """Deliver messages in one batch; raising lets the job queue retry it"""
+    return get_email_backend().send_messages(list(messages))
+
+def _load_orders(order_ids):
+    from app.models.order import Order
+    from app.models.user import User
+
+    return db.session.query(Order, User.email).join(User, Order.user_id == User.id).options(
+        joinedload(Order.order_items)
+    ).filter(Order.id.in_(order_ids)).all()
+
+def build_order_confirmation_email(user_email, order):
+    """Build the confirmation message for order"""
+    return build_message(user_email, f"Order Confirmation - #{order.id}",
+                         render_email('order_confirmation.html', order=order))
+
+def build_order_status_email(user_email, order):
+    return build_message(user_email, f"Order #{order.id} {order.status.capitalize()}",
+                         render_email('order_status.html', order=order))
+
+@task('send_order_confirmation', max_attempts=5)
+def send_order_confirmation_job(payload):
+    """Render and send the confirmation for payload['order_id'] in a job worker"""
+    messages = [
+        build_order_confirmation_email(email, order)
+        for order, email in _load_orders([payload['order_id']]) if email
+    ]
+    deliver_email(*messages)
+
+@task('send_order_status_emails', max_attempts=5)
+def send_order_status_job(payload):
+    """Send status updates for payload['order_ids'] over one SMTP session"""
+    messages = [
+        build_order_status_email(email, order)
+        for order, email in _load_orders(payload['order_ids']) if email
+    ]
+    deliver_email(*messages)
+
+def queue_order_confirmation_email(order_id):
+    """Queue the confirmation email in the caller's transaction.
+
+    The request path only writes a job row; rendering and delivery happen
+    in a `flask jobs worker` process.
+    """
+    return enqueue('send_order_confirmation', {'order_id': order_id})
+
+def queue_order_status_emails(order_ids):
+    """Queue one job that notifies every order in order_ids of its status"""
+    order_ids = list(order_ids)
+    if order_ids:
+        return enqueue('send_order_status_emails', {'order_ids': order_ids})
@@ -0,0 +1,137 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from app import db
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.upsert import insert_ignore
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+# Response headers stored with the body so a replay carries them too
+REPLAYED_RESPONSE_HEADERS = ('Content-Type', 'Location', 'Retry-After', 'X-Next-Cursor', 'X-Total-Count')
+
+def _fingerprint():
+    # Same hash as before for requests without a query string
+    target = request.path
+    if request.query_string:
+        target += '?' + request.query_string.decode('latin-1')
+    digest = hashlib.sha256(f'{request.method} {target}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+def _claim(user_id, key, fingerprint):
+    """Claim (user_id, key) for this request; returns (claimed, existing row).
+
+    The claim is an INSERT IGNORE on the unique key, committed on its own
+    so concurrent retries see it. Expired rows, and rows whose first
+    request died without recording a response, are taken over with a
+    conditional UPDATE so only one retry re-executes.
+    """
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=current_app.config.get('IDEMPOTENCY_TTL', 86400))
+    claim = {'request_hash': fingerprint, 'status_code': None, 'response_body': None,
+             'response_headers': None, 'created_at': now, 'expires_at': expires_at}
+
+    result = db.session.execute(insert_ignore(table, {'user_id': user_id, 'key': key, **claim},
+                                              ['user_id', 'key']))
+    if result.rowcount:
+        db.session.commit()
+        return True, None
+
+    row = db.session.query(IdempotencyKey).filter_by(user_id=user_id, key=key).one()
+    stale = now - timedelta(seconds=current_app.config.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+    if row.expires_at <= now or (row.status_code is None and row.created_at < stale):
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == row.id, table.c.created_at == row.created_at)
+            .values(**claim)
+        )
+        if result.rowcount:
+            db.session.commit()
+            return True, None
+        db.session.refresh(row)
+    db.session.rollback()
+    return False, row
+
+def _record(user_id, key, response):
+    table = IdempotencyKey.__table__
+    headers = {name: response.headers[name] for name in REPLAYED_RESPONSE_HEADERS if name in response.headers}
+    db.session.execute(
+        table.update()
+        .where(table.c.user_id == user_id, table.c.key == key)
+        .values(status_code=response.status_code, response_body=response.get_data(as_text=True),
+                response_headers=json.dumps(headers))
+    )
+    db.session.commit()
+
+def _forget(user_id, key):
+    db.session.rollback()
+    db.session.execute(IdempotencyKey.__table__.delete().where(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+    ))
+    db.session.commit()
+
+def _replay(row, fingerprint):
+    if row.request_hash != fingerprint:
+        return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+    if row.status_code is None:
+        response = jsonify({'error': 'A request with this Idempotency-Key is still in progress'})
+        response.headers['Retry-After'] = '1'
+        return response, 409
+    response = current_app.response_class(row.response_body, status=row.status_code,
+                                          mimetype='application/json')
+    response.headers.update(json.loads(row.response_headers or '{}'))
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+def idempotent(f):
+    """Honor an Idempotency-Key header on a JWT-protected write route.
+
+    The first request with a key runs the view and stores its status,
+    body and REPLAYED_RESPONSE_HEADERS for IDEMPOTENCY_TTL seconds;
+    retries with the same key, query string and body get the stored
+    response back without running the view. Server errors
+    are not stored, so the client can retry them.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or request.method not in WRITE_METHODS:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+        try:
+            user_id = int(get_jwt_identity())
+        except (ValueError, TypeError):
+            return f(*args, **kwargs)
+
+        fingerprint = _fingerprint()
+        claimed, row = _claim(user_id, key, fingerprint)
+        if not claimed:
+            return _replay(row, fingerprint)
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            _forget(user_id, key)
+            raise
+        if response.status_code >= 500:
+            _forget(user_id, key)
+        else:
+            _record(user_id, key, response)
+        return response
+    return decorated
+
+def purge_expired(now=None):
+    """Delete expired keys; returns the number removed"""
+    result = db.session.execute(IdempotencyKey.__table__.delete().where(
+        IdempotencyKey.expires_at <= (now or datetime.utcnow())
+    ))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,100 @@
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+from flask import current_app
+
+class ImageStoreError(ValueError):
+    """Raised for malformed image payloads or unknown store backends"""
+
+def decode_data_uri(data_uri):
+    """Split a 'data:image/...;base64,' string into (bytes, content_type)"""
+    if not data_uri or not data_uri.startswith('data:image'):
+        raise ImageStoreError('Image must be a base64 data:image URI')
+    try:
+        header, encoded = data_uri.split(',', 1)
+        content_type = header[len('data:'):].split(';', 1)[0]
+        return base64.b64decode(encoded, validate=True), content_type
+    except (ValueError, binascii.Error):
+        raise ImageStoreError('Invalid base64 image data')
+
+class ImageStore:
+    """Content-addressed blob store interface: blobs are keyed by SHA-256"""
+
+    @staticmethod
+    def key_for(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def put(self, data, key=None):
+        """Store bytes and return their key; storing the same bytes twice is a no-op.
+
+        Derived blobs (e.g. resized variants) pass an explicit key computed
+        from their source key so they can be located without a lookup table.
+        """
+        raise NotImplementedError
+
+    def open(self, key):
+        """Return a readable binary file object for key"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+class LocalImageStore(ImageStore):
+    """Filesystem backend laid out as <root>/ab/cd/abcd..."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data, key=None):
+        key = key or self.key_for(data)
+        path = self.path(key)
+        if os.path.exists(path):
+            return key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def delete(self, key):
+        if self.exists(key):
+            os.remove(self.path(key))
+
+# Backend name (IMAGE_STORE_BACKEND) -> factory taking the Flask app
+IMAGE_STORE_BACKENDS = {
+    'local': lambda app: LocalImageStore(app.config['IMAGE_STORE_PATH'])
+}
+
+def get_image_store():
+    """Return the image store for the current app, creating it on first use"""
+    app = current_app._get_current_object()
+    store = app.extensions.get('image_store')
+    if store is None:
+        backend = app.config.get('IMAGE_STORE_BACKEND', 'local')
+        if backend not in IMAGE_STORE_BACKENDS:
+            raise ImageStoreError(f'Unknown image store backend: {backend}')
+        store = IMAGE_STORE_BACKENDS[backend](app)
+        app.extensions['image_store'] = store
+    return store
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from flask import current_app
+from app.utils.image_store import get_image_store
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; originals are served without it
+    Image = None
+
+# Longest-edge sizes generated for every uploaded image
+VARIANT_SIZES = (128, 512, 1024)
+
+# format -> (Pillow encoder, content type, encoder options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True})
+}
+
+def variant_key(original_key, size, fmt):
+    """Deterministic store key of a resized variant of original_key"""
+    return f"{original_key}-{size}.{fmt}"
+
+def pick_variant_size(requested):
+    """Smallest generated size that covers the requested width, or None"""
+    for size in VARIANT_SIZES:
+        if requested <= size:
+            return size
+    return None
+
+def pick_variant_format(accept_header):
+    """WebP for clients that advertise it, JPEG otherwise"""
+    return 'webp' if 'image/webp' in (accept_header or '') else 'jpeg'
+
+def generate_variants(store, original_key):
+    """Resize and re-encode original_key into every size/format; returns keys written"""
+    if Image is None:
+        return []
+
+    with store.open(original_key) as f:
+        original = Image.open(BytesIO(f.read()))
+        original.load()
+
+    written = []
+    for size in VARIANT_SIZES:
+        resized = original.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)  # Never upscales
+        for fmt, (encoder, _, options) in VARIANT_FORMATS.items():
+            key = variant_key(original_key, size, fmt)
+            if store.exists(key):
+                continue
+            image = resized
+            if encoder == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif encoder == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            buffer = BytesIO()
+            image.save(buffer, encoder, **options)
+            written.append(store.put(buffer.getvalue(), key=key))
+    return written
+
+def _get_executor(app):
+    executor = app.extensions.get('image_variant_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=app.config.get('IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants'
+        )
+        app.extensions['image_variant_executor'] = executor
+    return executor
+
+def _run_variants(app, store, original_key):
+    try:
+        generate_variants(store, original_key)
+    except Exception as e:
+        app.logger.warning(f"Image variant generation failed for {original_key}: {e}")
+
+def schedule_variants(original_key):
+    """Queue variant generation on the bounded background worker pool"""
+    if Image is None or not original_key:
+        return None
+    app = current_app._get_current_object()
+    return _get_executor(app).submit(_run_variants, app, get_image_store(), original_key)
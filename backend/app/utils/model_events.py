@@ -0,0 +1,54 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# model class -> list of (snapshot, callback)
+_commit_listeners = {}
+
+def on_commit(model, snapshot, callback):
+    """Call callback(changes) after a commit that touched rows of model.
+
+    snapshot(obj) captures whatever the callback needs while the object is
+    still loaded (after commit it is expired and must not be refreshed).
+    changes is a list of (action, data) with action in 'insert', 'update'
+    or 'delete'. Bulk Query.update()/delete() calls are not seen.
+    """
+    _commit_listeners.setdefault(model, []).append((snapshot, callback))
+
+def run_after_commit(session, callback):
+    """Call callback() once the session's current transaction commits.
+
+    For side effects of Core/bulk statements that model listeners never see.
+    Dropped if the transaction rolls back.
+    """
+    session.info.setdefault('after_commit_callbacks', []).append(callback)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    if not _commit_listeners:
+        return
+    pending = session.info.setdefault('model_changes', [])
+    for action, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            for snapshot, callback in _commit_listeners.get(type(obj), ()):
+                if action == 'update' and not session.is_modified(obj, include_collections=False):
+                    continue
+                pending.append((callback, action, snapshot(obj)))
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    for callback in session.info.pop('after_commit_callbacks', ()):
+        callback()
+    pending = session.info.pop('model_changes', None)
+    if not pending:
+        return
+    grouped = {}
+    for callback, action, data in pending:
+        grouped.setdefault(callback, []).append((action, data))
+    for callback, changes in grouped.items():
+        callback(changes)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changes(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop('model_changes', None)
+        session.info.pop('after_commit_callbacks', None)
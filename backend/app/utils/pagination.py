@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class PaginationError(ValueError):
+    """Raised when limit/cursor/sort query parameters are invalid"""
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse the ?limit= parameter, clamped to maximum"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid limit format')
+    if limit <= 0:
+        raise PaginationError('Limit must be positive')
+    return min(limit, maximum)
+
+def encode_cursor(sort_value, row_id):
+    """Build an opaque cursor from the last row's sort key and id"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (sort_value, id) from a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+def apply_keyset(query, sort_column, id_column, cursor=None, descending=False):
+    """Order query by (sort_column, id_column) and seek past cursor.
+
+    The seek predicate lets the database jump straight to the next page
+    through the index instead of scanning and discarding OFFSET rows.
+    """
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        else:
+            if sort_column.type.python_type is datetime:
+                try:
+                    sort_value = datetime.fromisoformat(sort_value)
+                except (ValueError, TypeError):
+                    raise PaginationError('Invalid cursor')
+            if descending:
+                query = query.filter(or_(
+                    sort_column < sort_value,
+                    and_(sort_column == sort_value, id_column < last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    sort_column > sort_value,
+                    and_(sort_column == sort_value, id_column > last_id)
+                ))
+
+    if sort_column is id_column:
+        return query.order_by(id_column.desc() if descending else id_column.asc())
+    if descending:
+        return query.order_by(sort_column.desc(), id_column.desc())
+    return query.order_by(sort_column.asc(), id_column.asc())
+
+def fetch_page(query, limit, sort_attr, id_attr='id'):
+    """Fetch limit rows plus one lookahead row; return (rows, next_cursor)"""
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr))
+    return rows, next_cursor
@@ -0,0 +1,124 @@
+import json
+import queue
+import threading
+from flask import current_app
+
+class PubSubError(ValueError):
+    """Raised for unknown or misconfigured pub/sub backends"""
+
+class Subscription:
+    """Messages published to one channel after subscribing"""
+
+    def get(self, timeout=None):
+        """Return the next message, or None if none arrived within timeout"""
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+class PubSub:
+    """Fire-and-forget publish/subscribe. Messages must be JSON-serializable."""
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+class MemorySubscription(Subscription):
+    def __init__(self, pubsub, channel, max_pending):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False  # a slow reader missed messages
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.pubsub._unsubscribe(self)
+
+class MemoryPubSub(PubSub):
+    """In-process pub/sub; only reaches subscribers in the same process"""
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._channels = {}  # channel -> set of MemorySubscription
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                subscription.overflowed = True
+
+    def subscribe(self, channel):
+        subscription = MemorySubscription(self, channel, self.max_pending)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+class RedisSubscription(Subscription):
+    def __init__(self, pubsub, channel):
+        self.pubsub = pubsub
+        self.overflowed = False
+        pubsub.subscribe(channel)
+
+    def get(self, timeout=None):
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout or 0)
+        return json.loads(message['data']) if message else None
+
+    def close(self):
+        self.pubsub.close()
+
+class RedisPubSub(PubSub):
+    """Redis-backed pub/sub shared by every worker process"""
+
+    def __init__(self, client, prefix='spaising:'):
+        self.client = client
+        self.prefix = prefix
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message))
+
+    def subscribe(self, channel):
+        return RedisSubscription(self.client.pubsub(), self.prefix + channel)
+
+def _redis_backend(app):
+    try:
+        import redis
+    except ImportError:
+        raise PubSubError('PUBSUB_BACKEND=redis requires the redis package')
+    return RedisPubSub(redis.Redis.from_url(app.config['PUBSUB_REDIS_URL']))
+
+# Backend name (PUBSUB_BACKEND) -> factory taking the Flask app
+PUBSUB_BACKENDS = {
+    'memory': lambda app: MemoryPubSub(),
+    'redis': _redis_backend
+}
+
+def get_pubsub():
+    """Return the pub/sub for the current app, creating it on first use"""
+    app = current_app._get_current_object()
+    pubsub = app.extensions.get('pubsub')
+    if pubsub is None:
+        backend = app.config.get('PUBSUB_BACKEND', 'memory')
+        if backend not in PUBSUB_BACKENDS:
+            raise PubSubError(f'Unknown pub/sub backend: {backend}')
+        pubsub = PUBSUB_BACKENDS[backend](app)
+        app.extensions['pubsub'] = pubsub
+    return pubsub
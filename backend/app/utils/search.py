@@ -0,0 +1,175 @@
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import load_only
+from app import db
+from app.models.product import Product
+from app.utils.model_events import on_commit
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Searched fields and their relevance weight
+FIELD_WEIGHTS = {'name': 3.0, 'category': 2.0, 'description': 1.0}
+
+# Prefix matches count for less than whole-word matches
+PREFIX_PENALTY = 0.5
+
+# Upper bound on index tokens a single query prefix may expand to
+MAX_PREFIX_EXPANSIONS = 50
+
+def tokenize(text):
+    """Lowercase word tokens of text"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+class InvertedIndex:
+    """In-process inverted index over product name/description/category.
+
+    Used where MySQL FULLTEXT is unavailable (SQLite in tests). Tokens are
+    kept in a sorted list so prefix queries are a bisect plus a short scan.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = {}      # token -> {product_id: weighted term frequency}
+        self.doc_tokens = {}    # product_id -> set of tokens, for removal
+        self.sorted_tokens = []
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add(self, product_id, fields):
+        """Index (or re-index) a product from a {field: text} mapping"""
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(fields.get(field)):
+                weights[token] = weights.get(token, 0.0) + weight
+
+        with self._lock:
+            self.remove(product_id)
+            for token, weight in weights.items():
+                posting = self.postings.get(token)
+                if posting is None:
+                    posting = self.postings[token] = {}
+                    insort(self.sorted_tokens, token)
+                posting[product_id] = weight
+            self.doc_tokens[product_id] = set(weights)
+
+    def remove(self, product_id):
+        with self._lock:
+            for token in self.doc_tokens.pop(product_id, ()):
+                posting = self.postings[token]
+                posting.pop(product_id, None)
+                if not posting:
+                    del self.postings[token]
+                    del self.sorted_tokens[bisect_left(self.sorted_tokens, token)]
+
+    def expand(self, prefix):
+        """Index tokens starting with prefix (exact token first)"""
+        start = bisect_left(self.sorted_tokens, prefix)
+        tokens = []
+        for token in self.sorted_tokens[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def search(self, query, limit=20):
+        """Return [(product_id, score)] matching every query term, best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            total_docs = len(self.doc_tokens) or 1
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token in self.expand(term):
+                    posting = self.postings[token]
+                    idf = math.log(1 + total_docs / len(posting))
+                    factor = idf if token == term else idf * PREFIX_PENALTY
+                    for product_id, weight in posting.items():
+                        term_scores[product_id] = term_scores.get(product_id, 0.0) + weight * factor
+                if scores is None:
+                    scores = term_scores
+                else:
+                    # Every term must match
+                    scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+def _snapshot(product):
+    return {field: getattr(product, field) for field in ('id',) + tuple(FIELD_WEIGHTS)}
+
+def build_index():
+    """Build an inverted index from every product row"""
+    index = InvertedIndex()
+    columns = [getattr(Product, field) for field in FIELD_WEIGHTS]
+    for product in Product.query.options(load_only(*columns)).yield_per(1000):
+        index.add(product.id, _snapshot(product))
+    return index
+
+def get_search_index():
+    """Return the app's inverted index, building it on first use"""
+    app = current_app._get_current_object()
+    index = app.extensions.get('product_search_index')
+    if index is None:
+        index = build_index()
+        app.extensions['product_search_index'] = index
+    return index
+
+def _apply_product_changes(changes):
+    index = current_app.extensions.get('product_search_index')
+    if index is None:
+        return  # Not built yet; the first search will read committed rows
+    for action, data in changes:
+        if action == 'delete':
+            index.remove(data['id'])
+        else:
+            index.add(data['id'], data)
+
+on_commit(Product, _snapshot, _apply_product_changes)
+
+def use_fulltext():
+    """True when searches should go to MySQL FULLTEXT instead of the in-process index"""
+    backend = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return db.engine.dialect.name == 'mysql'
+    return backend == 'fulltext'
+
+def _fulltext_match(query):
+    boolean_query = ' '.join(f'+{term}*' for term in tokenize(query))
+    return match(Product.name, Product.description, Product.category,
+                 against=boolean_query).in_boolean_mode()
+
+def search_criterion(query):
+    """SQL filter restricting Product rows to those matching query"""
+    if not tokenize(query):
+        return db.true()
+    if use_fulltext():
+        return _fulltext_match(query)
+    ids = [product_id for product_id, _ in get_search_index().search(query, limit=None)]
+    return Product.id.in_(ids)
+
+def search_products(query, limit=20, options=()):
+    """Products matching query, ordered by relevance"""
+    if not tokenize(query):
+        return []
+    if use_fulltext():
+        relevance = _fulltext_match(query)
+        return (Product.query.options(*options).filter(relevance)
+                .order_by(relevance.desc(), Product.id).limit(limit).all())
+
+    ranked = get_search_index().search(query, limit=limit)
+    if not ranked:
+        return []
+    by_id = {p.id: p for p in Product.query.options(*options).filter(
+        Product.id.in_([product_id for product_id, _ in ranked])
+    )}
+    return [by_id[product_id] for product_id, _ in ranked if product_id in by_id]
@@ -0,0 +1,69 @@
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+from flask import current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+DEFAULT_CHUNK_SIZE = 500
+
+def wants_ndjson():
+    """True when the client prefers NDJSON over a JSON array"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def iter_json(rows, dump, ndjson=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield rows encoded as one JSON array, or as NDJSON lines.
+
+    rows is consumed chunk_size at a time and dump(list_of_rows) turns a
+    chunk into JSON-serializable items, so only one chunk is ever held in
+    memory. Items are encoded like jsonify would encode them.
+    """
+    dumps = current_app.json.dumps
+    rows = iter(rows)
+    first = True
+    if not ndjson:
+        yield '['
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        encoded = [dumps(item) for item in dump(chunk)]
+        if ndjson:
+            yield ''.join(f'{item}\n' for item in encoded)
+        else:
+            yield ('' if first else ',') + ','.join(encoded)
+        first = False
+    if not ndjson:
+        yield ']'
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def iter_csv(chunks, columns):
+    """Yield CSV text with a header row, one piece per chunk of row tuples"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_json(rows, dump, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream a listing as a JSON array, or NDJSON for Accept: application/x-ndjson.
+
+    Pass a query with yield_per(chunk_size) so rows are fetched from a
+    server-side cursor as they are sent. The first bytes go out before
+    the rest of the rows are read, so errors after that point can only
+    truncate the body.
+    """
+    ndjson = wants_ndjson()
+    response = current_app.response_class(
+        stream_with_context(iter_json(rows, dump, ndjson=ndjson, chunk_size=chunk_size)),
+        mimetype=NDJSON_MIMETYPE if ndjson else 'application/json'
+    )
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,113 @@
+import threading
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy.orm import load_only
+from app.models.product import Product
+from app.utils.model_events import on_commit
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+
+class SuggestionIndex:
+    """Sorted array of lowercase keys for typeahead over names and categories.
+
+    Each product name is indexed once per word start ("wireless mouse" and
+    "mouse") so typing any word of a name finds it. Lookups are a bisect
+    plus a scan of at most a few dozen neighbouring entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.entries = []          # sorted (key, kind, display, product_id)
+        self.products = {}         # product_id -> (name, category)
+        self.category_counts = {}  # category -> number of products in it
+
+    @staticmethod
+    def _name_keys(name):
+        words = name.lower().split()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def _insert(self, entry):
+        insort(self.entries, entry)
+
+    def _delete(self, entry):
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def add(self, product_id, name, category):
+        with self._lock:
+            self.remove(product_id)
+            self.products[product_id] = (name, category)
+            for key in self._name_keys(name or ''):
+                self._insert((key, 'product', name, product_id))
+            if category:
+                count = self.category_counts.get(category, 0)
+                if count == 0:
+                    self._insert((category.lower(), 'category', category, 0))
+                self.category_counts[category] = count + 1
+
+    def remove(self, product_id):
+        with self._lock:
+            name, category = self.products.pop(product_id, (None, None))
+            for key in self._name_keys(name or ''):
+                self._delete((key, 'product', name, product_id))
+            if category:
+                count = self.category_counts.pop(category, 1) - 1
+                if count:
+                    self.category_counts[category] = count
+                else:
+                    self._delete((category.lower(), 'category', category, 0))
+
+    def suggest(self, prefix, limit=DEFAULT_SUGGESTIONS):
+        """Return {'categories': [...], 'products': [{'id', 'name'}]} matching prefix"""
+        prefix = ' '.join(prefix.lower().split())
+        categories, products, seen = [], [], set()
+        if not prefix:
+            return {'categories': categories, 'products': products}
+
+        with self._lock:
+            i = bisect_left(self.entries, (prefix,))
+            while i < len(self.entries) and len(categories) + len(products) < limit:
+                key, kind, display, product_id = self.entries[i]
+                if not key.startswith(prefix):
+                    break
+                if kind == 'category':
+                    categories.append(display)
+                elif product_id not in seen:
+                    seen.add(product_id)
+                    products.append({'id': product_id, 'name': display})
+                i += 1
+        return {'categories': categories, 'products': products}
+
+def build_suggestion_index():
+    """Build the typeahead index from every product row"""
+    index = SuggestionIndex()
+    query = Product.query.options(load_only(Product.name, Product.category))
+    for product in query.yield_per(1000):
+        index.add(product.id, product.name, product.category)
+    return index
+
+def get_suggestion_index():
+    """Return the app's typeahead index, building it on first use"""
+    app = current_app._get_current_object()
+    index = app.extensions.get('product_suggestion_index')
+    if index is None:
+        index = build_suggestion_index()
+        app.extensions['product_suggestion_index'] = index
+    return index
+
+def _snapshot(product):
+    return {'id': product.id, 'name': product.name, 'category': product.category}
+
+def _apply_product_changes(changes):
+    index = current_app.extensions.get('product_suggestion_index')
+    if index is None:
+        return
+    for action, data in changes:
+        if action == 'delete':
+            index.remove(data['id'])
+        else:
+            index.add(data['id'], data['name'], data['category'])
+
+on_commit(Product, _snapshot, _apply_product_changes)
@@ -0,0 +1,42 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app import db
+
+_INSERTS = {
+    'mysql': mysql.insert,
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+def _dialect_insert(table):
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in _INSERTS:
+        raise NotImplementedError(f'Upsert is not supported on {dialect}')
+    return dialect, _INSERTS[dialect](table)
+
+def upsert(table, values, index_elements, set_=(), increment=()):
+    """Build a single-statement insert-or-update for MySQL, SQLite or PostgreSQL.
+
+    index_elements names the unique key that detects the conflict. On
+    conflict, columns in set_ take the inserted value and columns in
+    increment are increased by it (quantity = quantity + VALUES(quantity)).
+    """
+    dialect, stmt = _dialect_insert(table)
+    stmt = stmt.values(values)
+    inserted = stmt.inserted if dialect == 'mysql' else stmt.excluded
+
+    updates = {name: inserted[name] for name in set_}
+    updates.update({name: table.c[name] + inserted[name] for name in increment})
+    if not updates:
+        return insert_ignore(table, values, index_elements)
+
+    if dialect == 'mysql':
+        return stmt.on_duplicate_key_update(**updates)
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=updates)
+
+def insert_ignore(table, values, index_elements):
+    """Build an insert that silently skips rows whose unique key already exists"""
+    dialect, stmt = _dialect_insert(table)
+    stmt = stmt.values(values)
+    if dialect == 'mysql':
+        return stmt.prefix_with('IGNORE')
+    return stmt.on_conflict_do_nothing(index_elements=index_elements)
@@ -0,0 +1,34 @@
+"""Add sales_rollups table
+
+Revision ID: 0c7e5b9a3d18
+Revises: f6a1d3c8e254
+Create Date: 2026-10-17 20:25:31.904172
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c7e5b9a3d18'
+down_revision = 'f6a1d3c8e254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing orders are loaded with `flask analytics backfill`
+    op.create_table('sales_rollups',
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('dimension_key', sa.String(length=100), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('granularity', 'dimension', 'dimension_key', 'bucket')
+    )
+
+
+def downgrade():
+    op.drop_table('sales_rollups')
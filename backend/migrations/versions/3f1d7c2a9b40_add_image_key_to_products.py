@@ -0,0 +1,32 @@
+"""Add image_key and image_content_type to products
+
+Revision ID: 3f1d7c2a9b40
+Revises: 9c8ca21183ef
+Create Date: 2026-10-17 09:12:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d7c2a9b40'
+down_revision = '9c8ca21183ef'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing image_data rows are drained into the image store with
+    # `flask images migrate` once this revision is applied.
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_key', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('image_content_type', sa.String(length=50), nullable=True))
+        batch_op.create_index(batch_op.f('ix_products_image_key'), ['image_key'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_products_image_key'))
+        batch_op.drop_column('image_content_type')
+        batch_op.drop_column('image_key')
@@ -0,0 +1,26 @@
+"""Add index on orders.updated_at for incremental exports
+
+Revision ID: 4a2f7c9e1b63
+Revises: 0c7e5b9a3d18
+Create Date: 2026-10-17 20:58:12.402761
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a2f7c9e1b63'
+down_revision = '0c7e5b9a3d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_updated_at', ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_updated_at')
@@ -0,0 +1,43 @@
+"""Add unique (cart_user_id, product_id) to cart_items
+
+Revision ID: 5b9e0d3a7c14
+Revises: a81e4f5c6d27
+Create Date: 2026-10-17 13:26:05.774910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e0d3a7c14'
+down_revision = 'a81e4f5c6d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Merge duplicate lines (summing quantities into the oldest row) so the
+    # unique key can be created
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(
+        "SELECT cart_user_id, product_id, MIN(id), SUM(quantity) FROM cart_items "
+        "GROUP BY cart_user_id, product_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    for cart_user_id, product_id, keep_id, quantity in duplicates:
+        params = {'cart_user_id': cart_user_id, 'product_id': product_id, 'keep_id': keep_id}
+        conn.execute(sa.text(
+            "UPDATE cart_items SET quantity = :quantity WHERE id = :keep_id"
+        ), {'quantity': quantity, 'keep_id': keep_id})
+        conn.execute(sa.text(
+            "DELETE FROM cart_items WHERE cart_user_id = :cart_user_id "
+            "AND product_id = :product_id AND id != :keep_id"
+        ), params)
+
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_cart_items_cart_product', ['cart_user_id', 'product_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_cart_items_cart_product', type_='unique')
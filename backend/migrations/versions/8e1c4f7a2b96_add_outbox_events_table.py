@@ -0,0 +1,44 @@
+"""Add outbox_events table
+
+Revision ID: 8e1c4f7a2b96
+Revises: 2d8f6b0e4a51
+Create Date: 2026-10-17 17:46:52.208391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1c4f7a2b96'
+down_revision = '2d8f6b0e4a51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(length=100), nullable=False),
+    sa.Column('aggregate_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('published_at', sa.DateTime(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('outbox_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_outbox_events_aggregate_id'), ['aggregate_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_outbox_events_user_id'), ['user_id'], unique=False)
+        batch_op.create_index('ix_outbox_events_published_id', ['published_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outbox_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_outbox_events_published_id')
+        batch_op.drop_index(batch_op.f('ix_outbox_events_user_id'))
+        batch_op.drop_index(batch_op.f('ix_outbox_events_aggregate_id'))
+
+    op.drop_table('outbox_events')
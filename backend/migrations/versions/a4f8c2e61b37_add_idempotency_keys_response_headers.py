@@ -0,0 +1,26 @@
+"""Add idempotency_keys.response_headers
+
+Revision ID: a4f8c2e61b37
+Revises: e2b7d4a9c815
+Create Date: 2026-10-18 11:04:52.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f8c2e61b37'
+down_revision = 'e2b7d4a9c815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('response_headers', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('response_headers')
@@ -0,0 +1,30 @@
+"""Add FULLTEXT index on products name, description, category
+
+Revision ID: a81e4f5c6d27
+Revises: 3f1d7c2a9b40
+Create Date: 2026-10-17 11:03:27.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81e4f5c6d27'
+down_revision = '3f1d7c2a9b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT is MySQL-only; other backends search through the in-process index
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.create_index('ft_products_search', 'products', ['name', 'description', 'category'],
+                    unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.drop_index('ft_products_search', table_name='products')
@@ -0,0 +1,35 @@
+"""Add outbox_deliveries table and outbox_events.next_attempt_at
+
+Revision ID: c3e9a1f5d706
+Revises: 9d3b6e0f2a75
+Create Date: 2026-10-17 23:12:40.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9a1f5d706'
+down_revision = '9d3b6e0f2a75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_deliveries',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('sink', sa.String(length=50), nullable=False),
+    sa.Column('delivered_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['outbox_events.id'], ),
+    sa.PrimaryKeyConstraint('event_id', 'sink')
+    )
+    with op.batch_alter_table('outbox_events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('outbox_events', schema=None) as batch_op:
+        batch_op.drop_column('next_attempt_at')
+
+    op.drop_table('outbox_deliveries')
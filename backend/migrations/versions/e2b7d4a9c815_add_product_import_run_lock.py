@@ -0,0 +1,28 @@
+"""Add product_imports.locked_by and heartbeat_at
+
+Revision ID: e2b7d4a9c815
+Revises: c3e9a1f5d706
+Create Date: 2026-10-18 09:27:13.604918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7d4a9c815'
+down_revision = 'c3e9a1f5d706'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product_imports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('locked_by', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('product_imports', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('locked_by')
@@ -0,0 +1,35 @@
+"""Add dashboard_stats table
+
+Revision ID: f6a1d3c8e254
+Revises: b5d8e2f1c037
+Create Date: 2026-10-17 19:48:03.114856
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a1d3c8e254'
+down_revision = 'b5d8e2f1c037'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dashboard_stats',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('slot', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('value', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'slot')
+    )
+    # Seed the counters from the existing rows
+    op.execute("INSERT INTO dashboard_stats (name, slot, value) SELECT 'total_users', 0, COUNT(*) FROM users")
+    op.execute("INSERT INTO dashboard_stats (name, slot, value) SELECT 'total_products', 0, COUNT(*) FROM products")
+    op.execute("INSERT INTO dashboard_stats (name, slot, value) SELECT 'total_orders', 0, COUNT(*) FROM orders")
+    op.execute("INSERT INTO dashboard_stats (name, slot, value) "
+               "SELECT 'total_revenue', 0, COALESCE(SUM(total_amount), 0) FROM orders")
+
+
+def downgrade():
+    op.drop_table('dashboard_stats')
@@ -6,12 +6,22 @@ export const adminAPI = {
   createProduct: (productData) => axiosClient.post('/admin/products', productData),
   updateProduct: (id, productData) => axiosClient.put(`/admin/products/${id}`, productData),
   deleteProduct: (id) => axiosClient.delete(`/admin/products/${id}`),
+  // Bulk import of a CSV or NDJSON file; poll getProductImport with the returned id
+  importProducts: (file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    return axiosClient.post('/admin/products/import', formData);
+  },
+  getProductImport: (importId) => axiosClient.get(`/admin/products/import/${importId}`),
+  exportProducts: (format = 'csv') =>
+    axiosClient.get('/admin/products/export', { params: { format }, responseType: 'blob' }),
   
   // Users
   getUsers: () => axiosClient.get('/admin/users'),
   
   // Orders
-  getOrders: () => axiosClient.get('/admin/orders'),
+  // params: status, user_id, created_from, created_to, min_total, sort, order, limit, cursor
+  getOrders: (params) => axiosClient.get('/admin/orders', { params }),
   
   // Stats
   getStats: () => axiosClient.get('/admin/stats'),
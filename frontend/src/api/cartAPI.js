@@ -16,6 +16,10 @@ export const cartAPI = {
   removeFromCart: (productId) => 
     axiosClient.delete(`/cart/remove/${productId}`),
   
+  // Apply several add/update/remove operations in one request
+  batch: (operations) => 
+    axiosClient.post('/cart/batch', { operations }),
+  
   // Clear entire cart
   clearCart: () => axiosClient.delete('/cart/clear')
 };
\ No newline at end of file
@@ -1,6 +1,19 @@
 import axiosClient from './axiosClient';
 
 export const orderAPI = {
-  getAll: () => axiosClient.get('/orders'),
-  create: (orderData) => axiosClient.post('/orders', orderData),
+  // Newest-first summaries; pass { cursor } from the X-Next-Cursor header for more
+  getAll: (params) => axiosClient.get('/orders', { params }),
+  get: (orderId) => axiosClient.get(`/orders/${orderId}`),
+  // Reuse the same idempotencyKey when retrying so the order is placed once
+  create: (orderData, idempotencyKey) => axiosClient.post('/orders', orderData,
+    idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined),
+  // Live order status updates; returns the EventSource so callers can close() it
+  stream: (onStatusChange) => {
+    const token = localStorage.getItem('access_token');
+    const source = new EventSource(
+      `${axiosClient.defaults.baseURL}/orders/stream?jwt=${encodeURIComponent(token)}`
+    );
+    source.addEventListener('order.status_changed', (event) => onStatusChange(JSON.parse(event.data)));
+    return source;
+  },
 };
\ No newline at end of file
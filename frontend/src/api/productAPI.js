@@ -1,6 +1,8 @@
 import axiosClient from './axiosClient';
 
 export const productAPI = {
-  getAll: () => axiosClient.get('/products'),
+  // One page per call; pass { cursor } from the X-Next-Cursor header for more
+  getAll: (params) => axiosClient.get('/products', { params }),
   getById: (id) => axiosClient.get(`/products/${id}`),
-};
\ No newline at end of file
+  getCategories: () => axiosClient.get('/products/categories'),
+};
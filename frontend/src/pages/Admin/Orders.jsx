@@ -5,9 +5,16 @@ import './Orders.css';
 
 const Orders = () => {
   const dispatch = useDispatch();
-  const { orders, loading } = useSelector(state => state.admin);
+  const { orders, ordersTotal, ordersNextCursor, loading } = useSelector(state => state.admin);
   const [selectedOrder, setSelectedOrder] = useState(null);
   const [updatingStatus, setUpdatingStatus] = useState(null);
+  const [filters, setFilters] = useState({
+    status: '', user_id: '', created_from: '', created_to: '', min_total: '', sort: 'created_at', order: 'desc'
+  });
+
+  // Only send the filters that are set
+  const activeFilters = () =>
+    Object.fromEntries(Object.entries(filters).filter(([, value]) => value !== ''));
 
   const statusOptions = [
     { value: 'pending', label: '⏳ Pending', color: 'status-pending' },
@@ -18,8 +25,16 @@ const Orders = () => {
   ];
 
   useEffect(() => {
-    dispatch(fetchAdminOrders());
-  }, [dispatch]);
+    dispatch(fetchAdminOrders(activeFilters()));
+  }, [dispatch, filters]);
+
+  const handleFilterChange = (e) => {
+    setFilters(prev => ({ ...prev, [e.target.name]: e.target.value }));
+  };
+
+  const loadMore = () => {
+    dispatch(fetchAdminOrders({ ...activeFilters(), cursor: ordersNextCursor }));
+  };
 
   const getStatusColor = (status) => {
     switch (status) {
@@ -88,10 +103,33 @@ const Orders = () => {
           <h1 className="orders-title">Order Management</h1>
           <p className="orders-subtitle">Manage and track customer orders</p>
           <div className="orders-stats">
-            <span className="stat">Total Orders: {orders.length}</span>
+            <span className="stat">Total Orders: {ordersTotal}</span>
           </div>
         </div>
 
+        {/* Filters */}
+        <div className="orders-filters">
+          <select name="status" value={filters.status} onChange={handleFilterChange}>
+            <option value="">All statuses</option>
+            {statusOptions.map(option => (
+              <option key={option.value} value={option.value}>{option.label}</option>
+            ))}
+          </select>
+          <input name="user_id" type="number" placeholder="Customer ID" value={filters.user_id} onChange={handleFilterChange} />
+          <input name="created_from" type="date" value={filters.created_from} onChange={handleFilterChange} />
+          <input name="created_to" type="date" value={filters.created_to} onChange={handleFilterChange} />
+          <input name="min_total" type="number" placeholder="Min total" value={filters.min_total} onChange={handleFilterChange} />
+          <select name="sort" value={filters.sort} onChange={handleFilterChange}>
+            <option value="created_at">Date</option>
+            <option value="total_amount">Total</option>
+            <option value="id">Order #</option>
+          </select>
+          <select name="order" value={filters.order} onChange={handleFilterChange}>
+            <option value="desc">Descending</option>
+            <option value="asc">Ascending</option>
+          </select>
+        </div>
+
         {/* Orders List */}
         <div className="orders-content">
           {orders.length === 0 ? (
@@ -179,6 +217,9 @@ const Orders = () => {
               ))}
             </div>
           )}
+          {ordersNextCursor && (
+            <button className="load-more-btn" onClick={loadMore}>Load more orders</button>
+          )}
         </div>
 
         {/* Order Detail Modal */}
@@ -5,27 +5,49 @@ import './Orders.css';
 
 const Orders = () => {
   const [orders, setOrders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [orderItems, setOrderItems] = useState({});
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const { isAuthenticated } = useAuth();
 
+  const fetchOrders = async (cursor) => {
+    try {
+      const response = await orderAPI.getAll(cursor ? { cursor } : undefined);
+      setOrders(prev => (cursor ? [...prev, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (err) {
+      setError(err.response?.data?.error || 'Failed to fetch orders');
+    }
+  };
+
   useEffect(() => {
     if (!isAuthenticated) return;
 
-    const fetchOrders = async () => {
-      try {
-        const response = await orderAPI.getAll();
-        setOrders(response.data);
-      } catch (err) {
-        setError(err.response?.data?.error || 'Failed to fetch orders');
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchOrders();
+    fetchOrders().finally(() => setLoading(false));
   }, [isAuthenticated]);
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    await fetchOrders(nextCursor);
+    setLoadingMore(false);
+  };
+
+  // Items are only fetched when an order is expanded
+  const toggleItems = async (orderId) => {
+    if (orderItems[orderId]) {
+      setOrderItems(prev => ({ ...prev, [orderId]: null }));
+      return;
+    }
+    try {
+      const response = await orderAPI.get(orderId);
+      setOrderItems(prev => ({ ...prev, [orderId]: response.data.order_items }));
+    } catch (err) {
+      setError(err.response?.data?.error || 'Failed to fetch order');
+    }
+  };
+
   if (!isAuthenticated) {
     return (
       <div className="orders-page">
@@ -134,8 +156,10 @@ const Orders = () => {
 
                   {/* Order Items */}
                   <div className="order-items">
-                    <h4 className="items-title">Items</h4>
-                    {order.order_items.map(item => (
+                    <h4 className="items-title" onClick={() => toggleItems(order.id)}>
+                      Items ({order.item_count}) {orderItems[order.id] ? '▲' : '▼'}
+                    </h4>
+                    {orderItems[order.id] && orderItems[order.id].map(item => (
                       <div key={item.id} className="order-item">
                         <div className="item-info">
                           <span className="item-name">{item.product_name}</span>
@@ -155,6 +179,11 @@ const Orders = () => {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <button className="load-more" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load more orders'}
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -1,31 +1,56 @@
 import React, { useEffect, useState } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
 import { fetchProducts } from '../redux/slices/productSlice';
+import { productAPI } from '../api/productAPI';
 import ProductCard from '../components/ProductCard';
 import './Products.css';
 
 const Products = () => {
   const dispatch = useDispatch();
-  const { items: products, loading, error } = useSelector(state => state.products);
+  const {
+    items: products, total, nextCursor, loading, loadingMore, error
+  } = useSelector(state => state.products);
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedCategory, setSelectedCategory] = useState('');
+  const [categories, setCategories] = useState([]);
 
   useEffect(() => {
-    dispatch(fetchProducts());
-  }, [dispatch]);
+    productAPI.getCategories()
+      .then(response => setCategories(response.data))
+      .catch(() => setCategories([]));
+  }, []);
 
-  // Get unique categories
-  const categories = [...new Set(products.map(product => product.category).filter(Boolean))];
+  // Search and category filter on the server, so they cover the whole catalog
+  const activeFilters = () => {
+    const params = {};
+    if (searchTerm.trim()) params.search = searchTerm.trim();
+    if (selectedCategory) params.category = selectedCategory;
+    return params;
+  };
 
-  // Filter products
-  const filteredProducts = products.filter(product => {
-    const matchesSearch = product.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         product.description.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesCategory = !selectedCategory || product.category === selectedCategory;
-    return matchesSearch && matchesCategory;
-  });
+  useEffect(() => {
+    // Wait for a pause in typing, and drop the request for stale filters
+    let request;
+    const timer = setTimeout(() => {
+      request = dispatch(fetchProducts(activeFilters()));
+    }, searchTerm ? 300 : 0);
+    return () => {
+      clearTimeout(timer);
+      if (request) request.abort();
+    };
+  }, [dispatch, searchTerm, selectedCategory]);
+
+  const loadMore = () => {
+    dispatch(fetchProducts({ ...activeFilters(), cursor: nextCursor }));
+  };
+
+  const clearFilters = () => {
+    setSearchTerm('');
+    setSelectedCategory('');
+  };
 
-  if (loading) return (
+  // Keep the filters mounted while a new search loads
+  if (loading && products.length === 0) return (
     <div className="products-loading">
       <div className="loading-pulse">
         <div></div>
@@ -43,7 +68,7 @@ const Products = () => {
       <p>We're having trouble loading our collection. Please check your connection.</p>
       <button 
         className="retry-btn"
-        onClick={() => dispatch(fetchProducts())}
+        onClick={() => dispatch(fetchProducts(activeFilters()))}
       >
         Retry Connection
       </button>
@@ -68,7 +93,7 @@ const Products = () => {
           </div>
           <div className="header-stats">
             <div className="total-products">
-              <span className="count">{filteredProducts.length}</span>
+              <span className="count">{total}</span>
               <span className="label">Products</span>
             </div>
           </div>
@@ -104,14 +129,11 @@ const Products = () => {
           </div>
           
           <div className="results-info">
-            Showing {filteredProducts.length} of {products.length} products
+            Showing {products.length} of {total} products
             {(searchTerm || selectedCategory) && (
               <button 
                 className="clear-filters"
-                onClick={() => {
-                  setSearchTerm('');
-                  setSelectedCategory('');
-                }}
+                onClick={clearFilters}
               >
                 Clear filters
               </button>
@@ -121,12 +143,19 @@ const Products = () => {
 
         {/* Products Grid */}
         <div className="products-content">
-          {filteredProducts.length > 0 ? (
-            <div className="products-grid">
-              {filteredProducts.map(product => (
-                <ProductCard key={product.id} product={product} />
-              ))}
-            </div>
+          {products.length > 0 ? (
+            <>
+              <div className="products-grid">
+                {products.map(product => (
+                  <ProductCard key={product.id} product={product} />
+                ))}
+              </div>
+              {nextCursor && (
+                <button className="load-more-btn" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load more products'}
+                </button>
+              )}
+            </>
           ) : (
             <div className="no-results">
               <div className="no-results-icon">🔍</div>
@@ -134,10 +163,7 @@ const Products = () => {
               <p>Try adjusting your search or filter criteria</p>
               <button 
                 className="reset-filters-btn"
-                onClick={() => {
-                  setSearchTerm('');
-                  setSelectedCategory('');
-                }}
+                onClick={clearFilters}
               >
                 Reset All Filters
               </button>
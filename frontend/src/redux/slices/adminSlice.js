@@ -104,10 +104,15 @@ export const deleteAdminUser = createAsyncThunk(
 
 export const fetchAdminOrders = createAsyncThunk(
   'admin/fetchOrders',
-  async (_, { rejectWithValue }) => {
+  async (params = {}, { rejectWithValue }) => {
     try {
-      const response = await adminAPI.getOrders();
-      return response.data;
+      const response = await adminAPI.getOrders(params);
+      return {
+        orders: response.data,
+        total: Number(response.headers['x-total-count'] || response.data.length),
+        nextCursor: response.headers['x-next-cursor'] || null,
+        append: Boolean(params.cursor),
+      };
     } catch (error) {
       return rejectWithValue(error.response.data);
     }
@@ -133,6 +138,8 @@ const adminSlice = createSlice({
     products: [],
     users: [],
     orders: [],
+    ordersTotal: 0,
+    ordersNextCursor: null,
     loading: false,
     error: null,
   },
@@ -190,7 +197,10 @@ const adminSlice = createSlice({
       })
       // Fetch Orders
       .addCase(fetchAdminOrders.fulfilled, (state, action) => {
-        state.orders = action.payload;
+        const { orders, total, nextCursor, append } = action.payload;
+        state.orders = append ? [...state.orders, ...orders] : orders;
+        state.ordersTotal = total;
+        state.ordersNextCursor = nextCursor;
       })
 
       // Add these cases to extraReducers in adminSlice.js
@@ -3,10 +3,15 @@ import { productAPI } from '../../api/productAPI';
 
 export const fetchProducts = createAsyncThunk(
   'products/fetchAll',
-  async (_, { rejectWithValue }) => {
+  async (params = {}, { rejectWithValue }) => {
     try {
-      const response = await productAPI.getAll();
-      return response.data;
+      const response = await productAPI.getAll(params);
+      return {
+        products: Array.isArray(response.data) ? response.data : [],
+        total: Number(response.headers['x-total-count'] || response.data.length),
+        nextCursor: response.headers['x-next-cursor'] || null,
+        append: Boolean(params.cursor),
+      };
     } catch (error) {
       return rejectWithValue(error.response?.data || 'Failed to fetch products');
     }
@@ -17,28 +22,44 @@ const productSlice = createSlice({
   name: 'products',
   initialState: {
     items: [],
+    total: 0,
+    nextCursor: null,
     loading: false,
+    loadingMore: false,
     error: null,
   },
   reducers: {
     // Add a reducer to clear products if needed
     clearProducts: (state) => {
       state.items = [];
+      state.total = 0;
+      state.nextCursor = null;
     },
   },
   extraReducers: (builder) => {
     builder
-      .addCase(fetchProducts.pending, (state) => {
-        state.loading = true;
+      .addCase(fetchProducts.pending, (state, action) => {
+        // Loading another page keeps the products already shown
+        if (action.meta.arg?.cursor) {
+          state.loadingMore = true;
+        } else {
+          state.loading = true;
+        }
         state.error = null;
       })
       .addCase(fetchProducts.fulfilled, (state, action) => {
+        const { products, total, nextCursor, append } = action.payload;
         state.loading = false;
-        // Make sure we're storing the products array properly
-        state.items = Array.isArray(action.payload) ? action.payload : [];
+        state.loadingMore = false;
+        state.items = append ? [...state.items, ...products] : products;
+        state.total = total;
+        state.nextCursor = nextCursor;
       })
       .addCase(fetchProducts.rejected, (state, action) => {
+        // A request superseded by newer filters was aborted on purpose
+        if (action.meta.aborted) return;
         state.loading = false;
+        state.loadingMore = false;
         state.error = action.payload?.error || action.payload || 'Failed to fetch products';
       });
   },